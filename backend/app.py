@@ -1,12 +1,45 @@
+import asyncio
+import hashlib
 import os
-import tempfile
 
-from fastapi import FastAPI, File, HTTPException, UploadFile
+from typing import Literal, Optional
+
+import orjson
+from brotli_asgi import BrotliMiddleware
+from fastapi import FastAPI, File, HTTPException, Query, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
+
+from src.monitoring.telemetry import record_cache, render_metrics, span
+from src.storage.decision_store import DecisionStore
+from src.workflows.orchestrator import jobs
+
+# Uploaded PDFs are kept here until their job completes, so a failed job can be resumed
+JOB_DIR = os.getenv("SENTINEL_JOB_DIR", "sentinel_jobs")
+
+# Every completed analysis is recorded so it can be looked up without re-running the pipeline
+decision_store = DecisionStore()
+
+# Responses smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 1024
+
+# view=summary keeps at most this many reconciliation mismatches inline
+SUMMARY_MISMATCHES = 20
 
-from src.workflows.orchestrator import app as sentinel_app
 
-app = FastAPI(title="Project Sentinel API")
+class FastJSONResponse(JSONResponse):
+    """
+    orjson-encoded JSON. Endpoints with large bodies return this directly, which also
+    skips FastAPI's jsonable_encoder walk over every transaction.
+    """
+
+    def render(self, content):
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY, default=str)
+
+
+app = FastAPI(title="Project Sentinel API", default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,30 +48,195 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Brotli for clients that accept it; otherwise the outer gzip layer compresses (it skips bodies
+# that already have a Content-Encoding, see tests/test_decisions_api.py)
+app.add_middleware(BrotliMiddleware, quality=4, minimum_size=COMPRESS_MIN_BYTES, gzip_fallback=False)
+# Level 6: level 9 is ~5x slower on a 1 MB body for ~10% less
+app.add_middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_BYTES, compresslevel=6)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key onto one in-flight computation.
+    The computation runs in its own task, so a caller disconnecting does not
+    cancel the work for the others still waiting on it.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+
+    async def do(self, key, fn):
+        task = self._inflight.get(key)
+        shared = task is not None
+        if not shared:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        record_cache("analyze_singleflight", shared)
+        return await asyncio.shield(task)
+
+
+analysis_flight = SingleFlight()
+
+
+def _summary_client_data(client_data):
+    """client_data without the transaction rows (they are paged from /decisions/{id}/transactions)."""
+    summary = {k: v for k, v in client_data.items() if k != "transactions"}
+    summary.setdefault("transaction_count", len(client_data.get("transactions") or []))
+    reconciliation = client_data.get("reconciliation")
+    if reconciliation and reconciliation.get("mismatches"):
+        mismatches = reconciliation["mismatches"]
+        summary["reconciliation"] = dict(reconciliation, mismatches=mismatches[:SUMMARY_MISMATCHES],
+                                         mismatch_count=len(mismatches))
+    return summary
+
+
+def _response(result, job_id, decision_id, view="full"):
+    client_data = result.get("client_data")
+    payload = {
+        "job_id": job_id,
+        "decision_id": decision_id,
+        "final_decision": result.get("final_decision"),
+        "risk_analysis": result.get("risk_analysis"),
+        "legal_opinion": result.get("legal_opinion"),
+        "wealth_plan": result.get("wealth_plan"),
+        "client_data": client_data,
+    }
+    if view == "summary":
+        _summarize(payload, decision_id)
+    return FastJSONResponse(payload)
+
+
+def _summarize(payload, decision_id):
+    """Applies view=summary to a response body in place (same shape for /analyze and /decisions/{id})."""
+    if payload.get("client_data"):
+        payload["client_data"] = _summary_client_data(payload["client_data"])
+    payload["transactions_url"] = f"/decisions/{decision_id}/transactions"
+
+
+def _job_pdf(job_id):
+    return os.path.join(JOB_DIR, f"{job_id}.pdf")
+
+
+def _finish_job(job_id, result):
+    pdf_path = _job_pdf(job_id)
+    if os.path.exists(pdf_path):
+        os.remove(pdf_path)
+    decision_id = decision_store.record(job_id, result)
+    return result, decision_id
+
+
+def _run_pipeline(content, job_id):
+    pdf_path = _job_pdf(job_id)
+    if not os.path.exists(pdf_path):
+        os.makedirs(JOB_DIR, exist_ok=True)
+        with open(pdf_path, "wb") as fh:
+            fh.write(content)
+
+    with span("analyze_request"):
+        if jobs.pending(job_id):
+            # Same PDF failed earlier: continue from the failed node (OCR/extraction are reused)
+            result = jobs.resume(job_id)
+        else:
+            result, _ = jobs.run(pdf_path, job_id)
+
+    return _finish_job(job_id, result)
+
+
+def _resume_pipeline(job_id):
+    with span("analyze_request"):
+        result = jobs.resume(job_id)
+    return _finish_job(job_id, result)
 
 
 @app.post("/analyze")
-async def analyze(file: UploadFile = File(...)):
+async def analyze(
+    file: UploadFile = File(...),
+    view: Literal["full", "summary"] = Query("full", description="summary omits client_data.transactions"),
+):
     if file.content_type not in ("application/pdf", "application/octet-stream"):
         raise HTTPException(status_code=400, detail="Only PDF uploads are supported.")
 
-    temp_path = None
+    content = await file.read()
+    # Identical uploads (double-clicks, gateway retries) share one pipeline run.
+    # The content hash is also the job ID: re-uploading a PDF whose latest run failed
+    # resumes it, anything else starts a fresh run on its own checkpoint thread.
+    job_id = hashlib.sha256(content).hexdigest()
+
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            temp_path = tmp.name
-            tmp.write(await file.read())
-
-        result = sentinel_app.invoke({"pdf_path": temp_path})
-
-        return {
-            "final_decision": result.get("final_decision"),
-            "risk_analysis": result.get("risk_analysis"),
-            "legal_opinion": result.get("legal_opinion"),
-            "wealth_plan": result.get("wealth_plan"),
-            "client_data": result.get("client_data"),
-        }
+        # Coalesced callers share the result; each one renders its own view
+        result, decision_id = await analysis_flight.do(job_id, lambda: run_in_threadpool(_run_pipeline, content, job_id))
     except Exception as exc:
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
-    finally:
-        if temp_path and os.path.exists(temp_path):
-            os.remove(temp_path)
+        raise HTTPException(
+            status_code=500,
+            detail=f"{exc} (job_id={job_id}; POST /jobs/{job_id}/resume to retry from the failed step)",
+        ) from exc
+    return _response(result, job_id, decision_id, view)
+
+
+@app.post("/jobs/{job_id}/resume")
+async def resume(job_id: str, view: Literal["full", "summary"] = "full"):
+    if not await run_in_threadpool(jobs.pending, job_id):
+        raise HTTPException(status_code=404, detail=f"Job {job_id} has nothing to resume.")
+
+    try:
+        result, decision_id = await analysis_flight.do(job_id, lambda: run_in_threadpool(_resume_pipeline, job_id))
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"{exc} (job_id={job_id})") from exc
+    return _response(result, job_id, decision_id, view)
+
+
+@app.get("/decisions")
+def list_decisions(
+    client_name: Optional[str] = Query(None, description="Case-insensitive name prefix"),
+    account_number: Optional[str] = None,
+    decision: Optional[str] = Query(None, description="APPROVE or REJECT"),
+    reason: Optional[str] = Query(None, description="Reason category, e.g. STRUCTURING"),
+    statement_from: Optional[str] = Query(None, description="YYYY-MM-DD"),
+    statement_to: Optional[str] = Query(None, description="YYYY-MM-DD"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+):
+    return decision_store.query(
+        client_name=client_name,
+        account_number=account_number,
+        decision=decision,
+        reason_category=reason,
+        statement_from=statement_from,
+        statement_to=statement_to,
+        limit=limit,
+        cursor=cursor,
+    )
+
+
+@app.get("/decisions/stats")
+def decision_stats():
+    return decision_store.stats()
+
+
+@app.get("/decisions/{decision_id}")
+def get_decision(decision_id: int, view: Literal["full", "summary"] = "full"):
+    record = decision_store.get(decision_id, include_transactions=view == "full")
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Decision {decision_id} not found.")
+    if view == "summary":
+        _summarize(record, decision_id)
+    return FastJSONResponse(record)
+
+
+@app.get("/decisions/{decision_id}/transactions")
+def get_decision_transactions(
+    decision_id: int,
+    limit: int = Query(200, ge=1, le=1000),
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+):
+    page = decision_store.transactions(decision_id, limit=limit, cursor=cursor)
+    if page is None:
+        raise HTTPException(status_code=404, detail=f"Decision {decision_id} not found.")
+    return FastJSONResponse(page)
+
+
+@app.get("/metrics")
+def metrics():
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
@@ -0,0 +1,463 @@
+"""
+Offline end-to-end benchmark for the Sentinel pipeline.
+
+Builds a synthetic corpus with data_generator (and optionally pdf_generator),
+then runs it through the real LangGraph workflow and RiskEngine with local
+stand-ins for OCR and the LLMs.
+
+Usage (from the repo root):
+    python -m benchmarks.pipeline_bench --clients 500 --ocr-ms 50 --llm-ms 120 --concurrency 8
+    python -m benchmarks.pipeline_bench --clients 100000 --mode engine
+    python -m benchmarks.pipeline_bench --clients 200 --mode api
+    python -m benchmarks.pipeline_bench --clients 3 --mode paged --ocr-ms 200 --statement-pages 50
+    python -m benchmarks.pipeline_bench --clients 200 --mode compaction --statement-pages 3
+    python -m benchmarks.pipeline_bench --clients 5 --mode payload --statement-rows 10000
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import types
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+# Keep the pipeline quiet unless asked otherwise (must be set before src imports)
+os.environ.setdefault("SENTINEL_LOG_LEVEL", "WARNING")
+# Stubs are not rate limited; lift the client-side limits unless the run sets them explicitly
+for _provider in ("OPENAI", "LLAMAPARSE"):
+    os.environ.setdefault(f"SENTINEL_{_provider}_RPM", "100000000")
+    os.environ.setdefault(f"SENTINEL_{_provider}_TPM", "0")
+    os.environ.setdefault(f"SENTINEL_{_provider}_MAX_CONCURRENCY", "1024")
+
+from benchmarks.stubs import (
+    PdfTextOCR,
+    StatementCorpus,
+    StubLegalAgent,
+    StubOCR,
+    StubWealthAdvisor,
+    client_id_for,
+    make_stub_extraction_llm,
+    parse_statement_markdown,
+)
+from src.data import data_generator
+from src.io.extractor import extract_data
+from src.risk.risk_engine import RiskEngine
+from src.workflows.graph import JobRunner, build_workflow
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def summarize(samples):
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def build_stub_app(corpus, args, checkpointer=None):
+    ocr = StubOCR(corpus, args.ocr_ms, args.jitter)
+    llm = make_stub_extraction_llm(args.llm_ms, args.jitter)
+
+    def stub_extract(pdf_path):
+        return extract_data(pdf_path, parser=ocr, structured_llm=llm, prescreen=not args.no_prescreen)
+
+    workflow = build_workflow(
+        stub_extract,
+        RiskEngine(),
+        StubLegalAgent(args.gen_ms, args.jitter),
+        StubWealthAdvisor(args.gen_ms, args.jitter),
+    )
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def render_corpus(corpus, out_dir):
+    """Renders real PDFs with pdf_generator so OCR-side tooling has files to chew on."""
+    from src.io.pdf_generator import render_statement
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for c_id in corpus.client_ids():
+        profile, txns = corpus.client(c_id)
+        pdf_name = os.path.join(out_dir, f"Statement_{c_id}.pdf")
+        render_statement(
+            pdf_name, profile["Name"], txns,
+            account_number=corpus.account_number(c_id), statement_date=corpus.statement_date,
+        )
+        paths.append(pdf_name)
+    return paths
+
+
+def run_one(app, pdf_path):
+    """Streams one statement through the graph; returns (per-node timings, total, final state)."""
+    timings = {}
+    final = {}
+    start = last = time.perf_counter()
+    for update in app.stream({"pdf_path": pdf_path}, stream_mode="updates"):
+        now = time.perf_counter()
+        for node, values in update.items():
+            timings[node] = now - last
+            final.update(values or {})
+        last = now
+    return timings, last - start, final
+
+
+def bench_graph(corpus, args):
+    app = build_stub_app(corpus, args)
+
+    if args.render_pdfs:
+        t0 = time.perf_counter()
+        paths = render_corpus(corpus, args.render_pdfs)
+        print(f"Rendered {len(paths)} PDFs in {time.perf_counter() - t0:.2f}s")
+    else:
+        paths = [f"Statement_{c_id}.pdf" for c_id in corpus.client_ids()]
+
+    node_samples = defaultdict(list)
+    e2e = []
+    routes = Counter()
+    confusion = Counter()
+    prescreened = 0
+
+    def task(path):
+        return path, run_one(app, path)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for path, (timings, total, final) in pool.map(task, paths):
+            e2e.append(total)
+            for node, seconds in timings.items():
+                node_samples[node].append(seconds)
+            routes["legal_agent" if "legal_agent" in timings else "wealth_advisor"] += 1
+            profile, _ = corpus.client(client_id_for(path))
+            confusion[(profile["Is_High_Risk"], final.get("final_decision"))] += 1
+            prescreened += bool((final.get("client_data") or {}).get("prescreen"))
+    wall = time.perf_counter() - start
+
+    return {
+        "mode": "graph",
+        "statements": len(paths),
+        "wall_s": round(wall, 3),
+        "throughput_per_s": round(len(paths) / wall, 2) if wall else 0.0,
+        "end_to_end": summarize(e2e),
+        "nodes": {node: summarize(samples) for node, samples in sorted(node_samples.items())},
+        "routes": dict(routes),
+        "prescreen_short_circuits": prescreened,
+        "decision_vs_ground_truth": {f"high_risk={k[0]}/{k[1]}": v for k, v in sorted(confusion.items(), key=str)},
+    }
+
+
+def bench_engine(corpus, args):
+    """RiskEngine alone on pre-parsed extractions (no graph, no sleeps)."""
+    graph = None
+    if args.counterparty_graph:
+        from src.risk.counterparty_graph import CounterpartyGraph
+
+        graph = CounterpartyGraph(os.path.join(tempfile.mkdtemp(prefix="sentinel-bench-"), "counterparties.sqlite"))
+    engine = RiskEngine(counterparty_graph=graph)
+    extractions = [parse_statement_markdown(corpus.markdown(c_id)).model_dump() for c_id in corpus.client_ids()]
+
+    samples = []
+    decisions = Counter()
+    start = time.perf_counter()
+    for data in extractions:
+        t0 = time.perf_counter()
+        report = engine.analyze(data)
+        samples.append(time.perf_counter() - t0)
+        decisions[report["final_decision"]] += 1
+    wall = time.perf_counter() - start
+
+    return {
+        "mode": "engine",
+        "statements": len(extractions),
+        "wall_s": round(wall, 3),
+        "throughput_per_s": round(len(extractions) / wall, 2) if wall else 0.0,
+        "analyze": summarize(samples),
+        "decisions": dict(decisions),
+    }
+
+
+def long_statement(corpus, c_id, min_rows):
+    """Concatenates consecutive months of one client until the statement has min_rows rows."""
+    profile, _ = corpus.client(c_id)
+    rng = random.Random(f"{corpus.seed}-{c_id}-long")
+    rows, month = [], 0
+    while len(rows) < min_rows:
+        start = corpus.start_date - timedelta(days=31 * (60 - month))
+        rows += data_generator.generate_smart_transactions(profile, rng, corpus.company_pool, start)
+        month += 1
+    balance = 10000.0
+    for row in rows:
+        balance += row["Amount"] if row["Type"] == "CREDIT" else -row["Amount"]
+        row["Balance"] = round(balance, 2)
+    return profile, rows
+
+
+def bench_paged(corpus, args):
+    """Long real PDFs through extract_data: whole-document OCR vs parallel page ranges."""
+    from src.io.pdf_generator import FIRST_PAGE_ROWS, ROWS_PER_PAGE, render_statement
+
+    out_dir = args.render_pdfs or tempfile.mkdtemp(prefix="sentinel-paged-")
+    os.makedirs(out_dir, exist_ok=True)
+    min_rows = FIRST_PAGE_ROWS + (args.statement_pages - 1) * ROWS_PER_PAGE
+    statements = []
+    for c_id in corpus.client_ids():
+        profile, rows = long_statement(corpus, c_id, min_rows)
+        path = os.path.join(out_dir, f"Statement_{c_id}.pdf")
+        render_statement(path, profile["Name"], rows, corpus.account_number(c_id), corpus.statement_date,
+                         max_pages=args.statement_pages)
+        statements.append((path, profile["Name"]))
+
+    ocr = PdfTextOCR(args.ocr_ms, args.jitter)
+    llm = make_stub_extraction_llm(args.llm_ms, args.jitter)
+    report = {"mode": "paged", "statements": len(statements), "pages_per_statement": args.statement_pages}
+    for label, chunk in (("whole_document", 0), (f"page_ranges_of_{args.pages_per_chunk}", args.pages_per_chunk)):
+        samples, rows, names_ok = [], [], 0
+        for path, name in statements:
+            t0 = time.perf_counter()
+            data = extract_data(path, parser=ocr, structured_llm=llm, pages_per_chunk=chunk)
+            samples.append(time.perf_counter() - t0)
+            rows.append(len(data["transactions"]))
+            names_ok += data["client_name"] == name
+        report[label] = {"latency": summarize(samples), "avg_rows": round(sum(rows) / len(rows), 1),
+                         "client_name_correct": names_ok}
+    return report
+
+
+def bench_compaction(corpus, args):
+    """
+    Tokens saved by markdown_compactor, and whether extraction still matches: the stub
+    'perfect LLM' must return the same FinancialExtraction from raw and compacted markdown.
+    """
+    from src.io.markdown_compactor import compact_markdown
+    from src.io.page_ocr import merge_extractions
+    from src.io.pdf_generator import render_statement
+
+    out_dir = args.render_pdfs or tempfile.mkdtemp(prefix="sentinel-compaction-")
+    os.makedirs(out_dir, exist_ok=True)
+    ocr = PdfTextOCR()
+    report = {"mode": "compaction", "statements": corpus.num_clients, "pages_per_statement": args.statement_pages}
+
+    documents = []
+    for c_id in corpus.client_ids():
+        profile, rows = long_statement(corpus, c_id, 1) if args.statement_pages <= 1 else long_statement(
+            corpus, c_id, 20 + (args.statement_pages - 1) * 23)
+        path = os.path.join(out_dir, f"Statement_{c_id}.pdf")
+        render_statement(path, profile["Name"], rows, corpus.account_number(c_id), corpus.statement_date,
+                         max_pages=args.statement_pages)
+        documents.append("\n".join(doc.text for doc in ocr.load_data(path)))
+
+    for budget in (args.token_budget, args.token_budget // 8):
+        before = after = exact = calls = 0
+        seconds = []
+        for markdown in documents:
+            expected = parse_statement_markdown(markdown).model_dump()
+            t0 = time.perf_counter()
+            compacted = compact_markdown(markdown, budget)
+            seconds.append(time.perf_counter() - t0)
+            parts = [parse_statement_markdown(part) for part in compacted.parts]
+            got = (parts[0] if len(parts) == 1 else merge_extractions(parts)).model_dump()
+            exact += got == expected
+            before += compacted.tokens_before
+            after += compacted.tokens_after
+            calls += len(compacted.parts)
+        report[f"budget_{budget}"] = {
+            "tokens_before": before,
+            "tokens_after": after,
+            "tokens_saved_pct": round(100 * (before - after) / before, 1) if before else 0.0,
+            "llm_calls": calls,
+            "extraction_exact_match": f"{exact}/{len(documents)}",
+            "compaction": summarize(seconds),
+        }
+    return report
+
+
+def stub_backend(corpus, args):
+    """Imports backend/app.py with the stub graph behind it and scratch job/decision storage."""
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    # backend.app imports the production job runner from orchestrator; hand it the stub one instead
+    stub_module = types.ModuleType("src.workflows.orchestrator")
+    stub_module.jobs = JobRunner(build_stub_app(corpus, args, checkpointer=InMemorySaver()))
+    sys.modules["src.workflows.orchestrator"] = stub_module
+    scratch = tempfile.mkdtemp(prefix="sentinel-bench-")
+    os.environ.setdefault("SENTINEL_JOB_DIR", os.path.join(scratch, "jobs"))
+    os.environ.setdefault("SENTINEL_DECISION_DB", os.path.join(scratch, "decisions.sqlite"))
+    import backend.app
+
+    return backend.app
+
+
+def bench_api(corpus, args):
+    """Drives backend/app.py through FastAPI's TestClient with the stub graph behind it."""
+    from fastapi.testclient import TestClient
+
+    client = TestClient(stub_backend(corpus, args).app)
+    samples = []
+    sizes = []
+
+    def task(c_id):
+        body = f"%PDF-1.4\n% sentinel-bench {c_id}\n".encode()
+        t0 = time.perf_counter()
+        response = client.post("/analyze", files={"file": ("statement.pdf", body, "application/pdf")})
+        response.raise_for_status()
+        return time.perf_counter() - t0, len(response.content)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for seconds, size in pool.map(task, corpus.client_ids()):
+            samples.append(seconds)
+            sizes.append(size)
+    wall = time.perf_counter() - start
+
+    return {
+        "mode": "api",
+        "requests": len(samples),
+        "wall_s": round(wall, 3),
+        "throughput_per_s": round(len(samples) / wall, 2) if wall else 0.0,
+        "request": summarize(samples),
+        "avg_response_bytes": int(sum(sizes) / len(sizes)) if sizes else 0,
+    }
+
+
+def bench_payload(corpus, args):
+    """
+    /analyze response size and encode time for very long statements (--statement-rows each):
+    FastAPI's default encoder vs orjson, full vs summary view, raw vs gzip vs brotli,
+    plus paging the transactions back through /decisions/{id}/transactions.
+    """
+    import gzip
+
+    import brotli
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from fastapi.testclient import TestClient
+
+    backend = stub_backend(corpus, args)
+    client = TestClient(backend.app)
+    engine = RiskEngine()
+
+    timings = defaultdict(list)
+    sizes = defaultdict(list)
+
+    def timed(label, fn):
+        t0 = time.perf_counter()
+        value = fn()
+        timings[label].append(time.perf_counter() - t0)
+        return value
+
+    for c_id in corpus.client_ids():
+        profile, rows = long_statement(corpus, c_id, args.statement_rows)
+        client_data = engine.reconciler.reconcile({
+            "client_name": profile["Name"],
+            "account_number": corpus.account_number(c_id),
+            "statement_date": corpus.statement_date,
+            "source_of_wealth": "Salary",
+            "risk_flags": [],
+            "transactions": [
+                {"date": r["Date"], "description": r["Description"], "amount": r["Amount"], "type": r["Type"],
+                 "balance": r["Balance"]}
+                for r in rows[:args.statement_rows]
+            ],
+        })
+        result = {"final_decision": "APPROVE", "client_data": client_data, "risk_analysis": engine.analyze(client_data),
+                  "legal_opinion": None, "wealth_plan": "Wealth Product 1: Fixed deposit. Low risk."}
+        decision_id = backend.decision_store.record(c_id, result)
+
+        # 1. Encoding the full body: FastAPI default path vs orjson
+        content = {"job_id": c_id, "decision_id": decision_id, **{k: result[k] for k in (
+            "final_decision", "risk_analysis", "legal_opinion", "wealth_plan", "client_data")}}
+        default = timed("encode_default_full", lambda: JSONResponse(jsonable_encoder(content)).body)
+        payload = timed("encode_orjson_full", lambda: backend._response(result, c_id, decision_id).body)
+        summary = timed("encode_orjson_summary", lambda: backend._response(result, c_id, decision_id, "summary").body)
+        sizes["full"].append(len(default))
+        sizes["summary"].append(len(summary))
+
+        # 2. Compression (the middleware settings: brotli quality 4, gzip level 6)
+        sizes["full_gzip"].append(len(timed("gzip_full", lambda: gzip.compress(payload, compresslevel=6))))
+        sizes["full_brotli"].append(len(timed("brotli_full", lambda: brotli.compress(payload, quality=4))))
+        sizes["summary_brotli"].append(len(brotli.compress(summary, quality=4)))
+
+        # 3. Over HTTP: one compressed full body vs paging the rows
+        response = timed("http_full_br", lambda: client.get(f"/decisions/{decision_id}", headers={"Accept-Encoding": "br"}))
+        assert response.headers["content-encoding"] == "br"
+        sizes["http_full_br_wire"].append(int(response.headers.get("content-length", len(response.content))))
+        response = client.get(f"/decisions/{decision_id}", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        cursor, pages = None, 0
+        while True:
+            page = timed("http_transactions_page", lambda: client.get(
+                f"/decisions/{decision_id}/transactions",
+                params={"limit": 1000, **({"cursor": cursor} if cursor is not None else {})}).json())
+            pages += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert page["total"] == len(client_data["transactions"]), "paging lost rows"
+
+    def kb(values):
+        return round(sum(values) / len(values) / 1024, 1)
+
+    return {
+        "mode": "payload",
+        "statements": corpus.num_clients,
+        "transactions_per_statement": args.statement_rows,
+        "avg_kb": {label: kb(values) for label, values in sizes.items()},
+        "timings": {label: summarize(values) for label, values in timings.items()},
+        "transaction_pages_per_statement": pages,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline Sentinel pipeline benchmark.")
+    parser.add_argument("--clients", type=int, default=50, help="Corpus size (50 to 100k)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mode", choices=["graph", "engine", "api", "paged", "compaction", "payload"], default="graph")
+    parser.add_argument("--concurrency", type=int, default=1, help="Statements in flight at once")
+    parser.add_argument("--ocr-ms", type=float, default=0, help="Stub OCR latency per statement (per page in paged mode)")
+    parser.add_argument("--llm-ms", type=float, default=0, help="Stub extraction LLM latency per call")
+    parser.add_argument("--gen-ms", type=float, default=0, help="Stub legal/wealth generation latency")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Uniform latency jitter (fraction of mean)")
+    parser.add_argument("--no-prescreen", action="store_true", help="Always run LLM extraction (no regex pre-screen)")
+    parser.add_argument("--statement-pages", type=int, default=50, help="Paged mode: pages per rendered statement")
+    parser.add_argument("--pages-per-chunk", type=int, default=5, help="Paged mode: pages per parallel OCR range")
+    parser.add_argument("--token-budget", type=int, default=12000, help="Compaction mode: input tokens per LLM call")
+    parser.add_argument("--statement-rows", type=int, default=10000, help="Payload mode: transactions per statement")
+    parser.add_argument("--counterparty-graph", action="store_true", help="Engine mode: also feed the cross-client mule-ring graph")
+    parser.add_argument("--render-pdfs", metavar="DIR", help="Also render the corpus to real PDFs in DIR")
+    parser.add_argument("--json", metavar="FILE", help="Write the report as JSON")
+    args = parser.parse_args(argv)
+
+    corpus = StatementCorpus(args.clients, seed=args.seed)
+    runner = {"graph": bench_graph, "engine": bench_engine, "api": bench_api, "paged": bench_paged,
+              "compaction": bench_compaction, "payload": bench_payload}[args.mode]
+    report = runner(corpus, args)
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(report, fh, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
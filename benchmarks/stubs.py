@@ -0,0 +1,245 @@
+"""
+Local stand-ins for the paid services (LlamaParse OCR, OpenAI LLMs).
+
+Each stand-in sleeps for a configurable latency and returns output shaped like
+the real service, so the Sentinel graph, RiskEngine and API layer can be
+benchmarked offline on a plain Linux box.
+"""
+import os
+import random
+import re
+import time
+from datetime import datetime, timedelta
+
+from langchain_core.runnables import RunnableLambda
+
+from src.data import data_generator
+from src.data.data_contract import FinancialExtraction, TransactionItem
+
+# Same keywords the extraction prompt tells the real LLM to scan for
+RISK_KEYWORDS = ["Crypto", "Binance", "Coinbase", "Luno", "Casino", "MBS", "Betting"]
+
+CLIENT_ID_RE = re.compile(r"(C\d{3,})")
+NAME_RE = re.compile(r"(?:\*\*)?Customer Name:(?:\*\*)?\s*(.+)")
+ACCOUNT_RE = re.compile(r"(?:\*\*)?Account Number:(?:\*\*)?\s*(\S+)")
+DATE_RE = re.compile(r"^(?:\*\*)?Date:(?:\*\*)?\s*(.+)", re.M)
+# Rows after markdown_compactor: date;description;amount;type;balance
+COMPACT_ROW_RE = re.compile(r"^(\d{4}-\d{2}-\d{2});(.+?);(-?[\d.]+);(CREDIT|DEBIT);(-?[\d.]+)$", re.M)
+ROW_RE = re.compile(r"^\|\s*(\d{4}-\d{2}-\d{2})\s*\|(.+?)\|\s*\$?([\d,]+\.\d{2})\s*\|\s*(CREDIT|DEBIT)\s*\|\s*\$?(-?[\d,]+\.\d{2})\s*\|", re.M)
+
+
+class Latency:
+    """Sleeps for mean_ms +/- jitter (uniform). A mean of 0 disables sleeping."""
+
+    def __init__(self, mean_ms, jitter=0.2, seed=0):
+        self.mean_ms = mean_ms
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+
+    def wait(self):
+        if self.mean_ms <= 0:
+            return
+        spread = self.mean_ms * self.jitter
+        time.sleep(max(0.0, self._rng.uniform(self.mean_ms - spread, self.mean_ms + spread)) / 1000)
+
+
+class StatementCorpus:
+    """
+    A virtual corpus of `num_clients` statements built with data_generator.
+    Each client is regenerated on demand from a per-client seed, so 100k
+    clients cost no memory until they are read.
+    """
+
+    def __init__(self, num_clients, seed=42):
+        self.num_clients = num_clients
+        self.seed = seed
+        self.statement_date = datetime.now().strftime('%d %b %Y')
+        self.start_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=30)
+        self.name_pool, self.company_pool = data_generator.build_name_pools(seed)
+
+    def client_ids(self):
+        return [f"C{i:06d}" for i in range(1, self.num_clients + 1)]
+
+    def client(self, client_id):
+        """Returns (profile, transactions) for one client, identical on every call."""
+        rng = random.Random(f"{self.seed}-{client_id}")
+        profile = data_generator.generate_smart_profile(client_id, rng, self.name_pool)
+        txns = data_generator.generate_smart_transactions(profile, rng, self.company_pool, self.start_date)
+        return profile, txns
+
+    def account_number(self, client_id):
+        return str(random.Random(f"acct-{self.seed}-{client_id}").randint(1000000000, 9999999999))
+
+    def markdown(self, client_id):
+        """What LlamaParse returns for a pdf_generator statement (header, table, footer)."""
+        profile, txns = self.client(client_id)
+        lines = [
+            "# DBS (Digital Bank Simulation) - eStatement",
+            "",
+            f"**Customer Name:** {profile['Name']}",
+            f"**Account Number:** {self.account_number(client_id)}",
+            f"**Date:** {self.statement_date}",
+            "",
+            "| Date | Description | Amount | Type | Balance |",
+            "|------|-------------|--------|------|---------|",
+        ]
+        for t in txns:
+            lines.append(f"| {t['Date']} | {t['Description']} | ${t['Amount']:,.2f} | {t['Type']} | ${t['Balance']:,.2f} |")
+        lines += ["", "End of Statement. Computer Generated."]
+        return "\n".join(lines)
+
+
+def client_id_for(pdf_path):
+    """Statement_C000123.pdf, or an uploaded temp file carrying a "sentinel-bench C000123" marker."""
+    match = CLIENT_ID_RE.search(os.path.basename(pdf_path))
+    if not match:
+        with open(pdf_path, "rb") as fh:
+            match = CLIENT_ID_RE.search(fh.read(256).decode("latin-1"))
+    if not match:
+        raise ValueError(f"Cannot map {pdf_path} to a corpus client")
+    return match.group(1)
+
+
+class _Document:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubOCR:
+    """Stands in for LlamaParse: `load_data(pdf_path)` returns markdown documents."""
+
+    def __init__(self, corpus, latency_ms=0, jitter=0.2):
+        self.corpus = corpus
+        self.latency = Latency(latency_ms, jitter, seed=1)
+
+    def load_data(self, pdf_path):
+        self.latency.wait()
+        return [_Document(self.corpus.markdown(client_id_for(pdf_path)))]
+
+
+TEXT_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+TEXT_HEADER_FIELDS = ("Customer Name:", "Account Number:", "Date:")
+TABLE_COLUMNS = ["Date", "Description", "Amount", "Type", "Balance"]
+
+
+def page_markdown(text):
+    """
+    Reshapes pypdf text of one pdf_generator page into LlamaParse-style markdown:
+    bold header fields, a pipe table (column header repeated on every page) and the footer text.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    out = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith("DBS (Digital Bank Simulation)"):
+            out += [f"# {line}", ""]
+        elif line.startswith(TEXT_HEADER_FIELDS):
+            label, _, value = line.partition(":")
+            out.append(f"**{label}:** {value.strip()}")
+        elif lines[i:i + 5] == TABLE_COLUMNS:
+            out += ["", "| Date | Description | Amount | Type | Balance |", "|------|-------------|--------|------|---------|"]
+            i += 5
+            continue
+        elif TEXT_DATE_RE.match(line):
+            # Row: date, description (may wrap over several lines), $amount, type, $balance
+            j = i + 1
+            while j < len(lines) and not lines[j].startswith("$"):
+                j += 1
+            if j + 2 < len(lines):
+                description = " ".join(lines[i + 1:j])
+                out.append(f"| {line} | {description} | {lines[j]} | {lines[j + 1]} | {lines[j + 2]} |")
+                i = j + 3
+                continue
+            out.append(line)
+        else:
+            out += ["", line]
+        i += 1
+    return "\n".join(out)
+
+
+class PdfTextOCR:
+    """
+    Stands in for LlamaParse on real PDFs: one markdown document per page (like
+    split_by_page=True), built from pypdf text, after `latency_ms` per page.
+    """
+
+    def __init__(self, latency_ms_per_page=0, jitter=0.2):
+        self.latency = Latency(latency_ms_per_page, jitter, seed=5)
+
+    def load_data(self, pdf_path):
+        from pypdf import PdfReader
+
+        documents = []
+        for page in PdfReader(pdf_path).pages:
+            self.latency.wait()
+            documents.append(_Document(page_markdown(page.extract_text())))
+        return documents
+
+
+def parse_statement_markdown(text):
+    """Deterministic 'perfect LLM': parses the statement markdown into a FinancialExtraction."""
+    name = NAME_RE.search(text)
+    account = ACCOUNT_RE.search(text)
+    date = DATE_RE.search(text)
+
+    statement_date = "Unknown"
+    if date:
+        try:
+            statement_date = datetime.strptime(date.group(1).strip(), "%d %b %Y").strftime("%Y-%m-%d")
+        except ValueError:
+            statement_date = date.group(1).strip()
+
+    transactions = []
+    risk_flags = []
+    for row_date, desc, amount, txn_type, balance in ROW_RE.findall(text) + COMPACT_ROW_RE.findall(text):
+        desc = desc.strip()
+        transactions.append(TransactionItem(
+            date=row_date,
+            description=desc,
+            amount=float(amount.replace(",", "")),
+            type=txn_type,
+            balance=float(balance.replace(",", "")),
+        ))
+        for kw in RISK_KEYWORDS:
+            if kw.lower() in desc.lower() and desc not in risk_flags:
+                risk_flags.append(desc)
+
+    has_salary = any("SALARY" in t.description.upper() for t in transactions)
+    return FinancialExtraction(
+        client_name=name.group(1).strip() if name else "Unknown",
+        account_number=account.group(1).strip() if account else "Unknown",
+        statement_date=statement_date,
+        source_of_wealth="Salary" if has_salary else "Unknown",
+        risk_flags=risk_flags,
+        transactions=transactions,
+    )
+
+
+def make_stub_extraction_llm(latency_ms=0, jitter=0.2):
+    """Stands in for `ChatOpenAI(...).with_structured_output(FinancialExtraction)`."""
+    latency = Latency(latency_ms, jitter, seed=2)
+
+    def _invoke(prompt_value):
+        latency.wait()
+        return parse_statement_markdown(prompt_value.to_string())
+
+    return RunnableLambda(_invoke)
+
+
+class StubLegalAgent:
+    def __init__(self, latency_ms=0, jitter=0.2):
+        self.latency = Latency(latency_ms, jitter, seed=3)
+
+    def consult(self, risk_flags):
+        self.latency.wait()
+        return f"Reason: {', '.join(risk_flags)}. Regulation: MAS Notice 626 (benchmark stub)."
+
+
+class StubWealthAdvisor:
+    def __init__(self, latency_ms=0, jitter=0.2):
+        self.latency = Latency(latency_ms, jitter, seed=4)
+
+    def recommend(self, income, risk_profile):
+        self.latency.wait()
+        return f"Wealth Product 1: Benchmark fund for a {risk_profile} client earning ${income}."
@@ -175,7 +175,8 @@ export default function App() {
     formData.append("file", file);
 
     try {
-      const response = await fetch(API_URL, {
+      // Transactions are not rendered here, so ask for the compact response
+      const response = await fetch(`${API_URL}?view=summary`, {
         method: "POST",
         body: formData,
       });
@@ -2,21 +2,24 @@ import os
 from dotenv import load_dotenv
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import FAISS
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
+
+from src.monitoring.telemetry import get_logger, span, track_llm_usage
+from src.io.service_clients import call_with_policy, estimate_tokens, get_chat_model, get_embeddings
+from src.agents.vector_index import load_or_build
 
 # 1. Load Secrets
 load_dotenv()
 
+logger = get_logger("legal_agent")
+
 if not os.getenv("OPENAI_API_KEY"):
     raise ValueError("❌ OPENAI_API_KEY not found in .env file.")
 
 # 2. Configuration
 PDF_PATH = "mas_guidelines.pdf"
-DB_PATH = "faiss_index"         # FAISS saves as a folder
+DB_PATH = "faiss_index"         # Memory-mapped FAISS folder (see vector_index.py)
 
 class LegalAgent:
     def __init__(self):
@@ -26,44 +29,17 @@ class LegalAgent:
         self._initialize_db()
 
     def _initialize_db(self):
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+        embeddings = get_embeddings("text-embedding-3-small")
 
-        # A. Check if DB exists
-        if os.path.exists(DB_PATH):
-            print("⚖️ Legal Agent: Loading existing FAISS Database...")
-            # Allow dangerous deserialization is required for local pickle files
-            self.vectorstore = FAISS.load_local(DB_PATH, embeddings, allow_dangerous_deserialization=True)
-        else:
-            print("⚖️ Legal Agent: Building new FAISS Database from PDF...")
-            
-            # 1. Load PDF
-            if not os.path.exists(PDF_PATH):
-                print(f"⚠️ Warning: {PDF_PATH} not found. Creating dummy data for testing.")
-                from langchain_core.documents import Document
-                docs = [
-                    Document(page_content="MAS Guidelines Section 4.1: Banks must perform Enhanced Due Diligence (EDD) on high-risk customers."),
-                    Document(page_content="MAS Guidelines Section 8.2: Virtual Assets (Crypto) payments are considered high risk and require Source of Funds verification.")
-                ]
-            else:
-                loader = PyPDFLoader(PDF_PATH)
-                docs = loader.load()
-            
-            # 2. Split
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-            splits = text_splitter.split_documents(docs)
-            
-            # 3. Create FAISS Index
-            self.vectorstore = FAISS.from_documents(splits, embeddings)
-            
-            # 4. Save to Disk
-            self.vectorstore.save_local(DB_PATH)
-            print("✅ FAISS Database saved to disk!")
+        # A. Open the memory-mapped index (shared by every worker), building it on first run
+        logger.info("⚖️ Legal Agent: Opening FAISS Database...")
+        self.vectorstore = load_or_build(DB_PATH, embeddings, self._load_documents)
 
         # B. Create Retriever
         self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 2})
 
         # C. Reasoning Chain
-        self.llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+        self.llm = get_chat_model("gpt-4o-mini", 0.0)
         
         template = """You are a Banking Compliance Officer. 
         Justify your rejection of this client using the regulations below.
@@ -79,18 +55,44 @@ class LegalAgent:
         
         prompt = ChatPromptTemplate.from_template(template)
         
-        self.chain = (
-            {"context": self.retriever, "risk_factors": RunnablePassthrough()}
-            | prompt
-            | self.llm
-            | StrOutputParser()
-        )
+        # Retrieval runs separately in consult() so it can be timed on its own
+        self.chain = prompt | self.llm | StrOutputParser()
+
+    @staticmethod
+    def _load_documents():
+        logger.info("⚖️ Legal Agent: Building new FAISS Database from PDF...")
+
+        # 1. Load PDF
+        if not os.path.exists(PDF_PATH):
+            logger.warning("⚠️ Warning: %s not found. Creating dummy data for testing.", PDF_PATH)
+            from langchain_core.documents import Document
+            docs = [
+                Document(page_content="MAS Guidelines Section 4.1: Banks must perform Enhanced Due Diligence (EDD) on high-risk customers."),
+                Document(page_content="MAS Guidelines Section 8.2: Virtual Assets (Crypto) payments are considered high risk and require Source of Funds verification.")
+            ]
+        else:
+            loader = PyPDFLoader(PDF_PATH)
+            docs = loader.load()
+
+        # 2. Split
+        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+        return text_splitter.split_documents(docs)
 
     def consult(self, risk_flags):
-        print(f"⚖️ Legal Agent: Researching laws for {risk_flags}...")
+        logger.info("⚖️ Legal Agent: Researching laws for %s...", risk_flags)
         # Join list into a string for the prompt
         risk_string = ", ".join(risk_flags) if isinstance(risk_flags, list) else str(risk_flags)
-        return self.chain.invoke(risk_string)
+
+        with span("legal_retrieval"):
+            regulations = call_with_policy("openai", self.retriever.invoke, risk_string, tokens=estimate_tokens(risk_string, 0))
+
+        with span("legal_generation"), track_llm_usage("legal_opinion"):
+            return call_with_policy(
+                "openai",
+                self.chain.invoke,
+                {"context": regulations, "risk_factors": risk_string},
+                tokens=estimate_tokens(risk_string + "".join(d.page_content for d in regulations)),
+            )
 
 # --- Test Block ---
 if __name__ == "__main__":
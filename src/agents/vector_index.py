@@ -0,0 +1,336 @@
+"""
+Read-only, memory-mapped FAISS indexes for the RAG agents.
+
+`FAISS.load_local` gives every API worker its own in-RAM copy of the vectors and
+unpickles the whole docstore at startup. Here an index folder holds instead:
+
+- index.faiss             the native FAISS file (same file save_local writes), opened with
+                          IO_FLAG_MMAP_IFC so the vectors stay in the OS page cache
+- <column>.bin/.offsets.npy  one file pair per docstore column (id, page_content,
+                          metadata as JSON): concatenated UTF-8 plus an int64 offset array,
+                          both mmapped, so only the rows a query returns are decoded
+- manifest.json           written last; its presence marks a complete index
+
+Every worker that opens the folder (forked or not) maps the same physical pages, and
+startup does no deserialization. Row i of the docstore is FAISS vector i, so the
+index -> docstore id mapping is the row number itself.
+
+Folders are never written in place, since a rewrite under a live mmap can SIGBUS a
+reader. Builds and conversions go into a temp directory next to the target, which is
+then swapped in with os.replace. They run under an fcntl lock (`<folder>.lock`), so when
+several workers start together exactly one of them builds and the rest wait and open the result.
+
+A legacy folder (index.faiss + index.pkl from save_local) is converted on first load;
+`python -m src.agents.vector_index faiss_index products_faiss_index` does it ahead of time.
+"""
+import fcntl
+import json
+import mmap
+import os
+import shutil
+import tempfile
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+import faiss
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from src.monitoring.telemetry import get_logger, span
+
+logger = get_logger("vector_index")
+
+FORMAT_VERSION = 1
+INDEX_FILE = "index.faiss"
+LEGACY_DOCSTORE = "index.pkl"
+MANIFEST = "manifest.json"
+COLUMNS = ("id", "page_content", "metadata")
+MMAP_FLAGS = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+
+class ReadOnlyIndexError(TypeError):
+    """Raised when documents are added to an mmapped index; rebuild it to add documents."""
+
+
+class _Column:
+    """One mmapped string column: row i is blob[offsets[i]:offsets[i + 1]]."""
+
+    def __init__(self, folder, name):
+        self.offsets = np.load(os.path.join(folder, f"{name}.offsets.npy"), mmap_mode="r")
+        path = os.path.join(folder, f"{name}.bin")
+        if os.path.getsize(path):
+            with open(path, "rb") as fh:
+                self.blob = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.blob = b""  # mmap cannot map an empty file
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        return self.blob[int(self.offsets[row]):int(self.offsets[row + 1])].decode("utf-8")
+
+
+class MmapDocstore(Docstore):
+    """Read-only docstore over the column files; `search(row)` decodes a single row."""
+
+    def __init__(self, folder):
+        self.columns = {name: _Column(folder, name) for name in COLUMNS}
+        self.size = len(self.columns["id"])
+
+    def search(self, search):
+        try:
+            row = int(search)
+        except (TypeError, ValueError):
+            return f"ID {search} not found."
+        if not 0 <= row < self.size:
+            return f"ID {search} not found."
+        return Document(
+            id=self.columns["id"][row] or None,
+            page_content=self.columns["page_content"][row],
+            metadata=json.loads(self.columns["metadata"][row]),
+        )
+
+    def add(self, texts):
+        raise ReadOnlyIndexError("MmapDocstore is read-only; rebuild the index to add documents.")
+
+
+class RowIds(Mapping):
+    """index_to_docstore_id for an MmapDocstore: FAISS position i maps to docstore row i."""
+
+    def __init__(self, size):
+        self.size = size
+
+    def __getitem__(self, position):
+        if not 0 <= position < self.size:
+            raise KeyError(position)
+        return position
+
+    def __iter__(self):
+        return iter(range(self.size))
+
+    def __len__(self):
+        return self.size
+
+
+def _write_columns(folder, rows):
+    for name in COLUMNS:
+        offsets = [0]
+        with open(os.path.join(folder, f"{name}.bin"), "wb") as fh:
+            for row in rows:
+                data = row[name].encode("utf-8")
+                fh.write(data)
+                offsets.append(offsets[-1] + len(data))
+        np.save(os.path.join(folder, f"{name}.offsets.npy"), np.asarray(offsets, dtype=np.int64))
+
+
+@contextmanager
+def _build_lock(folder):
+    """Exclusive cross-process lock for building/converting `folder`."""
+    path = os.path.abspath(folder).rstrip(os.sep)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".lock", "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _swap_in(staging, folder):
+    """Moves a finished staging directory to `folder`; the previous folder (if any) is removed."""
+    retired = None
+    if os.path.exists(folder):
+        retired = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(folder)), prefix=".retired-")
+        os.replace(folder, os.path.join(retired, "index"))
+    os.replace(staging, folder)
+    if retired:
+        # Workers that still map the old files keep their inodes until they close them
+        shutil.rmtree(retired, ignore_errors=True)
+
+
+def _write_index(vectorstore, folder):
+    rows = []
+    for position in range(vectorstore.index.ntotal):
+        doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+        rows.append({
+            "id": str(doc.id or vectorstore.index_to_docstore_id[position]),
+            "page_content": doc.page_content,
+            "metadata": json.dumps(doc.metadata, default=str, separators=(",", ":")),
+        })
+    faiss.write_index(vectorstore.index, os.path.join(folder, INDEX_FILE))
+    _write_columns(folder, rows)
+    with open(os.path.join(folder, MANIFEST), "w") as fh:
+        json.dump({"version": FORMAT_VERSION, "rows": len(rows), "dimension": vectorstore.index.d,
+                   "columns": list(COLUMNS)}, fh)
+    return len(rows)
+
+
+def _save_staged(vectorstore, folder, keep=()):
+    """Writes the index into a staging directory, copies `keep` files from `folder`, then swaps it in."""
+    parent = os.path.dirname(os.path.abspath(folder))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix=f".{os.path.basename(folder)}.staging-")
+    try:
+        rows = _write_index(vectorstore, staging)
+        for source, target in keep:
+            shutil.copy2(os.path.join(folder, source), os.path.join(staging, target))
+        _swap_in(staging, folder)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    logger.info("   💾 Saved %d vectors to %s (mmap format)", rows, folder)
+
+
+def save_index(vectorstore, folder):
+    """Writes a FAISS vectorstore (any docstore) to `folder` in the mmap format, replacing it atomically."""
+    with _build_lock(folder):
+        _save_staged(vectorstore, folder)
+
+
+def _has_manifest(folder):
+    return os.path.exists(os.path.join(folder, MANIFEST))
+
+
+def convert_legacy(folder, embeddings=None):
+    """One-time conversion of a save_local folder (index.faiss + pickled docstore)."""
+    with _build_lock(folder):
+        if _has_manifest(folder):
+            return  # another worker converted it while we waited
+        if not os.path.exists(os.path.join(folder, LEGACY_DOCSTORE)):
+            raise FileNotFoundError(f"{folder} has neither {MANIFEST} nor {LEGACY_DOCSTORE}")
+        logger.info("   🔄 Converting %s from the pickle docstore...", folder)
+        # The pickle is our own save_local output; this is the last time it is read
+        legacy = FAISS.load_local(folder, embeddings, allow_dangerous_deserialization=True)
+        _save_staged(legacy, folder, keep=[(LEGACY_DOCSTORE, LEGACY_DOCSTORE + ".bak")])
+
+
+def load_index(folder, embeddings):
+    """Opens `folder` as a memory-mapped FAISS vectorstore, converting a legacy folder first."""
+    if not _has_manifest(folder):
+        convert_legacy(folder, embeddings)
+
+    with open(os.path.join(folder, MANIFEST)) as fh:
+        manifest = json.load(fh)
+    if manifest["version"] != FORMAT_VERSION:
+        raise ValueError(f"{folder}: unsupported index format version {manifest['version']}")
+
+    with span("vector_index_load"):
+        index = faiss.read_index(os.path.join(folder, INDEX_FILE), MMAP_FLAGS)
+        docstore = MmapDocstore(folder)
+    if index.ntotal != docstore.size:
+        raise ValueError(f"{folder}: {index.ntotal} vectors but {docstore.size} docstore rows")
+    return FAISS(embeddings, index, docstore, RowIds(docstore.size))
+
+
+def load_or_build(folder, embeddings, load_documents):
+    """
+    Opens the index at `folder`, or embeds `load_documents()` and saves it first.
+    A freshly built index is re-opened from disk so this process maps it like every other worker.
+    """
+    if not _has_manifest(folder):
+        with _build_lock(folder):
+            # Re-checked under the lock: only the first worker embeds, the others wait for its index
+            if not _has_manifest(folder) and not os.path.exists(os.path.join(folder, LEGACY_DOCSTORE)):
+                _save_staged(FAISS.from_documents(load_documents(), embeddings), folder)
+    return load_index(folder, embeddings)
+
+
+# --- Test Block ---
+if __name__ == "__main__":
+    import argparse
+    import shutil
+    import time
+
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+
+    parser = argparse.ArgumentParser(description="Convert pickle FAISS folders to the mmap format, or self-test.")
+    parser.add_argument("folders", nargs="*", help="save_local folders to convert in place")
+    parser.add_argument("--rows", type=int, default=20_000, help="Self-test: vectors in the synthetic index")
+    parser.add_argument("--workers", type=int, default=4, help="Self-test: forked readers")
+    args = parser.parse_args()
+
+    if args.folders:
+        for folder in args.folders:
+            convert_legacy(folder)
+        raise SystemExit(0)
+
+    def rss_mb():
+        # Private (anonymous) memory only; mapped file pages are shared through the page cache
+        with open("/proc/self/status") as fh:
+            fields = dict(line.split(":", 1) for line in fh)
+        return int(fields["RssAnon"].split()[0]) / 1024
+
+    scratch = tempfile.mkdtemp(prefix="sentinel-faiss-")
+    embeddings = DeterministicFakeEmbedding(size=1536)
+    docs = [Document(page_content=f"MAS Guidelines Section {i}: clause {i % 97} on customer due diligence.",
+                     metadata={"page": i // 40, "source": "mas_guidelines.pdf"}) for i in range(args.rows)]
+    vectors = np.random.default_rng(3).random((len(docs), 1536), dtype=np.float32)
+    legacy = FAISS.from_embeddings([(d.page_content, v) for d, v in zip(docs, vectors)], embeddings,
+                                   metadatas=[d.metadata for d in docs])
+    folder = os.path.join(scratch, "faiss_index")
+    legacy.save_local(folder)
+    racing = os.path.join(scratch, "racing_index")
+    legacy.save_local(racing)
+
+    # 1. Same answers from the converted index
+    queries = ["Crypto Transfer to Binance", "Casino Transfer", "Low Risk Investment Products"]
+    expected = [[(d.page_content, d.metadata) for d in legacy.similarity_search(q, k=3)] for q in queries]
+    del legacy
+    store = load_index(folder, embeddings)
+    got = [[(d.page_content, d.metadata) for d in store.similarity_search(q, k=3)] for q in queries]
+    assert got == expected and not os.path.exists(os.path.join(folder, LEGACY_DOCSTORE))
+    print(f"✅ Converted {args.rows} vectors; search results identical to the pickle docstore.")
+    try:
+        store.docstore.add({"extra": docs[0]})
+        raise AssertionError("mmapped docstore accepted a write")
+    except ReadOnlyIndexError:
+        pass
+
+    # 2. Workers starting together on a legacy folder: one converts, all open the same index
+    pids = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                s = load_index(racing, embeddings)
+                ok = [[(d.page_content, d.metadata) for d in s.similarity_search(q, k=3)] for q in queries] == expected
+            except BaseException:
+                ok = False
+            os._exit(0 if ok else 1)
+        pids.append(pid)
+    statuses = [os.waitpid(pid, 0)[1] for pid in pids]
+    assert statuses == [0] * args.workers, statuses
+    assert sorted(os.listdir(scratch)) == ["faiss_index", "faiss_index.lock", "racing_index", "racing_index.lock"]
+    print(f"✅ {args.workers} workers raced the legacy conversion; all opened the same index.")
+
+    # 3. Forked readers: private memory per worker, pickle load vs mmap
+    def child_cost(open_store):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            before, t0 = rss_mb(), time.perf_counter()
+            s = open_store()
+            load_ms = (time.perf_counter() - t0) * 1000
+            s.similarity_search(queries[0], k=3)
+            os.write(write_fd, f"{rss_mb() - before:.1f} {load_ms:.1f}".encode())
+            os._exit(0)
+        os.close(write_fd)
+        rss, load_ms = map(float, os.read(read_fd, 64).decode().split())
+        os.waitpid(pid, 0)
+        return rss, load_ms
+
+    pickled = os.path.join(scratch, "pickled")
+    FAISS.from_embeddings([(d.page_content, v) for d, v in zip(docs, vectors)], embeddings).save_local(pickled)
+    for label, opener in (
+        ("pickle load_local", lambda: FAISS.load_local(pickled, embeddings, allow_dangerous_deserialization=True)),
+        ("mmap load_index", lambda: load_index(folder, embeddings)),
+    ):
+        costs = [child_cost(opener) for _ in range(args.workers)]
+        total = sum(rss for rss, _ in costs)
+        print(f"   {label:18}: +{total / len(costs):7.1f} MB private per worker ({args.workers} workers: "
+              f"{total:7.1f} MB), load {max(ms for _, ms in costs):7.1f} ms")
+    shutil.rmtree(scratch)
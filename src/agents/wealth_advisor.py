@@ -1,17 +1,19 @@
 import os
-from operator import itemgetter
 from dotenv import load_dotenv
 from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import CharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import FAISS
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
+
+from src.monitoring.telemetry import get_logger, span, track_llm_usage
+from src.io.service_clients import call_with_policy, estimate_tokens, get_chat_model, get_embeddings
+from src.agents.vector_index import load_or_build
 
 # 1. Load Secrets
 load_dotenv()
 
+logger = get_logger("wealth_advisor")
+
 # 2. Configuration
 PRODUCT_FILE = "dbs_products.txt"
 DB_PATH = "products_faiss_index"
@@ -24,30 +26,14 @@ class WealthAdvisor:
         self._initialize_db()
 
     def _initialize_db(self):
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-
-        if os.path.exists(DB_PATH):
-            print("💼 Wealth Advisor: Loading Product Database...")
-            self.vectorstore = FAISS.load_local(DB_PATH, embeddings, allow_dangerous_deserialization=True)
-        else:
-            print("💼 Wealth Advisor: Indexing Products (One-time)...")
-            
-            if not os.path.exists(PRODUCT_FILE):
-                raise FileNotFoundError(f"❌ {PRODUCT_FILE} not found. Please create the product list.")
-
-            loader = TextLoader(PRODUCT_FILE)
-            docs = loader.load()
-            
-            text_splitter = CharacterTextSplitter(separator="---", chunk_size=500, chunk_overlap=0)
-            splits = text_splitter.split_documents(docs)
-            
-            self.vectorstore = FAISS.from_documents(splits, embeddings)
-            self.vectorstore.save_local(DB_PATH)
-            print("✅ Product Database Ready!")
+        embeddings = get_embeddings("text-embedding-3-small")
+
+        logger.info("💼 Wealth Advisor: Opening Product Database...")
+        self.vectorstore = load_or_build(DB_PATH, embeddings, self._load_documents)
 
         self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 3})
 
-        self.llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
+        self.llm = get_chat_model("gpt-4o-mini", 0.2)
         
         template = """You are a Wealth Manager at DBS.
         Based on the client's profile, recommend suitable financial products.
@@ -72,30 +58,42 @@ class WealthAdvisor:
         
         prompt = ChatPromptTemplate.from_template(template)
         
-        # --- THE FIX IS HERE ---
-        # We use itemgetter to grab specific keys from the input dictionary
-        self.chain = (
-            {
-                "context": itemgetter("query") | self.retriever, 
-                "income": itemgetter("income"), 
-                "risk_profile": itemgetter("risk_profile")
-            }
-            | prompt
-            | self.llm
-            | StrOutputParser()
-        )
+        # Retrieval runs separately in recommend() so it can be timed on its own
+        self.chain = prompt | self.llm | StrOutputParser()
+
+    @staticmethod
+    def _load_documents():
+        logger.info("💼 Wealth Advisor: Indexing Products (One-time)...")
+
+        if not os.path.exists(PRODUCT_FILE):
+            raise FileNotFoundError(f"❌ {PRODUCT_FILE} not found. Please create the product list.")
+
+        loader = TextLoader(PRODUCT_FILE)
+        docs = loader.load()
+
+        text_splitter = CharacterTextSplitter(separator="---", chunk_size=500, chunk_overlap=0)
+        return text_splitter.split_documents(docs)
 
     def recommend(self, income, risk_profile):
-        print(f"💼 Wealth Advisor: Finding products for {risk_profile} profile...")
+        logger.info("💼 Wealth Advisor: Finding products for %s profile...", risk_profile)
         
         query = f"{risk_profile} Investment Products"
+
+        with span("wealth_retrieval"):
+            products = call_with_policy("openai", self.retriever.invoke, query, tokens=estimate_tokens(query, 0))
         
-        # We pass a dictionary with 'query', 'income', and 'risk_profile'
-        response = self.chain.invoke({
-            "query": query, 
-            "income": str(income),
-            "risk_profile": risk_profile
-        })
+        # We pass a dictionary with 'context', 'income', and 'risk_profile'
+        with span("wealth_generation"), track_llm_usage("wealth_plan"):
+            response = call_with_policy(
+                "openai",
+                self.chain.invoke,
+                {
+                    "context": products,
+                    "income": str(income),
+                    "risk_profile": risk_profile
+                },
+                tokens=estimate_tokens("".join(d.page_content for d in products)),
+            )
         return response
 
 if __name__ == "__main__":
@@ -7,16 +7,19 @@ class TransactionItem(BaseModel):
     description: str = Field(description="Description of the transaction (Merchant name, etc.)")
     amount: float = Field(description="The monetary amount")
     type: str = Field(description="Type of transaction: 'CREDIT' (Deposit) or 'DEBIT' (Withdrawal)")
+    balance: Optional[float] = Field(
+        default=None,
+        description="Running balance printed on the row if the statement has a Balance column, else null"
+    )
 
 # This defines the "Shape" of the data we expect from the Bank Statement
 class FinancialExtraction(BaseModel):
     client_name: str = Field(description="Name of the client found in the document header")
     account_number: str = Field(description="Account number if found, else 'Unknown'")
     statement_date: str = Field(description="Date of the statement in YYYY-MM-DD format")
-    
-    # Robustness Feature: Force these to be Floats (Numbers), not Strings
-    total_income: float = Field(description="Sum of all CREDIT transactions (Salary, Dividends, etc)")
-    total_expenditure: float = Field(description="Sum of all DEBIT transactions")
+
+    # NOTE: total_income / total_expenditure are NOT asked from the LLM.
+    # They are computed deterministically from 'transactions' by StatementReconciler.
     
     # Robustness Feature: Constrain the AI to specific choices
     source_of_wealth: str = Field(
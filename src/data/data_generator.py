@@ -1,8 +1,18 @@
+import argparse
+import csv
+import os
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import random
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from faker import Faker
 from datetime import datetime, timedelta
 
+# Merchant catalogue (shared with the merchant normalizer in src/risk)
+from src.data.merchants import LIFESTYLE, RISK_SCENARIOS, TXN_CODES
+
 fake = Faker()
 random.seed(42)
 Faker.seed(42)
@@ -11,73 +21,73 @@ Faker.seed(42)
 NUM_CLIENTS = 50
 RISK_RATIO = 0.2  # 20% High Risk
 
-# Suspicious Categories
-RISK_SCENARIOS = {
-    "STRUCTURING": ["Cash Deposit ATM", "Cash Deposit Branch"], 
-    "CRYPTO_EXIT": ["BINANCE HOLDINGS LTD", "COINBASE IRELAND", "LUNO PTE LTD"],
-    "GAMBLING": ["MBS CASINO CASHIER", "RESORTS WORLD SENTOSA", "SG POOLS (PRIVATE) LTD"],
-    "SANCTIONED": ["TEHRAN TRADING", "PYONGYANG IMPORT", "MOSCOW GENERAL TRADING"]
-}
-
-# Safe Lifestyle Categories (Mapped to messy variants)
-LIFESTYLE = {
-    "Dining": [
-        "POS - TOAST BOX SG", "STARBUCKS COFFEE SINGAPORE", "MCDONALDS - JEWEL", 
-        "DIN TAI FUNG - PARAGON", "JUMBO SEAFOOD RIVERSIDE", "GRABFOOD SINGAPORE"
-    ],
-    "Shopping": [
-        "UNIQLO ORCHARD CENTRAL", "SHOPEE PAY SINGAPORE", "LAZADA SINGAPORE", 
-        "WATSONS PERSONAL CARE", "ZARA ION ORCHARD", "NTUC FAIRPRICE FIN"
-    ],
-    "Transport": [
-        "GRAB - TRANSPORT", "GOJEK SINGAPORE", "SIMPLYGO TRANSIT", 
-        "COMFORTDELGRO TAXI", "SHELL STATION"
-    ],
-    "Services": [
-        "SINGTEL MY BILL", "SP SERVICES UTILITY", "NETFLIX.COM PREM", 
-        "SPOTIFY SINGAPORE", "CLOUDFLARE INC", "APPLE SERVICES"
-    ]
-}
-
-# Transaction Codes for Noise
-TXN_CODES = ["MST", "POS", "ATW", "ITR", "DD"] 
-
-def generate_messy_description(base_name):
+# --- Scale-out Configuration (sharded mode) ---
+SHARD_SIZE = 10_000        # Clients per shard (one output file per shard)
+ROW_GROUP_SIZE = 100_000   # Transactions buffered before a row group is flushed
+NAME_POOL_SIZE = 5_000     # Pre-sampled Faker names/companies (Faker is too slow for hot loops)
+
+# Pre-computed key lists (avoid rebuilding them for every transaction)
+RISK_TYPES = list(RISK_SCENARIOS.keys())
+LIFESTYLE_KEYS = list(LIFESTYLE.keys())
+
+TXN_COLUMNS = ["Client_ID", "Date", "Description", "Amount", "Type", "Category", "Balance"]
+CLIENT_COLUMNS = ["Client_ID", "Name", "Reported_Income", "Is_High_Risk", "Risk_Type"]
+
+TXN_SCHEMA = pa.schema([
+    ("Client_ID", pa.string()), ("Date", pa.string()), ("Description", pa.string()),
+    ("Amount", pa.float64()), ("Type", pa.string()), ("Category", pa.string()), ("Balance", pa.float64()),
+])
+CLIENT_SCHEMA = pa.schema([
+    ("Client_ID", pa.string()), ("Name", pa.string()), ("Reported_Income", pa.float64()),
+    ("Is_High_Risk", pa.bool_()), ("Risk_Type", pa.string()),
+])
+
+def generate_messy_description(base_name, rng=random):
     """Injects random noise into merchant names to mimic real statements."""
     # If it's already a long messy name (like from LIFESTYLE), maybe just add a code
     # If it's a short risk name (like "Binance"), make it messier
     
-    code = random.choice(TXN_CODES)
-    ref_num = random.randint(100000, 999999)
+    code = rng.choice(TXN_CODES)
+    ref_num = rng.randint(100000, 999999)
     
     # 30% chance of being 'clean', 70% chance of being 'messy'
-    if random.random() < 0.3:
+    if rng.random() < 0.3:
         return base_name
     else:
         return f"{code} {base_name} REF-{ref_num}"
 
-def generate_smart_profile(client_id):
-    is_risky = random.random() < RISK_RATIO
-    income = round(random.uniform(3000, 12000), -2)
+def generate_smart_profile(client_id, rng=random, name_pool=None):
+    """`rng`/`name_pool` let sharded workers use their own seeded state instead of the globals."""
+    is_risky = rng.random() < RISK_RATIO
+    income = round(rng.uniform(3000, 12000), -2)
     
     return {
         "Client_ID": client_id,
-        "Name": fake.name(),
+        "Name": rng.choice(name_pool) if name_pool else fake.name(),
         "Reported_Income": income,
         "Is_High_Risk": is_risky,
-        "Risk_Type": random.choice(list(RISK_SCENARIOS.keys())) if is_risky else "None"
+        "Risk_Type": rng.choice(RISK_TYPES) if is_risky else "None"
     }
 
-def generate_smart_transactions(client):
+@lru_cache(maxsize=8)
+def day_labels(start_date):
+    """'YYYY-MM-DD' strings for start_date + 0..31 days (strftime is hot at millions of rows)."""
+    return [(start_date + timedelta(days=d)).strftime("%Y-%m-%d") for d in range(32)]
+
+def generate_smart_transactions(client, rng=random, company_pool=None, start_date=None):
     transactions = []
     income = client["Reported_Income"]
+    company = rng.choice(company_pool) if company_pool else fake.company().upper()
     
     # 1. Salary Credit (Day 1)
-    start_date = datetime.now() - timedelta(days=30)
+    # A fixed start_date makes output reproducible across runs
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start_date = start_date or (today - timedelta(days=30))
+    dates = day_labels(start_date)
     transactions.append({
         "Client_ID": client["Client_ID"],
-        "Date": (start_date + timedelta(days=1)).strftime("%Y-%m-%d"),
-        "Description": f"GIRO SALARY CREDIT - {fake.company().upper()}",
+        "Date": dates[1],
+        "Description": f"GIRO SALARY CREDIT - {company}",
         "Amount": income,
         "Type": "CREDIT",
         "Category": "Income",
@@ -86,9 +96,9 @@ def generate_smart_transactions(client):
 
     # 2. Set Spend Targets
     if client["Is_High_Risk"]:
-        target_spend_ratio = random.uniform(0.7, 1.5) 
+        target_spend_ratio = rng.uniform(0.7, 1.5) 
     else:
-        target_spend_ratio = random.uniform(0.3, 0.55) 
+        target_spend_ratio = rng.uniform(0.3, 0.55) 
 
     target_spend = income * target_spend_ratio
     current_spend = 0
@@ -98,16 +108,16 @@ def generate_smart_transactions(client):
     # If client is a "STRUCTURING" risk, we force multiple deposits just under $5k
     if client["Is_High_Risk"] and client["Risk_Type"] == "STRUCTURING":
         # Create 3-4 large cash deposits
-        for _ in range(random.randint(3, 4)):
-            day_offset += random.randint(1, 5)
+        for _ in range(rng.randint(3, 4)):
+            day_offset += rng.randint(1, 5)
             if day_offset > 28: break
             
             # Amount is suspiciously close to $5,000 (e.g., $4,850)
-            structuring_amount = round(random.uniform(4500, 4950), 0)
+            structuring_amount = round(rng.uniform(4500, 4950), 0)
             
             transactions.append({
                 "Client_ID": client["Client_ID"],
-                "Date": (start_date + timedelta(days=day_offset)).strftime("%Y-%m-%d"),
+                "Date": dates[day_offset],
                 "Description": "CASH DEPOSIT BRANCH A", # Clean desc for deposit is common
                 "Amount": structuring_amount,
                 "Type": "CREDIT", # It's money coming IN (Placement stage of Laundering)
@@ -117,26 +127,26 @@ def generate_smart_transactions(client):
 
     # 3. Generate Normal/Risky Spending
     while current_spend < target_spend:
-        day_offset += random.randint(1, 3)
+        day_offset += rng.randint(1, 3)
         if day_offset > 28: break 
 
         is_risk_txn = False
         # If Risky Client (but NOT Structuring type, as that is deposit-heavy), add bad spending
         if client["Is_High_Risk"] and client["Risk_Type"] != "STRUCTURING":
-            if random.random() < 0.3:
+            if rng.random() < 0.3:
                 is_risk_txn = True
         
         if is_risk_txn:
             risk_cat = client["Risk_Type"]
-            base_merchant = random.choice(RISK_SCENARIOS[risk_cat])
-            merchant = generate_messy_description(base_merchant)
-            amount = round(random.uniform(500, 3000), 0)
+            base_merchant = rng.choice(RISK_SCENARIOS[risk_cat])
+            merchant = generate_messy_description(base_merchant, rng)
+            amount = round(rng.uniform(500, 3000), 0)
             category = "High Risk"
         else:
-            cat_key = random.choice(list(LIFESTYLE.keys()))
-            base_merchant = random.choice(LIFESTYLE[cat_key])
-            merchant = generate_messy_description(base_merchant) # Add noise!
-            amount = round(random.uniform(10, 150), 2)
+            cat_key = rng.choice(LIFESTYLE_KEYS)
+            base_merchant = rng.choice(LIFESTYLE[cat_key])
+            merchant = generate_messy_description(base_merchant, rng) # Add noise!
+            amount = round(rng.uniform(10, 150), 2)
             category = cat_key
 
         if (current_spend + amount) > (target_spend * 1.1):
@@ -144,7 +154,7 @@ def generate_smart_transactions(client):
 
         transactions.append({
             "Client_ID": client["Client_ID"],
-            "Date": (start_date + timedelta(days=day_offset)).strftime("%Y-%m-%d"),
+            "Date": dates[day_offset],
             "Description": merchant,
             "Amount": amount,
             "Type": "DEBIT",
@@ -154,7 +164,7 @@ def generate_smart_transactions(client):
         current_spend += amount
 
     # 4. Calculate Running Balance
-    balance = random.uniform(5000, 20000)
+    balance = rng.uniform(5000, 20000)
     transactions.sort(key=lambda x: x['Date'])
     
     final_txns = []
@@ -169,19 +179,158 @@ def generate_smart_transactions(client):
         
     return final_txns
 
+# --- Sharded / Streaming Mode (multi-million rows) ---
+
+class RowSink:
+    """
+    Streams dict rows to one Parquet or CSV file.
+    Rows are buffered column-wise and flushed every `row_group_size` rows,
+    so memory stays flat no matter how many rows a shard produces.
+    """
+
+    def __init__(self, path, columns, schema, fmt, row_group_size=ROW_GROUP_SIZE):
+        self.columns = columns
+        self.schema = schema
+        self.fmt = fmt
+        self.row_group_size = row_group_size
+        self.rows_written = 0
+        self._buffer = {col: [] for col in columns}
+        self._buffered = 0
+
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(path, schema)
+        else:
+            self._file = open(path, "w", newline="")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(columns)
+
+    def write(self, row):
+        for col in self.columns:
+            self._buffer[col].append(row[col])
+        self._buffered += 1
+        if self._buffered >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffered:
+            return
+        if self.fmt == "parquet":
+            self._writer.write_table(pa.table(self._buffer, schema=self.schema))
+        else:
+            self._writer.writerows(zip(*(self._buffer[col] for col in self.columns)))
+        self.rows_written += self._buffered
+        self._buffer = {col: [] for col in self.columns}
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+        if self.fmt == "parquet":
+            self._writer.close()
+        else:
+            self._file.close()
+
+
+def build_name_pools(seed, size=NAME_POOL_SIZE):
+    """Samples Faker once up front; hot loops then draw from plain lists."""
+    pool_fake = Faker()
+    pool_fake.seed_instance(seed)
+    names = [pool_fake.name() for _ in range(size)]
+    companies = [pool_fake.company().upper() for _ in range(size)]
+    return names, companies
+
+
+def client_id_for(index, num_clients):
+    # Keep the original C001 style, widening only when the corpus needs it
+    width = max(3, len(str(num_clients)))
+    return f"C{index:0{width}d}"
+
+
+def _generate_shard(task):
+    """Worker: generates clients [first, last] with an RNG seeded from (seed, shard_index)."""
+    shard_index, first, last, num_clients, out_dir, fmt, seed, start_date, name_pool, company_pool, row_group_size = task
+
+    # Same seed + same shard boundaries => byte-identical shard, regardless of worker count
+    rng = random.Random(f"{seed}-shard-{shard_index}")
+    ext = "parquet" if fmt == "parquet" else "csv"
+
+    txn_sink = RowSink(os.path.join(out_dir, "transactions", f"part-{shard_index:05d}.{ext}"),
+                       TXN_COLUMNS, TXN_SCHEMA, fmt, row_group_size)
+    client_sink = RowSink(os.path.join(out_dir, "clients", f"part-{shard_index:05d}.{ext}"),
+                          CLIENT_COLUMNS, CLIENT_SCHEMA, fmt, row_group_size)
+    try:
+        for i in range(first, last + 1):
+            client = generate_smart_profile(client_id_for(i, num_clients), rng, name_pool)
+            client_sink.write(client)
+            for txn in generate_smart_transactions(client, rng, company_pool, start_date):
+                txn_sink.write(txn)
+    finally:
+        txn_sink.close()
+        client_sink.close()
+
+    return shard_index, client_sink.rows_written, txn_sink.rows_written
+
+
+def generate_sharded(num_clients, out_dir, fmt="parquet", workers=None, shard_size=SHARD_SIZE,
+                     seed=42, start_date=None, row_group_size=ROW_GROUP_SIZE):
+    """
+    Generates `num_clients` clients across worker processes.
+    Output: <out_dir>/clients/part-NNNNN.<ext> and <out_dir>/transactions/part-NNNNN.<ext>
+    """
+    start_date = start_date or datetime(2024, 1, 1)
+    os.makedirs(os.path.join(out_dir, "clients"), exist_ok=True)
+    os.makedirs(os.path.join(out_dir, "transactions"), exist_ok=True)
+
+    name_pool, company_pool = build_name_pools(seed)
+
+    tasks = []
+    for shard_index, first in enumerate(range(1, num_clients + 1, shard_size)):
+        last = min(first + shard_size - 1, num_clients)
+        tasks.append((shard_index, first, last, num_clients, out_dir, fmt, seed, start_date,
+                      name_pool, company_pool, row_group_size))
+
+    total_clients = total_txns = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for shard_index, n_clients, n_txns in pool.map(_generate_shard, tasks):
+            total_clients += n_clients
+            total_txns += n_txns
+            print(f"   ...shard {shard_index:05d}: {n_clients} clients, {n_txns} transactions")
+
+    return total_clients, total_txns
+
+
 # --- Execution ---
 if __name__ == "__main__":
-    print(f"🚀 Generating NOISY & STRUCTURING synthetic data...")
-    all_clients = []
-    all_txns = []
-
-    for i in range(1, NUM_CLIENTS + 1):
-        client = generate_smart_profile(f"C{i:03d}")
-        txns = generate_smart_transactions(client)
-        all_clients.append(client)
-        all_txns.extend(txns)
-
-    pd.DataFrame(all_clients).to_csv("synthetic_clients_master.csv", index=False)
-    pd.DataFrame(all_txns).to_csv("synthetic_transaction_log.csv", index=False)
-    
-    print("✅ Done! Data is now messy (OCR-ready) and contains Smurfing attacks.")
\ No newline at end of file
+    cli = argparse.ArgumentParser(description="Generate synthetic clients and transactions.")
+    cli.add_argument("--clients", type=int, default=NUM_CLIENTS)
+    cli.add_argument("--out", help="Output folder. Enables sharded streaming mode (default: legacy single CSV)")
+    cli.add_argument("--format", choices=["parquet", "csv"], default="parquet")
+    cli.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    cli.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    cli.add_argument("--row-group-size", type=int, default=ROW_GROUP_SIZE)
+    cli.add_argument("--seed", type=int, default=42)
+    cli.add_argument("--start-date", default="2024-01-01", help="Statement period anchor (YYYY-MM-DD)")
+    args = cli.parse_args()
+
+    if args.out:
+        print(f"🚀 Generating {args.clients:,} clients into '{args.out}' ({args.format})...")
+        n_clients, n_txns = generate_sharded(
+            args.clients, args.out, fmt=args.format, workers=args.workers, shard_size=args.shard_size,
+            seed=args.seed, start_date=datetime.strptime(args.start_date, "%Y-%m-%d"),
+            row_group_size=args.row_group_size,
+        )
+        print(f"✅ Done! {n_clients:,} clients, {n_txns:,} transactions.")
+    else:
+        print(f"🚀 Generating NOISY & STRUCTURING synthetic data...")
+        all_clients = []
+        all_txns = []
+
+        for i in range(1, args.clients + 1):
+            client = generate_smart_profile(f"C{i:03d}")
+            txns = generate_smart_transactions(client)
+            all_clients.append(client)
+            all_txns.extend(txns)
+
+        pd.DataFrame(all_clients).to_csv("synthetic_clients_master.csv", index=False)
+        pd.DataFrame(all_txns).to_csv("synthetic_transaction_log.csv", index=False)
+        
+        print("✅ Done! Data is now messy (OCR-ready) and contains Smurfing attacks.")
@@ -0,0 +1,61 @@
+"""
+Merchant catalogue: the canonical counterparty names used by data_generator and
+resolved by src/risk/merchant_normalizer.py. Keys are merchant categories.
+"""
+
+# Suspicious Categories
+RISK_SCENARIOS = {
+    "STRUCTURING": ["Cash Deposit ATM", "Cash Deposit Branch"], 
+    "CRYPTO_EXIT": ["BINANCE HOLDINGS LTD", "COINBASE IRELAND", "LUNO PTE LTD"],
+    "GAMBLING": ["MBS CASINO CASHIER", "RESORTS WORLD SENTOSA", "SG POOLS (PRIVATE) LTD"],
+    "SANCTIONED": ["TEHRAN TRADING", "PYONGYANG IMPORT", "MOSCOW GENERAL TRADING"]
+}
+
+# Safe Lifestyle Categories (Mapped to messy variants)
+LIFESTYLE = {
+    "Dining": [
+        "POS - TOAST BOX SG", "STARBUCKS COFFEE SINGAPORE", "MCDONALDS - JEWEL", 
+        "DIN TAI FUNG - PARAGON", "JUMBO SEAFOOD RIVERSIDE", "GRABFOOD SINGAPORE"
+    ],
+    "Shopping": [
+        "UNIQLO ORCHARD CENTRAL", "SHOPEE PAY SINGAPORE", "LAZADA SINGAPORE", 
+        "WATSONS PERSONAL CARE", "ZARA ION ORCHARD", "NTUC FAIRPRICE FIN"
+    ],
+    "Transport": [
+        "GRAB - TRANSPORT", "GOJEK SINGAPORE", "SIMPLYGO TRANSIT", 
+        "COMFORTDELGRO TAXI", "SHELL STATION"
+    ],
+    "Services": [
+        "SINGTEL MY BILL", "SP SERVICES UTILITY", "NETFLIX.COM PREM", 
+        "SPOTIFY SINGAPORE", "CLOUDFLARE INC", "APPLE SERVICES"
+    ]
+}
+
+# Other spellings of catalogued merchants seen on statements (cleaned form -> catalogue name).
+# Only these and the exact catalogue names carry a merchant category; see merchant_normalizer.
+MERCHANT_ALIASES = {
+    "BINANCE": "BINANCE HOLDINGS LTD",
+    "BINANCE HOLDINGS": "BINANCE HOLDINGS LTD",
+    "COINBASE": "COINBASE IRELAND",
+    "LUNO": "LUNO PTE LTD",
+    "MBS CASINO": "MBS CASINO CASHIER",
+    "MARINA BAY SANDS CASINO": "MBS CASINO CASHIER",
+    "RWS CASINO": "RESORTS WORLD SENTOSA",
+    "SG POOLS": "SG POOLS (PRIVATE) LTD",
+    "SINGAPORE POOLS": "SG POOLS (PRIVATE) LTD",
+    "TEHRAN TRADING CO": "TEHRAN TRADING",
+    "TEHRAN TRADING COMPANY": "TEHRAN TRADING",
+    "PYONGYANG IMPORT EXPORT": "PYONGYANG IMPORT",
+    "MOSCOW GENERAL TRADING CO": "MOSCOW GENERAL TRADING",
+}
+
+# Transaction Codes for Noise
+TXN_CODES = ["MST", "POS", "ATW", "ITR", "DD"] 
+
+# Category of every catalogued merchant, e.g. "BINANCE HOLDINGS LTD" -> "CRYPTO_EXIT"
+MERCHANT_CATEGORIES = {
+    merchant: category
+    for catalogue in (RISK_SCENARIOS, LIFESTYLE)
+    for category, merchants in catalogue.items()
+    for merchant in merchants
+}
@@ -1,24 +1,47 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from llama_parse import LlamaParse
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 
 # Import your new strict data model
 from src.data.data_contract import FinancialExtraction
+from src.risk.reconciliation import StatementReconciler
+from src.monitoring.telemetry import get_logger, span, track_llm_usage
+from src.io.service_clients import call_with_policy, estimate_tokens, get_chat_model, get_llama_parser
+from src.io.page_ocr import PAGES_PER_CHUNK, PAGE_WORKERS, merge_extractions, ocr_and_extract
+from src.io.markdown_compactor import TOKEN_BUDGET, compact_markdown
+from src.io.prescreen import PRESCREEN_ENABLED, prescreen_markdown
 
 load_dotenv()
 
-# Setup LlamaParse
-# result_type="markdown" is best for tables
-parser = LlamaParse(result_type="markdown", verbose=True, language="en")
+logger = get_logger("extractor")
 
-# Setup LLM with Structured Output (The Robust Fix)
-# We use temperature=0 for maximum determinism
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+# Clients are created on first use so this module can be imported
+# (e.g. by the offline benchmarks) without LlamaCloud/OpenAI credentials.
+_parser = None
+_structured_llm = None
 
-# This is the Magic Line: "Bind" the model to the Pydantic class
-structured_llm = llm.with_structured_output(FinancialExtraction)
+def get_parser():
+    global _parser
+    if _parser is None:
+        # Setup LlamaParse (shared pooled client from the registry)
+        # result_type="markdown" is best for tables
+        _parser = get_llama_parser(result_type="markdown", language="en")
+    return _parser
+
+def get_structured_llm():
+    global _structured_llm
+    if _structured_llm is None:
+        # Setup LLM with Structured Output (The Robust Fix)
+        # We use temperature=0 for maximum determinism
+        llm = get_chat_model("gpt-4o-mini", 0.0)
+
+        # This is the Magic Line: "Bind" the model to the Pydantic class
+        _structured_llm = llm.with_structured_output(FinancialExtraction)
+    return _structured_llm
+
+# Totals and balance checks are done in Python, not by the LLM
+reconciler = StatementReconciler()
 
 # Define Prompt
 extraction_prompt = ChatPromptTemplate.from_template(
@@ -32,34 +55,103 @@ extraction_prompt = ChatPromptTemplate.from_template(
     INSTRUCTIONS:
     1. Scan for 'Salary' or recurring large deposits to determine Source of Wealth.
     2. Scan for High Risk keywords: Crypto, Binance, Coinbase, Casino, MBS, Betting.
-    3. Calculate totals (Income vs Expenditure) precisely based on the transactions.
-    4. EXTRACT THE FULL LIST OF TRANSACTIONS into the 'transactions' list.
+    3. EXTRACT THE FULL LIST OF TRANSACTIONS into the 'transactions' list, in statement order.
        - Ensure the 'amount' is a number (no $ symbols).
        - Ensure 'type' is either CREDIT or DEBIT.
+       - If the table has a Balance column, copy it into 'balance' (number, no $ symbols).
+       - Tables may be compacted to one 'date;description;amount;type;balance' line per row.
     """
 )
 
-def extract_data(pdf_path):
-    print(f"📄 Processing: {pdf_path}...")
-    
+def extract_data(pdf_path, parser=None, structured_llm=None, pages_per_chunk=PAGES_PER_CHUNK,
+                 token_budget=TOKEN_BUDGET, prescreen=PRESCREEN_ENABLED):
+    """
+    OCR + LLM extraction. `parser`/`structured_llm` override the default LlamaParse/OpenAI clients.
+    Statements longer than `pages_per_chunk` pages are OCR'd and extracted per page range in parallel.
+    OCR markdown is compacted and split to at most `token_budget` input tokens per LLM call.
+    With `prescreen`, markdown that already shows hard-reject evidence (structuring, sanctioned
+    counterparties) skips the LLM and returns the regex-parsed rows, marked data["prescreen"]["partial"].
+    """
+    logger.info("📄 Processing: %s...", pdf_path)
+    parser = parser or get_parser()
+    structured_llm = structured_llm or get_structured_llm()
+    chain = extraction_prompt | structured_llm
+    compactions = []
+    screens = []
+
+    def ocr(path):
+        documents = call_with_policy("llamaparse", parser.load_data, path)
+        return "\n".join([doc.text for doc in documents])
+
+    def invoke(text):
+        # The result is now a Pydantic Object (FinancialExtraction)
+        with track_llm_usage("extraction"):
+            return call_with_policy("openai", chain.invoke, {"context": text}, tokens=estimate_tokens(text))
+
+    def extract(text):
+        if prescreen:
+            with span("prescreen"):
+                screen = prescreen_markdown(text)
+            if screen.decisive:
+                screens.append(screen)
+                logger.info("   🚨 Pre-screen: %s in %d rows. Skipping LLM extraction.", ", ".join(screen.rules), screen.rows)
+                return screen.extraction
+        with span("compaction"):
+            compacted = compact_markdown(text, token_budget)
+        compactions.append(compacted)
+        if len(compacted.parts) == 1:
+            return invoke(compacted.parts[0])
+        with ThreadPoolExecutor(max_workers=min(len(compacted.parts), PAGE_WORKERS)) as pool:
+            return merge_extractions(list(pool.map(invoke, compacted.parts)))
+
     try:
-        # Phase 1: OCR (Vision)
-        print("   ...Sending to LlamaCloud for OCR...")
-        documents = parser.load_data(pdf_path)
-        raw_text = "\n".join([doc.text for doc in documents])
-        
-        # Phase 2: Extraction with Validation
-        print("   ...Analyzing with Validated Schema...")
-        chain = extraction_prompt | structured_llm
+        # Phase 1+2 (long statements): page ranges are OCR'd and extracted concurrently
+        paged = ocr_and_extract(pdf_path, ocr, extract, pages_per_chunk)
+
+        if paged:
+            result, raw_text = paged
+        else:
+            # Phase 1: OCR (Vision)
+            logger.info("   ...Sending to LlamaCloud for OCR...")
+            with span("ocr"):
+                raw_text = ocr(pdf_path)
+
+            # Phase 2: Extraction with Validation
+            logger.info("   ...Analyzing with Validated Schema...")
+            with span("llm_extraction"):
+                result = extract(raw_text)
         
-        # The result is now a Pydantic Object (FinancialExtraction)
-        result = chain.invoke({"context": raw_text})
+        # Phase 3: Deterministic totals + balance reconciliation
+        with span("reconciliation"):
+            data = reconciler.reconcile(result.model_dump())
+        if data["reconciliation"]["status"] == "MISMATCH":
+            logger.warning("   ⚠️ Balance mismatch on %d row(s).", len(data["reconciliation"]["mismatches"]))
+
+        before = sum(c.tokens_before for c in compactions)
+        after = sum(c.tokens_after for c in compactions)
+        data["compaction"] = {
+            "tokens_before": before,
+            "tokens_after": after,
+            "tokens_saved": before - after,
+            "llm_calls": sum(len(c.parts) for c in compactions),
+        }
+        logger.info("   ✂️ Compaction: %d -> %d input tokens (%d saved)", before, after, before - after)
+
+        if screens:
+            # Some or all of the rows were read without the LLM: enough to reject, not a full extraction
+            data["prescreen"] = {
+                "decisive": True,
+                "partial": True,
+                "rules": sorted({rule for screen in screens for rule in screen.rules}),
+                "reasons": [reason for screen in screens for reason in screen.reasons],
+                "llm_calls_skipped": len(screens),
+            }
         
-        # Convert back to a clean dictionary for the rest of your app
-        return result.model_dump()
+        # Return a clean dictionary for the rest of your app
+        return data
         
     except Exception as e:
-        print(f"❌ CRITICAL ERROR in Extraction: {e}")
+        logger.error("❌ CRITICAL ERROR in Extraction: %s", e)
         return None
 
 if __name__ == "__main__":
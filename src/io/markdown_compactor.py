@@ -0,0 +1,167 @@
+"""
+Compacts OCR markdown before it is sent to the extraction LLM.
+
+- Pipe tables become one 'date;description;amount;type;balance' line per row
+  (no padding, no separator rows, no '$' or thousands separators).
+- The column header that LlamaParse repeats on every page is kept once.
+- Page furniture is dropped: boilerplate (footers, disclaimers, page numbers) and
+  statement header lines repeated on later pages. Any other repeated line is kept, so
+  duplicate transactions laid out as text (not a table) survive.
+- The result is cut into parts of at most `budget_tokens` input tokens, each part
+  carrying the statement header, so no row is ever truncated to fit the budget
+  (a part always holds at least one row, even if header + row exceed a tiny budget).
+
+Tokens are counted with tiktoken (o200k_base, the gpt-4o tokenizer) when its encoding
+is available, else with a regex approximation of the same boundaries.
+"""
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from src.monitoring.telemetry import get_logger, record_compaction
+
+logger = get_logger("markdown_compactor")
+
+TOKEN_BUDGET = int(os.getenv("SENTINEL_EXTRACTION_TOKEN_BUDGET", 12_000))
+TOKENIZER = os.getenv("SENTINEL_TOKENIZER", "o200k_base")
+
+BOILERPLATE_RE = re.compile(
+    r"^(?:end of statement|computer generated|page \d+(?: of \d+)?|this statement is|please (?:examine|notify|check)"
+    r"|.*\bdeposit insurance\b|.*\bterms and conditions\b|continued on next page)",
+    re.I,
+)
+SEPARATOR_RE = re.compile(r"^\|?\s*:?-{2,}")
+MONEY_RE = re.compile(r"^\(?-?\$?\s*-?[\d,]+(?:\.\d+)?\)?$")
+APPROX_TOKEN_RE = re.compile(r"\d{1,3}|[A-Za-z]+|[^\w\s]")
+
+Compaction = namedtuple("Compaction", ["parts", "tokens_before", "tokens_after", "rows", "dropped_lines"])
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(TOKENIZER)
+    except Exception as exc:
+        logger.warning("   ⚠️ tiktoken encoding %s unavailable (%s); using approximate token counts", TOKENIZER, type(exc).__name__)
+        return None
+
+
+def count_tokens(text):
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(APPROX_TOKEN_RE.findall(text))
+
+
+def _cell(value):
+    value = value.strip().strip("*").strip()
+    if MONEY_RE.match(value):
+        negative = value.startswith(("-", "(", "$-"))
+        value = value.strip("()$- ").replace(",", "").replace("$", "")
+        return f"-{value}" if negative else value
+    return value.replace(";", ",")
+
+
+def _split_row(line):
+    return [cell for cell in line.strip().strip("|").split("|")]
+
+
+def compact_lines(markdown):
+    """
+    Keeps every table row and every line that is not page furniture (see the module
+    docstring); returns (header_lines, body_lines, rows, dropped).
+    """
+    header, body = [], []
+    header_seen = set()
+    table_header = None
+    rows = dropped = 0
+
+    for raw in markdown.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        if line.startswith("|"):
+            if SEPARATOR_RE.match(line):
+                dropped += 1
+                continue
+            cells = [_cell(c) for c in _split_row(line)]
+            key = tuple(c.lower() for c in cells)
+            if table_header is None and not any(ch.isdigit() for ch in line):
+                table_header = key
+                body.append("TABLE " + ";".join(c.lower() for c in cells))
+                continue
+            if key == table_header:
+                dropped += 1  # column header repeated on a later page
+                continue
+            body.append(";".join(cells))
+            rows += 1
+            continue
+
+        text = re.sub(r"\s+", " ", line.replace("**", "").lstrip("#").strip())
+        if not text or BOILERPLATE_RE.match(text) or text.lower() in header_seen:
+            dropped += 1  # footer, page number, or the statement header repeated on a later page
+            continue
+        if table_header is None:
+            # Lines before the first table are the statement header (name, account, date)
+            header_seen.add(text.lower())
+            header.append(text)
+        else:
+            body.append(text)
+    return header, body, rows, dropped
+
+
+def compact_markdown(markdown, budget_tokens=TOKEN_BUDGET):
+    """Compacts `markdown` and splits it into parts of at most `budget_tokens` tokens."""
+    tokens_before = count_tokens(markdown)
+    header, body, rows, dropped = compact_lines(markdown)
+
+    header_text = "\n".join(header)
+    header_tokens = count_tokens(header_text) + 1
+    table_line = next((line for line in body if line.startswith("TABLE ")), None)
+    table_tokens = count_tokens(table_line) + 1 if table_line else 0
+
+    parts, current, used, filled = [], [], header_tokens, False
+    for line in body:
+        cost = count_tokens(line) + 1
+        if filled and budget_tokens and used + cost > budget_tokens:
+            parts.append(current)
+            # Every part repeats the header and the column names so it stands alone
+            current, used = ([table_line] if table_line and line != table_line else []), header_tokens + table_tokens
+        current.append(line)
+        used += cost
+        filled = line is not table_line
+    parts.append(current)
+
+    texts = ["\n".join(([header_text] if header_text else []) + part) for part in parts]
+    tokens_after = sum(count_tokens(text) for text in texts)
+    record_compaction(tokens_before, tokens_after)
+    return Compaction(texts, tokens_before, tokens_after, rows, dropped)
+
+
+# --- Test Block ---
+if __name__ == "__main__":
+    sample = "\n".join([
+        "# DBS (Digital Bank Simulation) - eStatement", "",
+        "**Customer Name:** Jane Tan", "**Account Number:** 0123456789", "**Date:** 05 Mar 2024", "",
+        "| Date       | Description                    | Amount     | Type   | Balance     |",
+        "|------------|--------------------------------|------------|--------|-------------|",
+        "| 2024-03-01 | GIRO SALARY CREDIT - ACME      | $6,200.00  | CREDIT | $16,200.00  |",
+        "| 2024-03-02 | MST BINANCE HOLDINGS LTD REF-1 | $1,250.00  | DEBIT  | $14,950.00  |",
+        "", "Page 1 of 2", "# DBS (Digital Bank Simulation) - eStatement", "",
+        "| Date       | Description                    | Amount     | Type   | Balance     |",
+        "|------------|--------------------------------|------------|--------|-------------|",
+        "| 2024-03-04 | STARBUCKS COFFEE SINGAPORE     | $6.50      | DEBIT  | $14,943.50  |",
+        "", "End of Statement. Computer Generated.",
+    ])
+    result = compact_markdown(sample)
+    print(result.parts[0])
+    print(f"\n✅ {result.tokens_before} -> {result.tokens_after} tokens, {result.rows} rows, {result.dropped_lines} lines dropped")
+    assert result.rows == 3 and "2024-03-04;STARBUCKS COFFEE SINGAPORE;6.50;DEBIT;14943.50" in result.parts[0]
+
+    small = compact_markdown(sample, budget_tokens=100)
+    assert len(small.parts) > 1
+    assert all(count_tokens(p) <= 100 for p in small.parts) and all("Jane Tan" in p for p in small.parts)
+    print(f"✅ Budget 100: {len(small.parts)} parts, every part under budget with the header repeated.")
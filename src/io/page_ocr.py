@@ -0,0 +1,165 @@
+"""
+Page-level parallel OCR for long statements.
+
+A PDF longer than PAGES_PER_CHUNK pages is split into page ranges with pypdf. Each
+range is OCR'd and then extracted by the LLM in its own worker, so a range starts
+extracting as soon as its OCR returns. Wall-clock time drops from the sum of the
+page latencies to roughly the slowest range (bounded by PAGE_WORKERS and the
+llamaparse/openai limits in service_clients).
+
+The statement header (client name, account number, statement date) is parsed with
+regexes from page 1's OCR. It is only applied when the ranges are merged, where it takes
+precedence over the per-range LLM answers.
+"""
+import os
+import re
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from src.data.data_contract import FinancialExtraction
+from src.monitoring.telemetry import get_logger, span
+
+logger = get_logger("page_ocr")
+
+PAGES_PER_CHUNK = int(os.getenv("SENTINEL_OCR_PAGES_PER_CHUNK", 5))
+PAGE_WORKERS = int(os.getenv("SENTINEL_OCR_PAGE_WORKERS", 8))
+
+PageChunk = namedtuple("PageChunk", ["index", "first_page", "last_page", "path"])
+
+NAME_RE = re.compile(r"^\W*Customer Name\W*:?\W*\s*(.+?)\s*$", re.M | re.I)
+ACCOUNT_RE = re.compile(r"^\W*Account (?:Number|No\.?)\W*:?\W*\s*([\w-]+)", re.M | re.I)
+DATE_RE = re.compile(r"^\W*(?:Statement )?Date\W*:?\W*\s*([0-9A-Za-z ,/-]+?)\s*$", re.M | re.I)
+DATE_FORMATS = ("%d %b %Y", "%d %B %Y", "%Y-%m-%d", "%d/%m/%Y", "%b %d, %Y")
+
+SOURCE_PRIORITY = ["Salary", "Business", "Investments", "Inheritance"]
+
+
+def split_pdf(pdf_path, pages_per_chunk=PAGES_PER_CHUNK, out_dir=None):
+    """
+    Writes page ranges of `pdf_path` to `out_dir`; returns [PageChunk].
+    Short (or unreadable) files come back as one chunk pointing at the original path.
+    """
+    try:
+        from pypdf import PdfReader, PdfWriter
+        from pypdf.errors import PdfReadError
+    except ImportError:
+        logger.warning("   ⚠️ pypdf is not installed; %s is OCR'd in one piece", pdf_path)
+        return [PageChunk(0, 1, None, pdf_path)]
+
+    try:
+        reader = PdfReader(pdf_path)
+        page_count = len(reader.pages)
+    except PdfReadError as exc:
+        # Splitting is only an optimization: let the OCR service judge the file
+        logger.warning("   ⚠️ Cannot split %s (%s); OCR'ing it in one piece", pdf_path, exc)
+        return [PageChunk(0, 1, None, pdf_path)]
+    except OSError as exc:
+        # Not a local file (or not readable here); the OCR client reports real errors
+        logger.debug("   Cannot open %s for splitting (%s)", pdf_path, exc)
+        return [PageChunk(0, 1, None, pdf_path)]
+
+    if not pages_per_chunk or page_count <= pages_per_chunk:
+        return [PageChunk(0, 1, page_count, pdf_path)]
+
+    out_dir = out_dir or tempfile.mkdtemp(prefix="sentinel-pages-")
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    chunks = []
+    for index, first in enumerate(range(0, page_count, pages_per_chunk)):
+        last = min(first + pages_per_chunk, page_count)
+        writer = PdfWriter()
+        for page in reader.pages[first:last]:
+            writer.add_page(page)
+        path = os.path.join(out_dir, f"{stem}_p{first + 1:04d}-{last:04d}.pdf")
+        with open(path, "wb") as fh:
+            writer.write(fh)
+        chunks.append(PageChunk(index, first + 1, last, path))
+    return chunks
+
+
+def _normalize_date(value):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return value.strip()
+
+
+def parse_header(markdown):
+    """Deterministic header fields from page-1 markdown; missing fields are omitted."""
+    header = {}
+    name = NAME_RE.search(markdown)
+    if name:
+        header["client_name"] = name.group(1).strip("* ")
+    account = ACCOUNT_RE.search(markdown)
+    if account:
+        header["account_number"] = account.group(1)
+    date = DATE_RE.search(markdown)
+    if date:
+        header["statement_date"] = _normalize_date(date.group(1))
+    return header
+
+
+def merge_extractions(results, header=None):
+    """
+    Combines per-range FinancialExtraction results (in page order) into one statement.
+    Header regex fields win over LLM fields; transactions keep page order.
+    """
+    header = header or {}
+    merged = {"transactions": [], "risk_flags": []}
+    sources = set()
+    for result in results:
+        data = result.model_dump() if hasattr(result, "model_dump") else dict(result)
+        for field in ("client_name", "account_number", "statement_date"):
+            if field not in merged and data.get(field) and data[field] != "Unknown":
+                merged[field] = data[field]
+        sources.add(data.get("source_of_wealth", "Unknown"))
+        merged["transactions"].extend(data.get("transactions", []))
+        for flag in data.get("risk_flags", []):
+            if flag not in merged["risk_flags"]:
+                merged["risk_flags"].append(flag)
+
+    merged.update(header)
+    for field in ("client_name", "account_number", "statement_date"):
+        merged.setdefault(field, "Unknown")
+    merged["source_of_wealth"] = next((s for s in SOURCE_PRIORITY if s in sources), "Unknown")
+    return FinancialExtraction(**merged)
+
+
+def ocr_and_extract(pdf_path, load_page_range, extract_text, pages_per_chunk=PAGES_PER_CHUNK,
+                    max_workers=PAGE_WORKERS):
+    """
+    Runs `load_page_range(path) -> markdown` and then `extract_text(markdown) -> FinancialExtraction`
+    per page range, concurrently. Returns (merged FinancialExtraction, full markdown),
+    or None when the file is short enough for the single-shot path.
+    """
+    with tempfile.TemporaryDirectory(prefix="sentinel-pages-") as scratch:
+        chunks = split_pdf(pdf_path, pages_per_chunk, scratch)
+        if len(chunks) == 1:
+            return None
+        logger.info("   ...OCR of %d page ranges (%d pages each, %d workers)...", len(chunks), pages_per_chunk, max_workers)
+
+        header = {}
+
+        # Same span names as the single-shot path, so OCR/LLM latency is comparable across both
+        def work(chunk):
+            with span("ocr"):
+                markdown = load_page_range(chunk.path)
+            if chunk.first_page == 1:
+                header.update(parse_header(markdown))
+                logger.info("   🪪 Header from page 1: %s", header)
+            with span("llm_extraction"):
+                return markdown, extract_text(markdown)
+
+        texts = [None] * len(chunks)
+        results = [None] * len(chunks)
+        with span("paged_extraction"), ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(work, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                texts[chunk.index], results[chunk.index] = future.result()
+                logger.debug("   [pages] %d-%d done", chunk.first_page, chunk.last_page)
+
+    return merge_extractions(results, header), "\n".join(texts)
@@ -1,6 +1,9 @@
+import argparse
+import glob
 import pandas as pd
 import os
 import random
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
@@ -8,95 +11,164 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 
 OUTPUT_FOLDER = "synthetic_pdfs"
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
-def generate_pdfs():
+# Rows that fit on an A4 page with this layout (measured with long, wrapping descriptions).
+# Used to cap statements at --max-pages without laying the table out twice.
+FIRST_PAGE_ROWS = 20   # Bank header + customer block take the top of page 1
+ROWS_PER_PAGE = 23
+FOOTER_ROWS = 3        # Room kept for the truncation note and footer
+
+# --- Shared, precomputed layout (built once per process, reused by every statement) ---
+STYLES = getSampleStyleSheet()
+HEADER_STYLE = ParagraphStyle('Header', parent=STYLES['Heading1'], fontSize=18, textColor=colors.HexColor("#003366"))
+
+# [NEW] Style for Table Cells (Smaller font + word wrap enabled)
+CELL_STYLE = ParagraphStyle('Cell', parent=STYLES["BodyText"], fontSize=9, leading=11)  # leading = Line spacing
+
+TABLE_HEADER = ['Date', 'Description', 'Amount', 'Type', 'Balance']
+
+# [FIX] Adjusted widths to give Description (Index 1) more space
+# Total A4 printable width is approx ~450-500 depending on margins
+COL_WIDTHS = [65, 230, 80, 50, 80]
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+    ('TEXTCOLOR', (0,0), (-1,0), colors.black),
+    ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+    ('ALIGN', (2,1), (-1,-1), 'RIGHT'), # Align amounts right
+
+    # [FIX] VALIGN TOP ensures multi-line descriptions don't mess up the row alignment
+    ('VALIGN', (0,0), (-1,-1), 'TOP'),
+
+    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+    ('LEFTPADDING', (0,0), (-1,-1), 6),
+    ('RIGHTPADDING', (0,0), (-1,-1), 6),
+])
+
+def render_statement(pdf_name, c_name, txns, account_number=None, statement_date=None, max_pages=None):
+    """
+    Renders one eStatement PDF.
+    `txns` is a sequence of (Date, Description, Amount, Type, Balance) tuples
+    or dicts with those keys. `max_pages` caps the transaction table length.
+    """
+    doc = SimpleDocTemplate(pdf_name, pagesize=A4)
+    elements = []
+
+    account_number = account_number or random.randint(1000000000, 9999999999)
+    statement_date = statement_date or datetime.now().strftime('%d %b %Y')
+
+    truncated = 0
+    if max_pages:
+        max_rows = max(1, FIRST_PAGE_ROWS + (max_pages - 1) * ROWS_PER_PAGE - FOOTER_ROWS)
+        if len(txns) > max_rows:
+            truncated = len(txns) - max_rows
+            txns = txns[:max_rows]
+
+    # Header & Info
+    # Flowables keep layout state, so only the styles are shared - never the Paragraphs
+    elements.append(Paragraph("DBS (Digital Bank Simulation) - eStatement", HEADER_STYLE))
+    elements.append(Spacer(1, 12))
+
+    client_info = f"""
+    <b>Customer Name:</b> {c_name}<br/>
+    <b>Account Number:</b> {account_number}<br/>
+    <b>Date:</b> {statement_date}
+    """
+    elements.append(Paragraph(client_info, STYLES['Normal']))
+    elements.append(Spacer(1, 20))
+
+    # Table Data
+    data = [TABLE_HEADER]
+
+    for txn in txns:
+        if isinstance(txn, dict):
+            txn = (txn['Date'], txn['Description'], txn['Amount'], txn['Type'], txn['Balance'])
+        date, description, amount, txn_type, balance = txn
+
+        data.append([
+            date,
+            # [FIX] Wrap description in a Paragraph object so it wraps automatically
+            Paragraph(str(description), CELL_STYLE),
+            f"${amount:,.2f}",
+            txn_type,
+            f"${balance:,.2f}"
+        ])
+
+    # repeatRows=1 re-prints the column header on every page, like a real statement
+    t = Table(data, colWidths=COL_WIDTHS, repeatRows=1)
+    t.setStyle(TABLE_STYLE)
+    elements.append(t)
+
+    if truncated:
+        elements.append(Spacer(1, 12))
+        elements.append(Paragraph(f"{truncated} further transaction(s) omitted (statement capped at {max_pages} pages).", STYLES['Italic']))
+
+    elements.append(Spacer(1, 30))
+    elements.append(Paragraph("End of Statement. Computer Generated.", STYLES['Italic']))
+
+    doc.build(elements)
+
+def _render_task(task):
+    """Process-pool worker: one statement per task."""
+    c_id, c_name, rows, output_folder, statement_date, max_pages = task
+    pdf_name = os.path.join(output_folder, f"Statement_{c_id}.pdf")
+    # Seeded per client so parallel runs print the same account numbers
+    account_number = random.Random(f"acct-{c_id}").randint(1000000000, 9999999999)
+    render_statement(pdf_name, c_name, rows, account_number, statement_date, max_pages)
+    return c_id
+
+def _read_table(path_or_dir, csv_name):
+    """Reads the legacy CSV, or every part-*.parquet / part-*.csv of a sharded data_generator folder."""
+    if path_or_dir is None:
+        return pd.read_csv(csv_name)
+    parts = sorted(glob.glob(os.path.join(path_or_dir, "part-*")))
+    if not parts:
+        raise FileNotFoundError(path_or_dir)
+    if parts[0].endswith(".parquet"):
+        return pd.concat((pd.read_parquet(p) for p in parts), ignore_index=True)
+    return pd.concat((pd.read_csv(p) for p in parts), ignore_index=True)
+
+def iter_statement_tasks(df_clients, df_txns, output_folder, statement_date, max_pages=None):
+    """Groups transactions by client once (O(transactions)) instead of filtering per client."""
+    row_columns = ['Date', 'Description', 'Amount', 'Type', 'Balance']
+    grouped = {
+        c_id: list(group[row_columns].itertuples(index=False, name=None))
+        for c_id, group in df_txns.groupby('Client_ID', sort=False)
+    }
+    for c_id, c_name in df_clients[['Client_ID', 'Name']].itertuples(index=False, name=None):
+        rows = grouped.get(c_id)
+        if not rows: continue
+        yield (c_id, c_name, rows, output_folder, statement_date, max_pages)
+
+def generate_pdfs(input_dir=None, output_folder=OUTPUT_FOLDER, workers=None, max_pages=None, chunksize=16):
     # Load the data we generated in Step 1
     try:
-        df_clients = pd.read_csv("synthetic_clients_master.csv")
-        df_txns = pd.read_csv("synthetic_transaction_log.csv")
+        df_clients = _read_table(input_dir and os.path.join(input_dir, "clients"), "synthetic_clients_master.csv")
+        df_txns = _read_table(input_dir and os.path.join(input_dir, "transactions"), "synthetic_transaction_log.csv")
     except FileNotFoundError:
         print("❌ Error: CSV files not found. Please run data_generator.py first.")
         return
 
     print(f"📄 Creating PDFs for {len(df_clients)} clients...")
+    os.makedirs(output_folder, exist_ok=True)
 
-    # Define Styles
-    styles = getSampleStyleSheet()
-    header_style = ParagraphStyle('Header', parent=styles['Heading1'], fontSize=18, textColor=colors.HexColor("#003366"))
-    
-    # [NEW] Style for Table Cells (Smaller font + word wrap enabled)
-    cell_style = styles["BodyText"]
-    cell_style.fontSize = 9
-    cell_style.leading = 11  # Line spacing
-
-    for _, client in df_clients.iterrows():
-        c_id = client['Client_ID']
-        c_name = client['Name']
-        
-        # Filter transactions for this specific client
-        c_txns = df_txns[df_txns['Client_ID'] == c_id]
-        
-        if c_txns.empty: continue
-
-        pdf_name = os.path.join(OUTPUT_FOLDER, f"Statement_{c_id}.pdf")
-        doc = SimpleDocTemplate(pdf_name, pagesize=A4)
-        elements = []
-
-        # Header & Info
-        elements.append(Paragraph("DBS (Digital Bank Simulation) - eStatement", header_style))
-        elements.append(Spacer(1, 12))
-        
-        client_info = f"""
-        <b>Customer Name:</b> {c_name}<br/>
-        <b>Account Number:</b> {random.randint(1000000000, 9999999999)}<br/>
-        <b>Date:</b> {datetime.now().strftime('%d %b %Y')}
-        """
-        elements.append(Paragraph(client_info, styles['Normal']))
-        elements.append(Spacer(1, 20))
-
-        # Table Data
-        data = [['Date', 'Description', 'Amount', 'Type', 'Balance']]
-        
-        for _, txn in c_txns.iterrows():
-            # [FIX] Wrap description in a Paragraph object so it wraps automatically
-            desc_paragraph = Paragraph(str(txn['Description']), cell_style)
-            
-            data.append([
-                txn['Date'], 
-                desc_paragraph, # <--- The Paragraph object handles the wrapping
-                f"${txn['Amount']:,.2f}", 
-                txn['Type'],
-                f"${txn['Balance']:,.2f}"
-            ])
-
-        # Table Styling
-        # [FIX] Adjusted widths to give Description (Index 1) more space
-        # Total A4 printable width is approx ~450-500 depending on margins
-        t = Table(data, colWidths=[65, 230, 80, 50, 80])
-        
-        t.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.black),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('ALIGN', (2,1), (-1,-1), 'RIGHT'), # Align amounts right
-            
-            # [FIX] VALIGN TOP ensures multi-line descriptions don't mess up the row alignment
-            ('VALIGN', (0,0), (-1,-1), 'TOP'), 
-            
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-            ('LEFTPADDING', (0,0), (-1,-1), 6),
-            ('RIGHTPADDING', (0,0), (-1,-1), 6),
-        ]))
-        elements.append(t)
-        
-        elements.append(Spacer(1, 30))
-        elements.append(Paragraph("End of Statement. Computer Generated.", styles['Italic']))
-
-        doc.build(elements)
-
-    print(f"🎉 Success! Check the '{OUTPUT_FOLDER}' folder. Text wrapping is now active.")
+    statement_date = datetime.now().strftime('%d %b %Y')
+    tasks = iter_statement_tasks(df_clients, df_txns, output_folder, statement_date, max_pages)
+
+    rendered = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for _ in pool.map(_render_task, tasks, chunksize=chunksize):
+            rendered += 1
+
+    print(f"🎉 Success! {rendered} statements in '{output_folder}'. Text wrapping is now active.")
 
 if __name__ == "__main__":
-    generate_pdfs()
\ No newline at end of file
+    cli = argparse.ArgumentParser(description="Render synthetic bank statements to PDF.")
+    cli.add_argument("--input", help="Sharded data_generator folder (default: the legacy CSVs in the current folder)")
+    cli.add_argument("--out", default=OUTPUT_FOLDER)
+    cli.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    cli.add_argument("--max-pages", type=int, default=None, help="Cap each statement at this many pages")
+    args = cli.parse_args()
+
+    generate_pdfs(args.input, args.out, args.workers, args.max_pages)
@@ -0,0 +1,176 @@
+"""
+Deterministic pre-screen of OCR markdown, run before the extraction LLM.
+
+Table rows are read straight from the markdown (via markdown_compactor.compact_lines)
+and scanned with the RiskEngine's own compiled AML rules (rule_engine.get_rule_set).
+Only the hard-reject rules count: transaction rules whose `force_category` is a reject
+category (structuring, sanctioned counterparty). If one of them fires, the result is
+decisive: the extractor returns the regex-parsed rows as a partial FinancialExtraction
+and the LLM call is skipped. Because both share one compiled rule set, the pre-screen
+and the RiskEngine cannot disagree about those rows.
+
+Parsing is conservative: rows without an ISO date, a numeric amount and a CREDIT/DEBIT
+type are dropped. Counterparty rules (`merchant_category_in`, e.g. sanctioned_counterparty)
+are only decisive on exact catalogue/alias names: a row is re-checked with the normalizer's
+`exact` flag, so a near-miss name ("HAN TRADING") can never skip the LLM.
+"""
+import os
+import re
+from collections import namedtuple
+
+from src.data.data_contract import FinancialExtraction, TransactionItem
+from src.io.markdown_compactor import compact_lines
+from src.io.page_ocr import parse_header
+from src.monitoring.telemetry import get_logger, record_prescreen
+from src.risk.merchant_normalizer import get_normalizer
+from src.risk.rule_engine import get_rule_set
+
+logger = get_logger("prescreen")
+
+PRESCREEN_ENABLED = os.getenv("SENTINEL_PRESCREEN", "1").lower() in ("1", "true", "on")
+
+ISO_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+NUMBER_RE = re.compile(r"^-?\d+(?:\.\d+)?$")
+COLUMNS = ("date", "description", "amount", "type", "balance")
+
+Prescreen = namedtuple("Prescreen", ["decisive", "rules", "reasons", "rows", "extraction"])
+
+
+def parse_rows(markdown):
+    """Transaction dicts for every table row that parses cleanly, in statement order."""
+    _, body, _, _ = compact_lines(markdown)
+    rows, columns = [], None
+    for line in body:
+        if line.startswith("TABLE "):
+            names = line[len("TABLE "):].split(";")
+            columns = {name: names.index(name) for name in COLUMNS if name in names}
+            if not {"date", "description", "amount", "type"} <= columns.keys():
+                columns = None
+            continue
+        if columns is None:
+            continue
+        cells = line.split(";")
+        if len(cells) <= max(columns.values()):
+            continue
+        date, amount, txn_type = cells[columns["date"]], cells[columns["amount"]], cells[columns["type"]].upper()
+        if not ISO_DATE_RE.match(date) or not NUMBER_RE.match(amount) or txn_type not in ("CREDIT", "DEBIT"):
+            continue
+        balance = cells[columns["balance"]] if "balance" in columns else ""
+        rows.append({
+            "date": date,
+            "description": cells[columns["description"]],
+            "amount": abs(float(amount)),
+            "type": txn_type,
+            "balance": float(balance) if NUMBER_RE.match(balance) else None,
+        })
+    return rows
+
+
+def _risk_flags(rows, categories):
+    normalizer = get_normalizer()
+    flags = []
+    for row in rows:
+        if normalizer.category(row["description"]) in categories and row["description"] not in flags:
+            flags.append(row["description"])
+    return flags
+
+
+def _exact_rows(rows):
+    resolve = get_normalizer().resolve
+    return [row for row in rows if resolve(row["description"]).exact]
+
+
+def prescreen_markdown(markdown, rules=None):
+    """Scans `markdown` with the hard-reject rules; `extraction` is only set when decisive."""
+    compiled = (rules or get_rule_set()).current()
+    rows = parse_rows(markdown)
+    aggregates = compiled.scan(rows)
+
+    fired, reasons = [], []
+    exact_aggregates = None
+    for rule in compiled.rules:
+        if rule["scope"] != "transactions" or rule.get("force_category") not in compiled.reject_categories:
+            continue
+        transaction_rule = compiled.transaction_rules[rule["id"]]
+        agg = aggregates[rule["id"]]
+        if "merchant_category_in" in rule.get("where", {}):
+            # Counterparty evidence only counts on exact sanctions-list / catalogue names
+            if exact_aggregates is None:
+                exact_aggregates = compiled.scan(_exact_rows(rows))
+            agg = exact_aggregates[rule["id"]]
+        value = transaction_rule.value(agg)
+        if transaction_rule.trigger(value):
+            fired.append(rule["id"])
+            reasons.append(rule["reason"].format(value=value, count=agg.count, total=round(agg.total, 2)))
+
+    record_prescreen(bool(fired))
+    if not fired:
+        return Prescreen(False, [], [], len(rows), None)
+
+    header = parse_header(markdown)
+    flag_categories = set().union(*(categories for _, categories in compiled.flag_rules.values()))
+    has_salary = any(row["type"] == "CREDIT" and "SALARY" in row["description"].upper() for row in rows)
+    extraction = FinancialExtraction(
+        client_name=header.get("client_name", "Unknown"),
+        account_number=header.get("account_number", "Unknown"),
+        statement_date=header.get("statement_date", "Unknown"),
+        source_of_wealth="Salary" if has_salary else "Unknown",
+        risk_flags=_risk_flags(rows, flag_categories),
+        transactions=[TransactionItem(**row) for row in rows],
+    )
+    return Prescreen(True, fired, reasons, len(rows), extraction)
+
+
+# --- Test Block ---
+if __name__ == "__main__":
+    import time
+
+    from benchmarks.stubs import StatementCorpus, parse_statement_markdown
+    from src.risk.risk_engine import RiskEngine
+
+    header = [
+        "# DBS (Digital Bank Simulation) - eStatement", "",
+        "**Customer Name:** Test Subject Smurf", "**Account Number:** 1234567890", "**Date:** 31 Jan 2024", "",
+        "| Date | Description | Amount | Type | Balance |", "|---|---|---|---|---|",
+    ]
+    smurf = "\n".join(header + [
+        "| 2024-01-03 | CASH DEPOSIT - ATM 0231 | $4,900.00 | CREDIT | $14,900.00 |",
+        "| 2024-01-09 | CASH DEPOSIT - BRANCH | $4,850.00 | CREDIT | $19,750.00 |",
+        "| 2024-01-12 | ITR TEHRAN TRADING CO REF-99 | $2,000.00 | DEBIT | $17,750.00 |",
+    ])
+    screen = prescreen_markdown(smurf)
+    print(screen.rules, screen.reasons)
+    assert screen.decisive and screen.rules == ["structuring", "sanctioned_counterparty"]
+    assert screen.extraction.client_name == "Test Subject Smurf" and len(screen.extraction.transactions) == 3
+
+    salary = "| 2024-01-03 | GIRO SALARY CREDIT - ACME | $6,200.00 | CREDIT | $16,200.00 |"
+    clean = "\n".join(header + [salary])
+    assert not prescreen_markdown(clean).decisive
+    print("✅ Smurfing + sanctioned statement is decisive; a salary-only statement is not.")
+
+    # Near-miss counterparty names are never decisive (and the full engine approves them)
+    engine = RiskEngine()
+    for near_miss in ("HAN TRADING", "POS GENERAL TRADING PTE LTD REF-7", "MOSCOW GENERAL HOSPITAL"):
+        markdown = "\n".join(header + [salary, f"| 2024-01-05 | {near_miss} | $120.00 | DEBIT | $16,080.00 |"])
+        assert not prescreen_markdown(markdown).decisive, near_miss
+        full = engine.analyze(engine.reconciler.reconcile(parse_statement_markdown(markdown).model_dump()))
+        assert full["final_decision"] == "APPROVE", (near_miss, full["compliance_analysis"])
+    print("✅ Near-miss counterparties (HAN TRADING ...) are not decisive and are approved.")
+
+    # On a generated corpus, every decisive pre-screen must agree with the full pipeline's verdict
+    get_logger("risk_engine").setLevel("WARNING")
+    corpus = StatementCorpus(2000, seed=5)
+    decisive = agree = 0
+    elapsed = 0.0
+    for c_id in corpus.client_ids():
+        markdown = corpus.markdown(c_id)
+        start = time.perf_counter()
+        screen = prescreen_markdown(markdown)
+        elapsed += time.perf_counter() - start
+        if screen.decisive:
+            decisive += 1
+            full = engine.analyze(engine.reconciler.reconcile(parse_statement_markdown(markdown).model_dump()))
+            agree += full["final_decision"] == "REJECT"
+    print(f"✅ {decisive}/{corpus.num_clients} statements decisive, {agree} agree with the full engine "
+          f"({elapsed / corpus.num_clients * 1000:.2f} ms per pre-screen)")
+    assert agree == decisive
@@ -0,0 +1,277 @@
+"""
+Central registry for the paid-service clients (LlamaParse, OpenAI chat + embeddings).
+
+- One pooled keep-alive HTTP client per process, shared by the OpenAI SDK clients.
+- LlamaParse runs on one long-lived service event loop (a daemon thread), so its pooled
+  AsyncClient is reused by every OCR call from every worker thread. An httpx.AsyncClient
+  cannot move between loops, and LlamaParse's own `load_data` starts a new loop per call.
+- A token-bucket limiter per provider (requests/min and tokens/min) plus a concurrency cap.
+- Jittered exponential backoff on 429s, 5xx and transport errors (Retry-After is honoured).
+
+Limits come from the environment, e.g. SENTINEL_OPENAI_RPM=500, SENTINEL_OPENAI_TPM=200000,
+SENTINEL_OPENAI_MAX_CONCURRENCY=16 (same keys with LLAMAPARSE for LlamaCloud).
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from functools import lru_cache
+
+import httpx
+
+from src.monitoring.telemetry import get_logger
+
+logger = get_logger("service_clients")
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+# SDK exception types that carry no status code but are safe to retry
+RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError"}
+
+# (requests/min, tokens/min, max in-flight calls)
+DEFAULT_LIMITS = {
+    "openai": (500, 200_000, 16),
+    "llamaparse": (60, 0, 4),
+}
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = float(capacity or rate_per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        """Blocks until `amount` tokens are available; returns the seconds spent waiting."""
+        # A single request larger than the bucket would wait forever; clamp it
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate_per_second
+            time.sleep(delay)
+            waited += delay
+
+
+class ProviderLimiter:
+    """Request-rate, token-rate and concurrency limits for one provider."""
+
+    def __init__(self, requests_per_minute, tokens_per_minute=0, max_concurrency=8):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+
+    def acquire(self, tokens=0):
+        waited = 0.0
+        if self.requests:
+            waited += self.requests.acquire(1)
+        if self.tokens and tokens:
+            waited += self.tokens.acquire(tokens)
+        return waited
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter: sleep ~ U(0, min(max_delay, base_delay * 2**attempt))."""
+
+    def __init__(self, max_attempts=5, base_delay=0.5, max_delay=30.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt, exc=None):
+        retry_after = _retry_after_seconds(exc)
+        if retry_after is not None:
+            return min(self.max_delay, retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def _error_chain(exc):
+    """exc and the errors behind it: SDKs re-raise HTTP errors as plain Exceptions or tenacity RetryErrors."""
+    chain = []
+    while exc is not None and exc not in chain and len(chain) < 5:
+        chain.append(exc)
+        last_attempt = getattr(exc, "last_attempt", None)  # tenacity.RetryError
+        exc = last_attempt.exception() if last_attempt is not None else exc.__cause__
+    return chain
+
+
+def _status_code(exc):
+    status = getattr(exc, "status_code", None)
+    if status is None and getattr(exc, "response", None) is not None:
+        status = getattr(exc.response, "status_code", None)
+    return status
+
+
+def _retry_after_seconds(exc):
+    for error in _error_chain(exc):
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if headers and headers.get("retry-after") is not None:
+            try:
+                return float(headers.get("retry-after"))
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def is_retryable(exc):
+    for error in _error_chain(exc):
+        if isinstance(error, (httpx.TimeoutException, httpx.TransportError)):
+            return True
+        if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+            return True
+        if _status_code(error) in RETRYABLE_STATUS:
+            return True
+    return False
+
+
+def _limit(provider, key, default):
+    return int(os.getenv(f"SENTINEL_{provider.upper()}_{key}", default))
+
+
+@lru_cache(maxsize=None)
+def get_limiter(provider):
+    rpm, tpm, concurrency = DEFAULT_LIMITS.get(provider, (60, 0, 4))
+    return ProviderLimiter(
+        _limit(provider, "RPM", rpm),
+        _limit(provider, "TPM", tpm),
+        _limit(provider, "MAX_CONCURRENCY", concurrency),
+    )
+
+
+DEFAULT_RETRY = RetryPolicy(
+    max_attempts=int(os.getenv("SENTINEL_RETRY_ATTEMPTS", 5)),
+    base_delay=float(os.getenv("SENTINEL_RETRY_BASE_DELAY", 0.5)),
+)
+
+
+def call_with_policy(provider, fn, *args, tokens=0, retry=DEFAULT_RETRY, **kwargs):
+    """
+    Runs fn(*args, **kwargs) under the provider's rate limits, retrying transient failures.
+    `tokens` is the estimated token cost of the call (prompt + expected completion).
+    """
+    limiter = get_limiter(provider)
+    for attempt in range(retry.max_attempts):
+        limiter.acquire(tokens)
+        try:
+            with limiter.slots:
+                return fn(*args, **kwargs)
+        except Exception as exc:
+            if attempt == retry.max_attempts - 1 or not is_retryable(exc):
+                raise
+            delay = retry.delay(attempt, exc)
+            logger.warning("   ⏳ %s call failed (%s); retry %d/%d in %.2fs",
+                           provider, type(exc).__name__, attempt + 1, retry.max_attempts - 1, delay)
+            time.sleep(delay)
+
+
+def estimate_tokens(text, completion_tokens=1000):
+    """Cheap token estimate for rate limiting (~4 chars per token + completion allowance)."""
+    return len(text or "") // 4 + completion_tokens
+
+
+# --- Shared, pooled HTTP transport ---
+
+def _pool_limits():
+    return httpx.Limits(
+        max_connections=int(os.getenv("SENTINEL_HTTP_MAX_CONNECTIONS", 64)),
+        max_keepalive_connections=int(os.getenv("SENTINEL_HTTP_MAX_KEEPALIVE", 32)),
+        keepalive_expiry=float(os.getenv("SENTINEL_HTTP_KEEPALIVE_SECONDS", 60)),
+    )
+
+
+HTTP_TIMEOUT = httpx.Timeout(float(os.getenv("SENTINEL_HTTP_TIMEOUT", 120)), connect=10.0)
+
+
+@lru_cache(maxsize=None)
+def get_http_client():
+    return httpx.Client(limits=_pool_limits(), timeout=HTTP_TIMEOUT)
+
+
+@lru_cache(maxsize=None)
+def get_service_loop():
+    """The long-lived event loop async SDK clients run on (started on first use)."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="sentinel-service-loop", daemon=True).start()
+    return loop
+
+
+def run_on_service_loop(coro):
+    """Runs `coro` on the service loop and blocks the calling thread until it finishes."""
+    return asyncio.run_coroutine_threadsafe(coro, get_service_loop()).result()
+
+
+@lru_cache(maxsize=None)
+def get_async_http_client():
+    """Pooled AsyncClient; only ever used from the service loop (see run_on_service_loop)."""
+    return httpx.AsyncClient(limits=_pool_limits(), timeout=HTTP_TIMEOUT)
+
+
+# --- SDK client registry (one instance per configuration per process) ---
+
+@lru_cache(maxsize=None)
+def get_chat_model(model="gpt-4o-mini", temperature=0.0):
+    from langchain_openai import ChatOpenAI
+
+    # max_retries=0: call_with_policy owns retries so they respect the shared limiter.
+    # No shared async client: this instance is cached across event loops.
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        max_retries=0,
+        http_client=get_http_client(),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_embeddings(model="text-embedding-3-small"):
+    from langchain_openai import OpenAIEmbeddings
+
+    return OpenAIEmbeddings(
+        model=model,
+        max_retries=0,
+        http_client=get_http_client(),
+    )
+
+
+@lru_cache(maxsize=None)
+def _pooled_llama_parse():
+    from llama_parse import LlamaParse
+
+    class PooledLlamaParse(LlamaParse):
+        """LlamaParse whose sync `load_data` runs on the service loop instead of a fresh loop per call."""
+
+        def load_data(self, file_path, extra_info=None, fs=None):
+            return run_on_service_loop(self.aload_data(file_path, extra_info, fs=fs))
+
+    return PooledLlamaParse
+
+
+@lru_cache(maxsize=None)
+def get_llama_parser(result_type="markdown", language="en", **options):
+    """
+    Shared LlamaParse client on the pooled keep-alive AsyncClient. ignore_errors=False: a failed
+    parse raises, so call_with_policy can retry it, instead of returning no documents.
+    The SDK still retries a rate-limited upload itself (up to 5 tries); whatever it gives up on,
+    including a job that is rate-limited until max_timeout, reaches the policy's retry/backoff.
+    `options` are extra LlamaParse fields (e.g. base_url, max_timeout).
+    """
+    return _pooled_llama_parse()(
+        result_type=result_type,
+        verbose=True,
+        language=language,
+        ignore_errors=False,
+        custom_client=get_async_http_client(),
+        **options,
+    )
@@ -0,0 +1,190 @@
+"""
+Sentinel Telemetry: span timing, token usage and cache counters.
+
+Everything here is cheap enough to leave on in production:
+- Logging goes through the stdlib `logging` module (lazy %-formatting, level-gated).
+- Spans are a perf_counter() pair + one histogram observe().
+
+Switches (environment variables):
+- SENTINEL_LOG_LEVEL=DEBUG|INFO|WARNING|OFF   (default INFO)
+- SENTINEL_TELEMETRY=0                        (turns span/metric recording into no-ops)
+"""
+import functools
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+TELEMETRY_ENABLED = os.getenv("SENTINEL_TELEMETRY", "1").lower() not in ("0", "false", "off")
+
+# Pipeline stages range from ~1ms (risk math) to minutes (OCR of large PDFs)
+LATENCY_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+NODE_LATENCY = Histogram(
+    "sentinel_node_duration_seconds",
+    "Wall-clock time spent in each LangGraph node",
+    ["node"],
+    buckets=LATENCY_BUCKETS,
+)
+SPAN_LATENCY = Histogram(
+    "sentinel_span_duration_seconds",
+    "Wall-clock time spent in each pipeline stage (OCR, LLM extraction, retrieval, ...)",
+    ["span"],
+    buckets=LATENCY_BUCKETS,
+)
+SPAN_ERRORS = Counter(
+    "sentinel_span_errors_total",
+    "Pipeline stages that raised an exception",
+    ["span"],
+)
+LLM_TOKENS = Counter(
+    "sentinel_llm_tokens_total",
+    "LLM tokens consumed per stage (kind: prompt, completion, cached_prompt = part of prompt served from cache)",
+    ["stage", "kind"],
+)
+COMPACTION_TOKENS = Counter(
+    "sentinel_compaction_tokens_total",
+    "Extraction input tokens before and after markdown compaction",
+    ["stage"],
+)
+PRESCREEN_RESULTS = Counter(
+    "sentinel_prescreen_total",
+    "Deterministic pre-screens of OCR markdown by outcome (decisive = LLM extraction skipped)",
+    ["outcome"],
+)
+RULE_HITS = Counter(
+    "sentinel_aml_rule_hits_total",
+    "AML rule hits: rules fired per statement, and rows matched (SENTINEL_RULE_TIMING=1 only)",
+    ["rule", "kind"],
+)
+CACHE_REQUESTS = Counter(
+    "sentinel_cache_requests_total",
+    "Cache lookups by cache name and result (hit/miss)",
+    ["cache", "result"],
+)
+
+
+# --- Logging ---
+
+def _configure_root_logger():
+    root = logging.getLogger("sentinel")
+    if root.handlers:
+        return root
+
+    level_name = os.getenv("SENTINEL_LOG_LEVEL", "INFO").upper()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    root.addHandler(handler)
+    root.propagate = False
+
+    if level_name == "OFF":
+        root.disabled = True
+    else:
+        root.setLevel(getattr(logging, level_name, logging.INFO))
+    return root
+
+
+def get_logger(name):
+    """Returns a 'sentinel.<name>' logger sharing one handler and level switch."""
+    _configure_root_logger()
+    return logging.getLogger(f"sentinel.{name}")
+
+
+logger = get_logger("telemetry")
+
+
+# --- Spans ---
+
+@contextmanager
+def span(name):
+    """Times a pipeline stage into sentinel_span_duration_seconds{span=name}."""
+    if not TELEMETRY_ENABLED:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        SPAN_ERRORS.labels(name).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        SPAN_LATENCY.labels(name).observe(elapsed)
+        logger.debug("   [span] %s took %.3fs", name, elapsed)
+
+
+def timed_node(name):
+    """Decorator for LangGraph nodes: records sentinel_node_duration_seconds{node=name}."""
+    def decorator(fn):
+        if not TELEMETRY_ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                NODE_LATENCY.labels(name).observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def record_cache(cache, hit):
+    """Counts one lookup against a named cache; hit rate = hit / (hit + miss)."""
+    if TELEMETRY_ENABLED:
+        CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_tokens(stage, prompt_tokens=0, completion_tokens=0, cached_prompt_tokens=0):
+    if not TELEMETRY_ENABLED:
+        return
+    LLM_TOKENS.labels(stage, "prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(stage, "completion").inc(completion_tokens)
+    # OpenAI prompt caching: cached share = cached_prompt / prompt (token counts, not cache lookups)
+    LLM_TOKENS.labels(stage, "cached_prompt").inc(cached_prompt_tokens)
+
+
+def record_compaction(tokens_before, tokens_after):
+    """Tokens saved = before - after, summed over documents."""
+    if TELEMETRY_ENABLED:
+        COMPACTION_TOKENS.labels("before").inc(tokens_before)
+        COMPACTION_TOKENS.labels("after").inc(tokens_after)
+
+
+def record_prescreen(decisive):
+    if TELEMETRY_ENABLED:
+        PRESCREEN_RESULTS.labels("decisive" if decisive else "pass").inc()
+
+
+def record_rule_hit(rule_id, kind="fired", count=1):
+    if TELEMETRY_ENABLED:
+        RULE_HITS.labels(rule_id, kind).inc(count)
+
+
+@contextmanager
+def track_llm_usage(stage):
+    """Collects OpenAI token usage for every LLM call made inside the block."""
+    if not TELEMETRY_ENABLED:
+        yield
+        return
+
+    from langchain_community.callbacks import get_openai_callback
+
+    with get_openai_callback() as cb:
+        yield
+    record_tokens(
+        stage,
+        prompt_tokens=cb.prompt_tokens,
+        completion_tokens=cb.completion_tokens,
+        cached_prompt_tokens=getattr(cb, "prompt_tokens_cached", 0),
+    )
+    logger.debug("   [tokens] %s: %d prompt / %d completion", stage, cb.prompt_tokens, cb.completion_tokens)
+
+
+def render_metrics():
+    """Prometheus text exposition for the /metrics endpoint."""
+    return generate_latest(), CONTENT_TYPE_LATEST
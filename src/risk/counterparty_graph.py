@@ -0,0 +1,449 @@
+"""
+Cross-client counterparty graph for mule-ring detection.
+
+RiskEngine sees one statement at a time; this index remembers every statement it has
+seen and links clients that
+- funnel money to the same counterparty (DEBIT >= FUNNEL_MIN_AMOUNT), or
+- make large cash deposits in lockstep (within LOCKSTEP_WINDOW_DAYS of each other, on at
+  least LOCKSTEP_MIN_EVENTS distinct pairs of deposit days).
+
+Linked clients are merged with union-find (union by size + path halving), and each
+component keeps its member list (smaller list merged into larger). Ingesting a
+statement therefore costs O(new rows) plus near-constant union/find work, never a
+recompute over the portfolio.
+
+Everything is persisted in SQLite. Unions are stored as an append-only log and
+replayed on start-up, so the in-memory forest is rebuilt without storing parent pointers.
+
+Union-find cannot split a component. So when a counterparty passes HUB_MAX_CLIENTS, the
+forest and the union log are rebuilt from the non-hub funnel edges and lockstep pairs,
+which drops the links its first payers made through it. That happens at most once per
+counterparty.
+
+Retention: every PRUNE_EVERY new statements, cash deposits older than CASH_RETENTION_DAYS
+before the newest one are dropped, with the day pairs they formed and any client pair that
+had not yet reached LOCKSTEP_MIN_EVENTS. So two clients are only linked if they co-deposit
+often enough within that window. Pairs that did link are kept; they back the unions that
+_rebuild re-derives.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from src.monitoring.telemetry import get_logger
+from src.risk.merchant_normalizer import get_normalizer
+from src.risk.reconciliation import _field
+from src.risk.rule_engine import _day
+
+logger = get_logger("counterparty_graph")
+
+DB_PATH = os.getenv("SENTINEL_COUNTERPARTY_DB", "sentinel_counterparties.sqlite")
+
+FUNNEL_MIN_AMOUNT = 500.0     # Everyday retail spend never links clients
+HUB_MAX_CLIENTS = 25          # Past this many clients a counterparty is a public merchant, not a collector
+LOCKSTEP_MIN_AMOUNT = 3000.0  # Cash deposits below this are not tracked for co-occurrence
+LOCKSTEP_WINDOW_DAYS = 2
+LOCKSTEP_MIN_EVENTS = 2       # Co-deposits needed before two clients are linked
+MAX_WINDOW_FANOUT = 200       # Cap on partner deposits looked at per deposit (keeps busy days O(1))
+CASH_RETENTION_DAYS = 90      # Cash deposits (and unlinked co-deposits) older than this are pruned
+PRUNE_EVERY = 1000            # New statements between automatic prunes
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS statements (
+    statement_key TEXT PRIMARY KEY,
+    client_id     TEXT NOT NULL,
+    ingested_at   TEXT NOT NULL
+) WITHOUT ROWID;
+-- (counterparty, client) funnel edges
+CREATE TABLE IF NOT EXISTS funnel_edges (
+    counterparty TEXT NOT NULL,
+    client_id    TEXT NOT NULL,
+    txn_count    INTEGER NOT NULL,
+    total        REAL NOT NULL,
+    last_day     INTEGER,
+    PRIMARY KEY (counterparty, client_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_funnel_client ON funnel_edges(client_id);
+-- Large cash deposits bucketed by day, clustered for window range scans
+CREATE TABLE IF NOT EXISTS cash_events (
+    day       INTEGER NOT NULL,
+    client_id TEXT NOT NULL,
+    amount    REAL NOT NULL,
+    PRIMARY KEY (day, client_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS lockstep_pairs (
+    client_a TEXT NOT NULL,
+    client_b TEXT NOT NULL,
+    events   INTEGER NOT NULL,
+    last_day INTEGER,
+    PRIMARY KEY (client_a, client_b)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_lockstep_b ON lockstep_pairs(client_b);
+-- Each (client_a day, client_b day) co-deposit counts once towards lockstep_pairs.events
+CREATE TABLE IF NOT EXISTS lockstep_days (
+    client_a TEXT NOT NULL,
+    client_b TEXT NOT NULL,
+    day_a    INTEGER NOT NULL,
+    day_b    INTEGER NOT NULL,
+    PRIMARY KEY (client_a, client_b, day_a, day_b)
+) WITHOUT ROWID;
+-- Append-only union log, replayed at start-up
+CREATE TABLE IF NOT EXISTS unions (
+    seq    INTEGER PRIMARY KEY AUTOINCREMENT,
+    node_a TEXT NOT NULL,
+    node_b TEXT NOT NULL,
+    reason TEXT
+);
+"""
+
+
+def normalize_counterparty(description):
+    """'MST BINANCE HOLDINGS LTD REF-483920' -> 'BINANCE HOLDINGS LTD' (see merchant_normalizer)."""
+    return get_normalizer().canonical(description)
+
+
+def client_key(data):
+    """Stable client identity: the account number when extracted, else the name."""
+    account = str(data.get("account_number") or "").strip()
+    if account and account.lower() != "unknown":
+        return f"acct:{account}"
+    return f"name:{str(data.get('client_name') or 'unknown').strip().lower()}"
+
+
+def statement_key(client_id, transactions):
+    """Content hash so replays (checkpoint resumes, re-uploads) are not double counted."""
+    digest = hashlib.sha1(client_id.encode())
+    for txn in transactions:
+        digest.update(
+            f"|{_field(txn, 'date', '')}|{_field(txn, 'description', '')}|{_field(txn, 'amount', '')}|{_field(txn, 'type', '')}".encode()
+        )
+    return digest.hexdigest()
+
+
+class UnionFind:
+    """Union by size with path halving; each root keeps its client members."""
+
+    def __init__(self):
+        self.parent = {}
+        self.members = {}   # root -> [client ids]; counterparty nodes add no members
+
+    def add(self, node, is_client):
+        if node not in self.parent:
+            self.parent[node] = node
+            self.members[node] = [node] if is_client else []
+
+    def find(self, node):
+        parent = self.parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def union(self, a, b):
+        """Returns True if a and b were in different components."""
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return False
+        # Merge the smaller member list into the larger one (ties: fewer moves either way)
+        if len(self.members[ra]) < len(self.members[rb]):
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.members[ra].extend(self.members.pop(rb))
+        return True
+
+    def component(self, node):
+        if node not in self.parent:
+            return []
+        return self.members[self.find(node)]
+
+
+class CounterpartyGraph:
+    """
+    Persistent client <-> counterparty index with incrementally maintained rings.
+    `ingest()` returns the network metrics RiskEngine feeds to the "network" AML rules.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.uf = UnionFind()
+        self.degree = {}  # counterparty -> distinct funnel clients
+        self._since_prune = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._load()
+
+    def _load(self):
+        for counterparty, clients in self._conn.execute(
+            "SELECT counterparty, COUNT(*) FROM funnel_edges GROUP BY counterparty"
+        ):
+            self.degree[counterparty] = clients
+        replayed = 0
+        for node_a, node_b in self._conn.execute("SELECT node_a, node_b FROM unions ORDER BY seq"):
+            self.uf.add(node_a, node_a.startswith("C:"))
+            self.uf.add(node_b, node_b.startswith("C:"))
+            self.uf.union(node_a, node_b)
+            replayed += 1
+        if replayed:
+            logger.info("🕸️ Counterparty graph: replayed %d unions over %d nodes", replayed, len(self.uf.parent))
+
+    def _union(self, node_a, node_b, reason, pending):
+        self.uf.add(node_a, node_a.startswith("C:"))
+        self.uf.add(node_b, node_b.startswith("C:"))
+        if self.uf.union(node_a, node_b):
+            pending.append((node_a, node_b, reason))
+
+    def ingest(self, client_id, transactions, key=None):
+        """
+        Adds one statement. Work is proportional to its funnel debits and large cash deposits.
+        A statement already ingested (same content hash) only returns the current metrics.
+        """
+        key = key or statement_key(client_id, transactions)
+        client_node = f"C:{client_id}"
+
+        # 1. Pick out the rows that can link clients (one pass, no DB access)
+        funnel = {}
+        cash = {}
+        for txn in transactions:
+            txn_type = str(_field(txn, "type", "")).upper()
+            try:
+                amount = abs(float(_field(txn, "amount", 0.0) or 0.0))
+            except (TypeError, ValueError):
+                continue
+            if txn_type == "DEBIT" and amount >= FUNNEL_MIN_AMOUNT:
+                counterparty = normalize_counterparty(_field(txn, "description", ""))
+                if counterparty:
+                    entry = funnel.setdefault(counterparty, [0, 0.0, None])
+                    entry[0] += 1
+                    entry[1] += amount
+                    entry[2] = max(entry[2] or 0, _day(_field(txn, "date", "")) or 0) or None
+            elif txn_type == "CREDIT" and amount >= LOCKSTEP_MIN_AMOUNT and "cash" in str(_field(txn, "description", "")).lower():
+                day = _day(_field(txn, "date", ""))
+                if day is not None:
+                    cash[day] = cash.get(day, 0.0) + amount
+
+        with self._lock, self._conn:
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO statements (statement_key, client_id, ingested_at) VALUES (?, ?, ?)",
+                (key, client_id, datetime.now(timezone.utc).isoformat(timespec="seconds")),
+            ).rowcount
+            self.uf.add(client_node, True)
+            if inserted:
+                pending = []
+                self._add_funnel_edges(client_id, client_node, funnel, pending)
+                self._add_cash_events(client_id, client_node, cash, pending)
+                self._conn.executemany("INSERT INTO unions (node_a, node_b, reason) VALUES (?, ?, ?)", pending)
+                self._since_prune += 1
+                if self._since_prune >= PRUNE_EVERY:
+                    self._prune(CASH_RETENTION_DAYS)
+            return self._metrics(client_id, client_node)
+
+    def _add_funnel_edges(self, client_id, client_node, funnel, pending):
+        new_hubs = []
+        for counterparty, (count, total, last_day) in funnel.items():
+            txn_count = self._conn.execute(
+                """
+                INSERT INTO funnel_edges (counterparty, client_id, txn_count, total, last_day) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (counterparty, client_id) DO UPDATE SET
+                    txn_count = txn_count + excluded.txn_count,
+                    total = total + excluded.total,
+                    last_day = MAX(COALESCE(last_day, 0), COALESCE(excluded.last_day, 0))
+                RETURNING txn_count
+                """,
+                (counterparty, client_id, count, total, last_day),
+            ).fetchone()[0]
+            if txn_count == count:  # first edge between this client and counterparty
+                self.degree[counterparty] = self.degree.get(counterparty, 0) + 1
+                if self.degree[counterparty] == HUB_MAX_CLIENTS + 1:
+                    new_hubs.append(counterparty)
+            if self.degree[counterparty] <= HUB_MAX_CLIENTS:
+                self._union(client_node, f"M:{counterparty}", "funnel", pending)
+        if new_hubs:
+            self._rebuild(new_hubs, pending)
+
+    def _rebuild(self, new_hubs, pending):
+        """Recomputes the components over non-hub edges only (the new hubs' unions are dropped)."""
+        logger.info("🕸️ Counterparty graph: %s became hub(s); rebuilding components", ", ".join(new_hubs))
+        # Unions not yet logged for this statement are re-derived from the edge tables below
+        self._conn.executemany("INSERT INTO unions (node_a, node_b, reason) VALUES (?, ?, ?)", pending)
+        pending.clear()
+        self.uf = UnionFind()
+        rebuilt = []
+        for (client_id,) in self._conn.execute("SELECT DISTINCT client_id FROM statements"):
+            self.uf.add(f"C:{client_id}", True)
+        for counterparty, client_id in self._conn.execute("SELECT counterparty, client_id FROM funnel_edges"):
+            if self.degree.get(counterparty, 0) <= HUB_MAX_CLIENTS:
+                self._union(f"C:{client_id}", f"M:{counterparty}", "funnel", rebuilt)
+        for client_a, client_b in self._conn.execute(
+            "SELECT client_a, client_b FROM lockstep_pairs WHERE events >= ?", (LOCKSTEP_MIN_EVENTS,)
+        ):
+            self._union(f"C:{client_a}", f"C:{client_b}", "lockstep", rebuilt)
+        self._conn.execute("DELETE FROM unions")
+        self._conn.executemany("INSERT INTO unions (node_a, node_b, reason) VALUES (?, ?, ?)", rebuilt)
+
+    def _add_cash_events(self, client_id, client_node, cash, pending):
+        for day, amount in cash.items():
+            self._conn.execute(
+                "INSERT INTO cash_events (day, client_id, amount) VALUES (?, ?, ?) "
+                "ON CONFLICT (day, client_id) DO UPDATE SET amount = amount + excluded.amount",
+                (day, client_id, amount),
+            )
+            partners = self._conn.execute(
+                "SELECT client_id, day FROM cash_events WHERE day BETWEEN ? AND ? AND client_id != ? LIMIT ?",
+                (day - LOCKSTEP_WINDOW_DAYS, day + LOCKSTEP_WINDOW_DAYS, client_id, MAX_WINDOW_FANOUT),
+            ).fetchall()
+            for other, other_day in partners:
+                (a, day_a), (b, day_b) = sorted(((client_id, day), (other, other_day)))
+                # A day pair already counted (a later statement repeating a deposit day) adds nothing
+                if not self._conn.execute(
+                    "INSERT OR IGNORE INTO lockstep_days (client_a, client_b, day_a, day_b) VALUES (?, ?, ?, ?)",
+                    (a, b, day_a, day_b),
+                ).rowcount:
+                    continue
+                events = self._conn.execute(
+                    """
+                    INSERT INTO lockstep_pairs (client_a, client_b, events, last_day) VALUES (?, ?, 1, ?)
+                    ON CONFLICT (client_a, client_b) DO UPDATE SET
+                        events = events + 1, last_day = MAX(last_day, excluded.last_day)
+                    RETURNING events
+                    """,
+                    (a, b, max(day_a, day_b)),
+                ).fetchone()[0]
+                if events >= LOCKSTEP_MIN_EVENTS:
+                    self._union(client_node, f"C:{other}", "lockstep", pending)
+
+    def _metrics(self, client_id, client_node):
+        shared = [
+            counterparty for (counterparty,) in self._conn.execute(
+                "SELECT counterparty FROM funnel_edges WHERE client_id = ?", (client_id,)
+            )
+            if 1 < self.degree.get(counterparty, 0) <= HUB_MAX_CLIENTS
+        ]
+        lockstep = self._conn.execute(
+            "SELECT COUNT(*) FROM lockstep_pairs WHERE (client_a = ? OR client_b = ?) AND events >= ?",
+            (client_id, client_id, LOCKSTEP_MIN_EVENTS),
+        ).fetchone()[0]
+        ring = self.uf.component(client_node) or [client_node]
+        return {
+            "client_id": client_id,
+            "linked_clients": len(ring) - 1,
+            "shared_counterparties": len(shared),
+            "lockstep_clients": lockstep,
+            "counterparties": sorted(shared)[:10],
+            "ring_sample": [node[2:] for node in ring[:10] if node != client_node],
+        }
+
+    def metrics(self, client_id):
+        """The network metrics ingest() would return, without adding anything (read-only)."""
+        with self._lock:
+            return self._metrics(client_id, f"C:{client_id}")
+
+    def ring(self, client_id):
+        """Every client in the same component (including client_id)."""
+        with self._lock:
+            # Unlinked clients have no logged unions, so after a restart they are not in the forest
+            return [node[2:] for node in self.uf.component(f"C:{client_id}")] or [client_id]
+
+    def prune(self, keep_days=CASH_RETENTION_DAYS):
+        """Applies the retention policy now (ingest also runs it every PRUNE_EVERY statements)."""
+        with self._lock, self._conn:
+            return self._prune(keep_days)
+
+    def _prune(self, keep_days):
+        """
+        Drops cash events and co-deposit days older than keep_days before the newest deposit,
+        and pairs that never linked whose last co-deposit is that old. Returns cash events dropped.
+        """
+        self._since_prune = 0
+        newest = self._conn.execute("SELECT MAX(day) FROM cash_events").fetchone()[0]
+        if newest is None:
+            return 0
+        cutoff = newest - keep_days
+        dropped = self._conn.execute("DELETE FROM cash_events WHERE day < ?", (cutoff,)).rowcount
+        self._conn.execute("DELETE FROM lockstep_days WHERE MAX(day_a, day_b) < ?", (cutoff,))
+        self._conn.execute(
+            "DELETE FROM lockstep_pairs WHERE events < ? AND last_day < ?", (LOCKSTEP_MIN_EVENTS, cutoff)
+        )
+        if dropped:
+            logger.info("🧹 Counterparty graph: pruned %d cash events before day %d", dropped, cutoff)
+        return dropped
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# --- Test Block ---
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    db = os.path.join(tempfile.mkdtemp(prefix="sentinel-graph-"), "graph.sqlite")
+    graph = CounterpartyGraph(db)
+
+    def debit(desc, amount, day="2024-03-05"):
+        return {"date": day, "description": desc, "amount": amount, "type": "DEBIT"}
+
+    def cash(amount, day):
+        return {"date": day, "description": "CASH DEPOSIT BRANCH A", "amount": amount, "type": "CREDIT"}
+
+    # 1. Funnel: A and B pay the same collector (messy variants), C pays B's other collector
+    graph.ingest("A", [debit("MST TEHRAN TRADING REF-111111", 2500), debit("STARBUCKS COFFEE SINGAPORE", 6.5)])
+    graph.ingest("B", [debit("TEHRAN TRADING", 1800), debit("ITR PYONGYANG IMPORT REF-222222", 900)])
+    metrics = graph.ingest("C", [debit("PYONGYANG IMPORT", 1200)])
+    assert sorted(graph.ring("C")) == ["A", "B", "C"], graph.ring("C")
+    print("✅ Funnel ring:", metrics)
+
+    # 2. Lockstep cash: D and E deposit within 2 days of each other, twice
+    graph.ingest("D", [cash(4800, "2024-03-03"), cash(4700, "2024-03-10")])
+    metrics = graph.ingest("E", [cash(4900, "2024-03-04"), cash(4600, "2024-03-11")])
+    assert metrics["lockstep_clients"] == 1 and sorted(graph.ring("E")) == ["D", "E"], metrics
+    print("✅ Lockstep ring:", metrics)
+
+    # 3. Replays are idempotent, and a later statement repeating a deposit day adds no co-deposit
+    again = graph.ingest("E", [cash(4900, "2024-03-04"), cash(4600, "2024-03-11")])
+    assert again == metrics
+    graph.ingest("F", [cash(5000, "2024-03-03")])
+    graph.ingest("G", [cash(5000, "2024-03-03")])
+    graph.ingest("G", [cash(5000, "2024-03-03"), cash(100, "2024-03-04")])
+    assert sorted(graph.ring("F")) == ["F"], graph.ring("F")
+    print("✅ Co-deposits counted once per day pair.")
+
+    # 4. Restart: the union log rebuilds the same components
+    graph.close()
+    graph = CounterpartyGraph(db)
+    assert sorted(graph.ring("A")) == ["A", "B", "C"] and sorted(graph.ring("D")) == ["D", "E"]
+    print("✅ Components rebuilt from the union log.")
+
+    # 5. A counterparty that turns out to be a hub stops linking its first payers
+    for i in range(HUB_MAX_CLIENTS):
+        metrics = graph.ingest(f"shopper-{i}", [debit("POPULAR FURNITURE SHOWROOM", 900)])
+    assert metrics["linked_clients"] == HUB_MAX_CLIENTS - 1, metrics
+    metrics = graph.ingest(f"shopper-{HUB_MAX_CLIENTS}", [debit("POPULAR FURNITURE SHOWROOM", 900)])
+    assert metrics["linked_clients"] == 0 and metrics["shared_counterparties"] == 0, metrics
+    assert graph.ring("shopper-0") == ["shopper-0"] and sorted(graph.ring("A")) == ["A", "B", "C"]
+    assert sorted(graph.ring("D")) == ["D", "E"]
+    graph.close()
+    graph = CounterpartyGraph(db)
+    assert graph.ring("shopper-3") == ["shopper-3"] and sorted(graph.ring("A")) == ["A", "B", "C"]
+    print("✅ Hub counterparty: earlier payers unlinked (also after restart); real rings kept.")
+
+    # 6. Retention: old deposits and never-linked pairs go, linked rings stay
+    graph.ingest("H", [cash(5000, "2024-09-01")])
+    assert graph.prune() > 0
+    assert graph._conn.execute("SELECT COUNT(*) FROM cash_events").fetchone()[0] == 1
+    assert graph._conn.execute("SELECT COUNT(*) FROM lockstep_pairs WHERE events < ?", (LOCKSTEP_MIN_EVENTS,)).fetchone()[0] == 0
+    assert sorted(graph.ring("D")) == ["D", "E"]
+    print("✅ Pruned cash events older than", CASH_RETENTION_DAYS, "days.")
+
+    # 7. Incremental cost stays flat as the portfolio grows
+    for batch in range(3):
+        start = time.perf_counter()
+        for i in range(1000):
+            graph.ingest(f"bulk-{batch}-{i}", [debit(f"VENDOR {i % 400}", 800), debit("GRAB - TRANSPORT", 12.0)])
+        print(f"   batch {batch + 1}: {(time.perf_counter() - start) * 1000 / 1000:.3f} ms/statement")
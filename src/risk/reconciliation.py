@@ -0,0 +1,115 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+CENT = Decimal("0.01")
+
+
+def _to_decimal(value):
+    """Converts an extracted number (float, int or '$1,234.50' string) to an exact Decimal."""
+    if value is None:
+        return None
+    if isinstance(value, Decimal):
+        return value
+    try:
+        # str() first so 0.1 becomes Decimal('0.1') and not its binary expansion
+        return Decimal(str(value).replace("$", "").replace(",", "").strip())
+    except InvalidOperation:
+        return None
+
+
+def _field(txn, name, default=None):
+    # Handle Pydantic model object or dict
+    if isinstance(txn, dict):
+        return txn.get(name, default)
+    return getattr(txn, name, default)
+
+
+class StatementReconciler:
+    """
+    Deterministic post-extraction stage.
+    Recomputes totals from the extracted rows and checks the running Balance column.
+    """
+
+    def __init__(self):
+        # Max allowed drift between the printed balance and our running balance
+        self.BALANCE_TOLERANCE = Decimal("0.01")
+
+    def compute_totals(self, transactions):
+        """Exact sums of CREDIT and DEBIT rows."""
+        total_income = Decimal("0")
+        total_expenditure = Decimal("0")
+
+        for txn in transactions:
+            amount = _to_decimal(_field(txn, "amount", 0))
+            if amount is None:
+                continue
+            txn_type = str(_field(txn, "type", "")).upper()
+            if txn_type == "CREDIT":
+                total_income += abs(amount)
+            elif txn_type == "DEBIT":
+                total_expenditure += abs(amount)
+
+        return total_income, total_expenditure
+
+    def reconcile_balances(self, transactions):
+        """
+        Walks the rows in statement order and checks previous_balance +/- amount == balance.
+        The first row with a balance is the anchor (the opening balance is not printed).
+        """
+        mismatches = []
+        checked = 0
+        previous = None
+
+        for index, txn in enumerate(transactions):
+            balance = _to_decimal(_field(txn, "balance"))
+            amount = _to_decimal(_field(txn, "amount", 0))
+            if balance is None or amount is None:
+                # A row without a balance breaks the chain; re-anchor on the next one
+                previous = None
+                continue
+
+            if previous is not None:
+                sign = 1 if str(_field(txn, "type", "")).upper() == "CREDIT" else -1
+                expected = previous + sign * abs(amount)
+                checked += 1
+                if abs(expected - balance) > self.BALANCE_TOLERANCE:
+                    mismatches.append({
+                        "row": index,
+                        "date": _field(txn, "date", "Unknown"),
+                        "expected_balance": float(expected.quantize(CENT, ROUND_HALF_UP)),
+                        "stated_balance": float(balance),
+                    })
+            previous = balance
+
+        if checked == 0:
+            status = "NO_BALANCE_COLUMN"
+        elif mismatches:
+            status = "MISMATCH"
+        else:
+            status = "RECONCILED"
+
+        return {"status": status, "rows_checked": checked, "mismatches": mismatches}
+
+    def reconcile(self, extracted_data):
+        """Returns a copy of the extraction with deterministic totals and a reconciliation report."""
+        data = dict(extracted_data)
+        transactions = data.get("transactions", []) or []
+
+        income, spending = self.compute_totals(transactions)
+        data["total_income"] = float(income.quantize(CENT, ROUND_HALF_UP))
+        data["total_expenditure"] = float(spending.quantize(CENT, ROUND_HALF_UP))
+        data["reconciliation"] = self.reconcile_balances(transactions)
+        return data
+
+
+if __name__ == "__main__":
+    import json
+
+    sample = {
+        "client_name": "Test Subject",
+        "transactions": [
+            {"date": "2023-01-02", "description": "GIRO SALARY", "amount": 5000.10, "type": "CREDIT", "balance": 15000.10},
+            {"date": "2023-01-04", "description": "POS - TOAST BOX SG", "amount": 0.1, "type": "DEBIT", "balance": 15000.00},
+            {"date": "2023-01-05", "description": "GRAB - TRANSPORT", "amount": 0.2, "type": "DEBIT", "balance": 14990.00},
+        ],
+    }
+    print(json.dumps(StatementReconciler().reconcile(sample), indent=2))
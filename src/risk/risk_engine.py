@@ -1,136 +1,89 @@
 import json
 
-class RiskEngine:
-    def __init__(self):
-        # 1. Expense Ratio Limit (For Lifestyle Spends)
-        self.MAX_EXPENSE_RATIO = 0.60  
-        
-        # 2. High Risk Keywords (Compliance)
-        self.HIGH_RISK_KEYWORDS = ["Binance", "Casino", "Betting", "Luno", "Coinhako"]
+from src.risk.reconciliation import StatementReconciler
+from src.risk.counterparty_graph import client_key
+from src.risk.rule_engine import get_rule_set
+from src.monitoring.telemetry import get_logger
 
-        # 3. Structuring / Smurfing Configuration
-        self.REPORTING_LIMIT = 5000
-        self.SMURF_MIN = 4000 
-        self.SMURF_MAX = 4999
-        self.STRUCTURING_THRESHOLD = 1 
+logger = get_logger("risk_engine")
 
-    def detect_smart_structuring(self, transactions):
-        """
-        [NEW FEATURE] Velocity Check.
-        Counts deposits in the 'Smurfing Zone' ($4k-$5k).
-        """
-        sus_count = 0
-        evidence = []
+class RiskEngine:
+    def __init__(self, rules=None, counterparty_graph=None):
+        # 1. AML policy: thresholds, keywords, weights and categories live in aml_rules.json
+        self.rules = rules or get_rule_set()
 
-        for txn in transactions:
-            # Handle Pydantic model object or dict
-            if hasattr(txn, 'description'):
-                description = txn.description.lower()
-                amount = txn.amount
-                txn_type = txn.type.upper()
-            else:
-                description = txn.get("description", "").lower()
-                amount = txn.get("amount", 0.0)
-                txn_type = txn.get("type", "").upper()
+        # 2. Deterministic totals (never trust LLM arithmetic)
+        self.reconciler = StatementReconciler()
 
-            # Logic: Must be a CREDIT (money in) and look like Cash
-            if txn_type == "CREDIT" and "cash" in description:
-                # The "Smart" Check: Is it trying to evade the limit?
-                if self.SMURF_MIN <= amount < self.REPORTING_LIMIT:
-                    sus_count += 1
-                    evidence.append(f"${amount} on {txn.get('date', 'Unknown') if isinstance(txn, dict) else txn.date}")
+        # 3. Optional cross-client memory (mule rings); without it "network" rules are skipped
+        self.counterparty_graph = counterparty_graph
 
-        if sus_count > self.STRUCTURING_THRESHOLD:
-            return {
-                "detected": True,
-                "reason": f"POTENTIAL STRUCTURING: Detected {sus_count} deposits in the 'Smurfing Zone' ($4k-$5k). Logic suggests evasion of the ${self.REPORTING_LIMIT} reporting threshold."
-            }
-        return {"detected": False, "reason": ""}
+    @property
+    def MAX_EXPENSE_RATIO(self):
+        # Expense Ratio Limit (For Lifestyle Spends)
+        return self.rules.current().max_expense_ratio
 
-    def analyze_spending_patterns(self, data):
+    def analyze_spending_patterns(self, data, max_expense_ratio=None):
         """
         Deterministic Math: Calculates TDSR / Expense Ratio.
+        Totals are recomputed from the transaction rows when they are available.
         """
-        income = data.get("total_income", 0.0)
-        spending = data.get("total_expenditure", 0.0)
+        transactions = data.get("transactions", [])
+        if transactions:
+            income, spending = self.reconciler.compute_totals(transactions)
+            income, spending = float(income), float(spending)
+        else:
+            income = data.get("total_income", 0.0)
+            spending = data.get("total_expenditure", 0.0)
+
+        reconciliation = data.get("reconciliation", {}).get("status", "NOT_RUN")
         
         if income == 0:
-            return {"ratio": 1.0, "status": "CRITICAL_NO_INCOME", "breakdown": "N/A", "income": 0, "spending": spending}
+            return {"ratio": 1.0, "status": "CRITICAL_NO_INCOME", "breakdown": "N/A", "income": 0, "spending": spending, "reconciliation": reconciliation}
             
         ratio = spending / income
-        status = "PASS" if ratio < self.MAX_EXPENSE_RATIO else "FAIL_AFFORDABILITY"
+        limit = self.MAX_EXPENSE_RATIO if max_expense_ratio is None else max_expense_ratio
+        status = "PASS" if ratio < limit else "FAIL_AFFORDABILITY"
         
         return {
             "ratio": round(ratio, 2),
             "status": status,
             "income": income,
-            "spending": spending
-        }
-
-    def evaluate_risk_flags(self, data):
-        """
-        Compliance Logic (AML/KYC) - Keywords Only.
-        Structuring check is handled separately in analyze().
-        """
-        flags = data.get("risk_flags", [])
-        risk_score = 0
-        reasons = []
-        category = "LOW_RISK"
-
-        # Check 1: Source of Wealth
-        if "Salary" not in data.get("source_of_wealth", "Unknown"):
-            risk_score += 30
-            reasons.append("Unclear Source of Wealth (No Salary Detected)")
-
-        # Check 2: High Risk Merchant Check
-        for flag in flags:
-            if any(kw.lower() in flag.lower() for kw in self.HIGH_RISK_KEYWORDS):
-                risk_score += 50
-                if f"Found '{flag}'" not in reasons:
-                     reasons.append(f"High Risk Entity: {flag}")
-        
-        # Intermediate Categorization (before structuring check)
-        if risk_score >= 50: 
-            category = "HIGH_RISK"
-        elif risk_score >= 30: 
-            category = "MEDIUM_RISK"
-
-        return {
-            "risk_score": risk_score,
-            "category": category,
-            "reasons": reasons
+            "spending": spending,
+            "limit": limit,
+            "reconciliation": reconciliation
         }
 
     def analyze(self, extracted_data):
-        print("🧠 Risk Engine: Analyzing Financial Health...")
-        
-        # 1. Get Transactions List
-        # Handle case where extracted_data might not have transactions
-        transactions = extracted_data.get("transactions", [])
+        logger.info("🧠 Risk Engine: Analyzing Financial Health...")
 
-        # 2. Run Checks
-        structuring_check = self.detect_smart_structuring(transactions)
-        financial_check = self.analyze_spending_patterns(extracted_data)
-        compliance_check = self.evaluate_risk_flags(extracted_data)
+        # 1. Snapshot the rule set once so a hot reload can't change rules mid-analysis
+        rules = self.rules.current()
 
-        # 3. Integrate Structuring Result
-        if structuring_check["detected"]:
-            compliance_check["category"] = "HIGH_RISK"
-            compliance_check["risk_score"] += 100 # Instant Fail
-            compliance_check["reasons"].append(structuring_check["reason"])
-
-        # 4. Final Decision
+        # 2. Run Checks (every transaction rule is aggregated in one pass over the rows)
+        transactions = extracted_data.get("transactions", [])
+        aggregates = rules.scan(transactions, stats=self.rules.stats)
+        financial_check = self.analyze_spending_patterns(extracted_data, rules.max_expense_ratio)
+        network = None
+        if self.counterparty_graph is not None:
+            network = self.counterparty_graph.ingest(client_key(extracted_data), transactions)
+        compliance_check = rules.evaluate(extracted_data, aggregates, stats=self.rules.stats, network=network)
+
+        # 3. Final Decision
         # Reject if Affordability Fails OR Compliance Risk is High
         final_decision = "APPROVE"
-        if financial_check["status"] != "PASS" or compliance_check["category"] == "HIGH_RISK":
+        if financial_check["status"] != "PASS" or compliance_check["category"] in rules.reject_categories:
             final_decision = "REJECT"
-            
-        return {
+
+        report = {
             "client_name": extracted_data.get("client_name"),
             "final_decision": final_decision,
             "math_analysis": financial_check,
             "compliance_analysis": compliance_check
         }
+        if network is not None:
+            report["network_analysis"] = network
+        return report
 
 if __name__ == "__main__":
     # Test with dummy data containing transaction objects
@@ -143,8 +96,6 @@ if __name__ == "__main__":
 
     dummy_input = {
         "client_name": "Test Subject Smurf",
-        "total_income": 5000.0,
-        "total_expenditure": 2000.0,
         "risk_flags": [],
         "source_of_wealth": "Salary",
         "transactions": [
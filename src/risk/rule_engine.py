@@ -0,0 +1,547 @@
+"""
+Declarative AML rules (src/risk/aml_rules.json) compiled into a single-pass evaluator.
+
+Rule scopes:
+- "transactions": a predicate over rows + an aggregate ("count" or "sum" of amount),
+  optionally over the busiest `window_days` window, fired by a `trigger` comparison.
+  Rows whose date cannot be read (e.g. "Unknown") count towards every window, i.e.
+  against the whole statement, so a bad date never hides a deposit.
+- "risk_flags":   fires once per LLM risk flag containing any of `contains_any`
+                  (or resolving to a merchant in `merchant_category_in`).
+- "document":     a check on one top-level field of the extraction.
+- "network":      a trigger on one cross-client metric from the counterparty graph
+                  (skipped when the engine runs without one).
+
+All transaction rules share ONE scan of the rows: each row's fields are read once and
+only the rules indexed under its type are tested. Aggregates are plain counters that
+can be merged, so callers can scan statements separately and evaluate the union.
+
+The rule file is re-read when its mtime changes (checked at most every
+RELOAD_CHECK_SECONDS). Per-rule timing is opt-in (SENTINEL_RULE_TIMING=1).
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import date, datetime
+from functools import lru_cache
+
+from src.monitoring.telemetry import get_logger, record_rule_hit
+from src.risk.merchant_normalizer import get_normalizer
+from src.risk.reconciliation import _field
+
+logger = get_logger("rule_engine")
+
+RULES_PATH = os.getenv("SENTINEL_AML_RULES", os.path.join(os.path.dirname(__file__), "aml_rules.json"))
+RELOAD_CHECK_SECONDS = float(os.getenv("SENTINEL_RULE_RELOAD_SECONDS", 1.0))
+RULE_TIMING = os.getenv("SENTINEL_RULE_TIMING", "0").lower() in ("1", "true", "on")
+
+TRIGGER_OPS = {
+    "gt": lambda value, limit: value > limit,
+    "gte": lambda value, limit: value >= limit,
+    "lt": lambda value, limit: value < limit,
+    "lte": lambda value, limit: value <= limit,
+}
+
+
+# Placeholder values each scope formats its reason with (see CompiledRuleSet.evaluate)
+REASON_FIELDS = {
+    "transactions": {"value": 0, "count": 0, "total": 0.0},
+    "risk_flags": {"match": ""},
+    "document": {"value": ""},
+    "network": {"value": 0},
+}
+
+
+class RuleError(ValueError):
+    """Raised when the rule file is malformed; the previous rule set stays active."""
+
+
+def _check_reason(rule):
+    """Formats the reason once with placeholder values, so a bad template fails the reload, not a request."""
+    try:
+        rule["reason"].format(**REASON_FIELDS.get(rule["scope"], {}))
+    except (KeyError, IndexError, ValueError, AttributeError, TypeError) as exc:
+        raise RuleError(f"{rule['id']}: bad reason template ({type(exc).__name__}: {exc})") from exc
+
+
+# Statement dates other than ISO that OCR/LLM extraction produces (day-first, as on SG statements)
+DATE_FORMATS = ("%d %b %Y", "%d %B %Y", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%b %d, %Y", "%B %d, %Y", "%d %b %y")
+
+
+@lru_cache(maxsize=4096)
+def _day(value):
+    """Day ordinal of a statement date, or None when it cannot be read."""
+    text = str(value or "").strip()
+    try:
+        return date.fromisoformat(text[:10]).toordinal()
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).toordinal()
+        except ValueError:
+            continue
+    return None
+
+
+class RuleAggregate:
+    """
+    Running count/sum for one transaction rule. Windowed rules also keep dated events,
+    plus the count/sum of undated ones (which fall inside every window). Undated rows that
+    were sealed with their statement's day (`undated_batches`) are pruned along with it.
+    """
+    __slots__ = ("count", "total", "events", "undated_count", "undated_total", "undated_batches")
+
+    def __init__(self, count=0, total=0.0, events=None, undated_count=0, undated_total=0.0, undated_batches=None):
+        self.count = count
+        self.total = total
+        self.events = events if events is not None else []
+        self.undated_count = undated_count
+        self.undated_total = undated_total
+        self.undated_batches = undated_batches if undated_batches is not None else []  # [anchor day, count, total]
+
+    def add(self, amount, day=None, windowed=False):
+        self.count += 1
+        self.total += amount
+        if day is not None:
+            self.events.append((day, amount))
+        elif windowed:
+            self.undated_count += 1
+            self.undated_total += amount
+
+    def seal_undated(self, anchor_day):
+        """Ties the undated rows added since the last seal to anchor_day, so prune() can age them out."""
+        sealed_count = sum(batch[1] for batch in self.undated_batches)
+        if self.undated_count > sealed_count:
+            sealed_total = sum(batch[2] for batch in self.undated_batches)
+            self.undated_batches.append([anchor_day, self.undated_count - sealed_count, self.undated_total - sealed_total])
+
+    def prune(self, min_day):
+        """Drops dated events and sealed undated rows before min_day (windowed rules never look further back)."""
+        self.events = [event for event in self.events if event[0] >= min_day]
+        for anchor_day, count, total in self.undated_batches:
+            if anchor_day < min_day:
+                self.undated_count -= count
+                self.undated_total -= total
+        self.undated_batches = [batch for batch in self.undated_batches if batch[0] >= min_day]
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.events.extend(other.events)
+        self.undated_count += other.undated_count
+        self.undated_total += other.undated_total
+        self.undated_batches.extend(other.undated_batches)
+        return self
+
+    def to_dict(self):
+        return {"count": self.count, "total": self.total, "events": self.events,
+                "undated_count": self.undated_count, "undated_total": self.undated_total,
+                "undated_batches": self.undated_batches}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["count"], data["total"], [tuple(e) for e in data.get("events", [])],
+                   data.get("undated_count", 0), data.get("undated_total", 0.0),
+                   [list(batch) for batch in data.get("undated_batches", [])])
+
+
+class TransactionRule:
+    def __init__(self, spec):
+        where = spec.get("where", {})
+        self.id = spec["id"]
+        self.type = where.get("type", "").upper() or None
+        self.aggregate = spec.get("aggregate", "count")
+        if self.aggregate not in ("count", "sum"):
+            raise RuleError(f"{self.id}: unknown aggregate '{self.aggregate}'")
+        self.window_days = spec.get("window_days")
+        self.match = self._compile_predicate(where)
+        self.trigger = _compile_trigger(self.id, spec.get("trigger", {"gte": 1}))
+
+    def _compile_predicate(self, where):
+        """Builds one closure; cheapest checks (amount bounds) run first."""
+        checks = []
+        bounds = [(key, where[key]) for key in ("amount_gte", "amount_gt", "amount_lt", "amount_lte") if key in where]
+        for key, limit in bounds:
+            op = TRIGGER_OPS[key.split("_")[1]]
+            checks.append(lambda desc, amount, op=op, limit=float(limit): op(amount, limit))
+
+        needles = [n.lower() for n in where.get("description_contains", [])]
+        if needles:
+            checks.append(lambda desc, amount: any(n in desc for n in needles))
+        excludes = [n.lower() for n in where.get("description_excludes", [])]
+        if excludes:
+            checks.append(lambda desc, amount: not any(n in desc for n in excludes))
+        if "description_matches" in where:
+            pattern = re.compile(where["description_matches"], re.I)
+            checks.append(lambda desc, amount: pattern.search(desc) is not None)
+        if "merchant_category_in" in where:
+            # Canonical merchant lookup; LRU-cached, so repeated descriptions cost a dict hit
+            categories = set(where["merchant_category_in"])
+            resolve = get_normalizer().resolve
+            checks.append(lambda desc, amount: resolve(desc).category in categories)
+
+        if not checks:
+            return lambda desc, amount: True
+        if len(checks) == 1:
+            return checks[0]
+        return lambda desc, amount: all(check(desc, amount) for check in checks)
+
+    def value(self, agg):
+        """The aggregate the trigger is compared against (whole statement or busiest window)."""
+        if not self.window_days:
+            return agg.count if self.aggregate == "count" else round(agg.total, 2)
+
+        # Two pointers over the date-sorted events: the window is (day - window_days, day].
+        # Undated events cannot be placed, so they are counted in every window.
+        events = sorted(agg.events)
+        best = 0
+        running = agg.undated_total
+        start = 0
+        for end, (day, amount) in enumerate(events):
+            running += amount
+            while events[start][0] <= day - self.window_days:
+                running -= events[start][1]
+                start += 1
+            best = max(best, end - start + 1 + agg.undated_count if self.aggregate == "count" else round(running, 2))
+        if not events:
+            best = agg.undated_count if self.aggregate == "count" else round(agg.undated_total, 2)
+        return best
+
+
+def _compile_trigger(rule_id, trigger):
+    comparisons = []
+    for op, limit in trigger.items():
+        if op not in TRIGGER_OPS:
+            raise RuleError(f"{rule_id}: unknown trigger '{op}'")
+        comparisons.append((TRIGGER_OPS[op], limit))
+    return lambda value: all(op(value, limit) for op, limit in comparisons)
+
+
+class CompiledRuleSet:
+    """One immutable compilation of the rule file."""
+
+    def __init__(self, spec):
+        policy = spec.get("policy", {})
+        self.version = spec.get("version")
+        self.max_expense_ratio = float(policy.get("max_expense_ratio", 0.60))
+        self.categories = sorted(
+            ((c["min_score"], c["name"]) for c in policy.get("categories", [])), reverse=True
+        )
+        self.default_category = policy.get("default_category", "LOW_RISK")
+        self.reject_categories = set(policy.get("reject_categories", ["HIGH_RISK"]))
+
+        self.rules = []              # every rule spec, in file order (= reason order)
+        self.transaction_rules = {}  # id -> TransactionRule
+        self.by_type = {}            # row type -> [TransactionRule] (untyped rules under every type)
+        self.untyped = []
+        self.flag_rules = {}         # id -> (lower-cased keywords, merchant categories)
+        self.document_rules = []
+        self.network_rules = {}      # id -> compiled trigger
+        self.fingerprints = {}       # id -> hash of the rule spec (lets stored aggregates outlive reloads)
+
+        seen = set()
+        for rule in spec.get("rules", []):
+            for key in ("id", "scope", "reason"):
+                if key not in rule:
+                    raise RuleError(f"rule {rule.get('id', '?')} is missing '{key}'")
+            if rule["id"] in seen:
+                raise RuleError(f"duplicate rule id '{rule['id']}'")
+            seen.add(rule["id"])
+            if rule.get("enabled", True) is False:
+                continue
+            _check_reason(rule)
+            self.rules.append(rule)
+            self.fingerprints[rule["id"]] = hashlib.sha1(json.dumps(rule, sort_keys=True).encode()).hexdigest()[:16]
+
+            scope = rule["scope"]
+            if scope == "transactions":
+                compiled = TransactionRule(rule)
+                self.transaction_rules[rule["id"]] = compiled
+                if compiled.type:
+                    self.by_type.setdefault(compiled.type, []).append(compiled)
+                else:
+                    self.untyped.append(compiled)
+            elif scope == "risk_flags":
+                needles = [kw.lower() for kw in rule["where"].get("contains_any", [])]
+                self.flag_rules[rule["id"]] = (needles, set(rule["where"].get("merchant_category_in", [])))
+            elif scope == "document":
+                self.document_rules.append(rule)
+            elif scope == "network":
+                self.network_rules[rule["id"]] = _compile_trigger(rule["id"], rule.get("trigger", {"gte": 1}))
+            else:
+                raise RuleError(f"{rule['id']}: unknown scope '{scope}'")
+
+        for rules in self.by_type.values():
+            rules.extend(self.untyped)
+
+    def new_aggregates(self):
+        return {rule_id: RuleAggregate() for rule_id in self.transaction_rules}
+
+    def scan(self, transactions, aggregates=None, stats=None):
+        """
+        The fused pass: updates every transaction rule's aggregate in one walk over the rows.
+        Pass `aggregates` to keep accumulating onto an earlier scan.
+        """
+        aggregates = aggregates if aggregates is not None else self.new_aggregates()
+        by_type, untyped = self.by_type, self.untyped
+        timer = time.perf_counter_ns if stats is not None else None
+
+        for txn in transactions:
+            candidates = by_type.get(str(_field(txn, "type", "")).upper(), untyped)
+            if not candidates:
+                continue
+            description = str(_field(txn, "description", "") or "").lower()
+            try:
+                amount = float(_field(txn, "amount", 0.0) or 0.0)
+            except (TypeError, ValueError):
+                continue
+
+            for rule in candidates:
+                if timer:
+                    t0 = timer()
+                    matched = rule.match(description, amount)
+                    stats.observe(rule.id, timer() - t0, matched)
+                else:
+                    matched = rule.match(description, amount)
+                if matched:
+                    day = _day(_field(txn, "date", "")) if rule.window_days else None
+                    aggregates[rule.id].add(amount, day, bool(rule.window_days))
+        return aggregates
+
+    def evaluate(self, data, aggregates, stats=None, network=None):
+        """Scores one extraction from its document fields, pre-computed row aggregates and network metrics."""
+        risk_score = 0
+        reasons = []
+        reason_categories = []
+        forced = set()
+
+        def fire(rule, **fmt):
+            nonlocal risk_score
+            risk_score += rule.get("weight", 0)
+            reasons.append(rule["reason"].format(**fmt))
+            reason_categories.append(rule.get("category", "OTHER"))
+            if rule.get("force_category"):
+                forced.add(rule["force_category"])
+            record_rule_hit(rule["id"])
+            if stats is not None:
+                stats.fired(rule["id"])
+
+        flags = data.get("risk_flags", []) or []
+        for rule in self.rules:
+            scope = rule["scope"]
+            if scope == "document":
+                where = rule["where"]
+                value = str(data.get(where["field"]) or where.get("default", ""))
+                if "not_contains" in where and where["not_contains"] not in value:
+                    fire(rule, value=value)
+                elif "contains" in where and where["contains"] in value:
+                    fire(rule, value=value)
+                elif "equals" in where and where["equals"] == value:
+                    fire(rule, value=value)
+            elif scope == "risk_flags":
+                needles, categories = self.flag_rules[rule["id"]]
+                for flag in flags:
+                    if any(kw in flag.lower() for kw in needles) or (
+                        categories and get_normalizer().resolve(flag).category in categories
+                    ):
+                        fire(rule, match=flag)
+            elif scope == "network":
+                if network is None:
+                    continue
+                value = network.get(rule["where"]["metric"], 0)
+                if self.network_rules[rule["id"]](value):
+                    fire(rule, value=value)
+            else:
+                compiled = self.transaction_rules[rule["id"]]
+                agg = aggregates.get(rule["id"]) or RuleAggregate()
+                value = compiled.value(agg)
+                if compiled.trigger(value):
+                    fire(rule, value=value, count=agg.count, total=round(agg.total, 2))
+
+        category = self.default_category
+        for min_score, name in self.categories:
+            if risk_score >= min_score:
+                category = name
+                break
+        # Forcing rules override the score bands, most severe band first
+        for _, name in self.categories:
+            if name in forced:
+                category = name
+                break
+
+        return {
+            "risk_score": risk_score,
+            "category": category,
+            "reasons": reasons,
+            "reason_categories": reason_categories,
+        }
+
+
+class RuleStats:
+    """Per-rule evaluation counts and predicate time (approximate under threads)."""
+
+    def __init__(self):
+        self._stats = {}
+
+    def _entry(self, rule_id):
+        entry = self._stats.get(rule_id)
+        if entry is None:
+            entry = self._stats[rule_id] = {"evaluations": 0, "matches": 0, "fired": 0, "time_ns": 0}
+        return entry
+
+    def observe(self, rule_id, elapsed_ns, matched):
+        entry = self._entry(rule_id)
+        entry["evaluations"] += 1
+        entry["time_ns"] += elapsed_ns
+        if matched:
+            entry["matches"] += 1
+            record_rule_hit(rule_id, "matched")
+
+    def fired(self, rule_id):
+        self._entry(rule_id)["fired"] += 1
+
+    def snapshot(self):
+        out = {}
+        for rule_id, entry in self._stats.items():
+            evaluations = entry["evaluations"]
+            out[rule_id] = dict(entry, avg_ns=round(entry["time_ns"] / evaluations, 1) if evaluations else 0.0)
+        return out
+
+
+class RuleSet:
+    """Hot-reloading handle on the rule file; `current()` is the active compilation."""
+
+    def __init__(self, path=RULES_PATH, timing=RULE_TIMING):
+        self.path = path
+        self.stats = RuleStats() if timing else None
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked = 0.0
+        self._compiled = None
+        self.reload(force=True)
+
+    def reload(self, force=False):
+        """Recompiles if the file changed. A broken file is logged and the old rules stay live."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as exc:
+            if self._compiled is None:
+                raise
+            logger.error("❌ Rule file unavailable (%s); keeping version %s", exc, self._compiled.version)
+            return False
+        if not force and mtime == self._mtime:
+            return False
+
+        with self._lock:
+            if not force and mtime == self._mtime:
+                return False
+            try:
+                with open(self.path) as fh:
+                    compiled = CompiledRuleSet(json.load(fh))
+            except (ValueError, KeyError, TypeError, AttributeError) as exc:
+                if self._compiled is None:
+                    raise
+                logger.error("❌ Rejected rule file %s: %s", self.path, exc)
+                self._mtime = mtime  # don't re-parse the same broken file every check
+                return False
+            self._compiled = compiled
+            self._mtime = mtime
+        logger.info("📜 Loaded %d AML rules (version %s) from %s", len(compiled.rules), compiled.version, self.path)
+        return True
+
+    def current(self):
+        now = time.monotonic()
+        if now - self._checked >= RELOAD_CHECK_SECONDS:
+            self._checked = now
+            self.reload()
+        return self._compiled
+
+    def evaluate(self, data, transactions=None):
+        """Convenience: scan + evaluate one extraction against the current rules."""
+        rules = self.current()
+        rows = data.get("transactions", []) if transactions is None else transactions
+        return rules.evaluate(data, rules.scan(rows, stats=self.stats), stats=self.stats)
+
+
+@lru_cache(maxsize=None)
+def get_rule_set():
+    """Process-wide RuleSet over aml_rules.json: one compilation, one reload check, one set of stats."""
+    return RuleSet()
+
+
+# --- Test Block ---
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+
+    scratch = tempfile.mkdtemp(prefix="sentinel-rules-")
+    path = os.path.join(scratch, "rules.json")
+    shutil.copy(RULES_PATH, path)
+
+    statement = {
+        "source_of_wealth": "Salary",
+        "risk_flags": ["MST BINANCE HOLDINGS LTD"],
+        "transactions": [
+            {"date": "2024-01-02", "description": "CASH DEPOSIT ATM", "amount": 4850.0, "type": "CREDIT"},
+            {"date": "2024-01-03", "description": "CASH DEPOSIT BRANCH", "amount": 4900.0, "type": "CREDIT"},
+            {"date": "2024-01-20", "description": "CASH DEPOSIT ATM", "amount": 4700.0, "type": "CREDIT"},
+            {"date": "2024-01-05", "description": "Starbucks", "amount": 5.5, "type": "DEBIT"},
+        ],
+    }
+
+    # 1. Shipped rules: structuring + high-risk entity
+    rules = RuleSet(path, timing=True)
+    result = rules.evaluate(statement)
+    print(json.dumps(result, indent=2))
+    assert result["category"] == "HIGH_RISK" and result["risk_score"] == 150
+    assert result["reason_categories"] == ["HIGH_RISK_ENTITY", "STRUCTURING"]
+
+    # 2. Hot reload: add a windowed typology without touching code
+    with open(path) as fh:
+        spec = json.load(fh)
+    spec["version"] = 2
+    spec["rules"].append({
+        "id": "cash_burst_7d", "category": "STRUCTURING", "scope": "transactions",
+        "where": {"type": "CREDIT", "description_contains": ["cash"]},
+        "aggregate": "sum", "window_days": 7, "trigger": {"gte": 9000}, "weight": 40,
+        "reason": "POTENTIAL STRUCTURING: ${value:,.2f} cash deposited within 7 days.",
+    })
+    with open(path, "w") as fh:
+        json.dump(spec, fh)
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+    assert rules.reload() and rules.current().version == 2
+    result = rules.evaluate(statement)
+    assert "POTENTIAL STRUCTURING: $9,750.00 cash deposited within 7 days." in result["reasons"], result
+    print("✅ Hot reload picked up a new windowed rule.")
+
+    # 3. A broken edit is rejected and the last good rules stay live
+    with open(path, "w") as fh:
+        fh.write("{ not json")
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 2_000_000))
+    assert not rules.reload() and rules.current().version == 2
+    print("✅ Malformed rule file rejected; version 2 still active.")
+
+    # A structurally wrong file (list, not object) and a reason template with an unknown field
+    # are rejected at reload time too, instead of failing later on a request
+    bad_reason = dict(spec["rules"][-1], id="bad_reason", reason="Deposited {amount} in cash")
+    for step, broken in enumerate(([], dict(spec, version=3, rules=spec["rules"] + [bad_reason])), start=3):
+        with open(path, "w") as fh:
+            json.dump(broken, fh)
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + step * 1_000_000))
+        assert not rules.reload() and rules.current().version == 2
+    print("✅ Non-object rule file and bad reason template rejected; version 2 still active.")
+
+    # 4. Non-ISO and unreadable dates still count towards the 31-day structuring window
+    assert _day("02 Jan 2024") == _day("2024-01-02") == _day("02/01/2024") and _day("Unknown") is None
+    for dates in (["02 Jan 2024", "09 Jan 2024"], ["Unknown", "Unknown"], ["2024-01-02", "Unknown"]):
+        rows = [{"date": d, "description": "CASH DEPOSIT ATM", "amount": 4800.0, "type": "CREDIT"} for d in dates]
+        result = rules.evaluate({"source_of_wealth": "Salary", "transactions": rows})
+        assert "STRUCTURING" in result["reason_categories"], (dates, result)
+    print("✅ Structuring fires on '02 Jan 2024' and 'Unknown' dates.")
+
+    print(json.dumps(rules.stats.snapshot(), indent=2))
+    shutil.rmtree(scratch)
@@ -0,0 +1,386 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from src.monitoring.telemetry import get_logger
+
+logger = get_logger("decision_store")
+
+DB_PATH = os.getenv("SENTINEL_DECISION_DB", "sentinel_decisions.sqlite")
+
+MAX_PAGE_SIZE = 200
+MAX_TRANSACTION_PAGE_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS decisions (
+    id               INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id           TEXT,
+    created_at       TEXT NOT NULL,
+    client_name      TEXT,
+    client_name_norm TEXT,
+    account_number   TEXT,
+    statement_date   TEXT,
+    decision         TEXT,
+    risk_category    TEXT,
+    risk_score       INTEGER,
+    expense_ratio    REAL,
+    income           REAL,
+    spending         REAL,
+    client_data      TEXT,
+    risk_analysis    TEXT,
+    legal_opinion    TEXT,
+    wealth_plan      TEXT
+);
+-- One row per (reason category, decision); clustered so a category is scanned newest-first
+CREATE TABLE IF NOT EXISTS decision_reasons (
+    category    TEXT NOT NULL,
+    decision_id INTEGER NOT NULL REFERENCES decisions(id),
+    reasons     TEXT,
+    PRIMARY KEY (category, decision_id)
+) WITHOUT ROWID;
+-- Extracted transactions in statement order, one row each, so they can be paged without loading client_data
+CREATE TABLE IF NOT EXISTS decision_transactions (
+    decision_id INTEGER NOT NULL REFERENCES decisions(id),
+    seq         INTEGER NOT NULL,
+    txn         TEXT NOT NULL,
+    PRIMARY KEY (decision_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_decisions_client_name ON decisions(client_name_norm, id);
+CREATE INDEX IF NOT EXISTS idx_decisions_account ON decisions(account_number, id);
+CREATE INDEX IF NOT EXISTS idx_decisions_decision ON decisions(decision, id);
+CREATE INDEX IF NOT EXISTS idx_decisions_statement_date ON decisions(statement_date, id);
+CREATE INDEX IF NOT EXISTS idx_decisions_job ON decisions(job_id);
+"""
+
+# PRAGMA user_version: 1 = transactions live in decision_transactions, never inside client_data
+SCHEMA_VERSION = 1
+
+# Columns returned by list queries (the JSON blobs are only loaded by get())
+SUMMARY_COLUMNS = (
+    "id", "job_id", "created_at", "client_name", "account_number", "statement_date",
+    "decision", "risk_category", "risk_score", "expense_ratio", "income", "spending",
+)
+
+# Reason text prefix -> reason category (RiskEngine reason strings)
+REASON_PREFIXES = [
+    ("POTENTIAL STRUCTURING", "STRUCTURING"),
+    ("High Risk Entity", "HIGH_RISK_ENTITY"),
+    ("Unclear Source of Wealth", "SOURCE_OF_WEALTH"),
+    ("POTENTIAL MULE RING", "MULE_RING"),
+    ("SANCTIONED COUNTERPARTY", "SANCTIONED"),
+]
+
+MATH_STATUS_CATEGORIES = {
+    "FAIL_AFFORDABILITY": "AFFORDABILITY",
+    "CRITICAL_NO_INCOME": "NO_INCOME",
+}
+
+
+def reason_category(reason):
+    for prefix, category in REASON_PREFIXES:
+        if reason.startswith(prefix):
+            return category
+    return "OTHER"
+
+
+def _reason_rows(risk_analysis):
+    """{category: [reasons]} for one decision, including affordability failures."""
+    grouped = {}
+    compliance = risk_analysis.get("compliance_analysis", {})
+    reasons = compliance.get("reasons", [])
+    # Rule-engine output carries each reason's category; older results fall back to the text prefix
+    categories = compliance.get("reason_categories") or [reason_category(r) for r in reasons]
+    for reason, category in zip(reasons, categories):
+        grouped.setdefault(category, []).append(reason)
+
+    math_status = risk_analysis.get("math_analysis", {}).get("status")
+    if math_status in MATH_STATUS_CATEGORIES:
+        grouped.setdefault(MATH_STATUS_CATEGORIES[math_status], []).append(math_status)
+    return grouped
+
+
+class DecisionStore:
+    """
+    Embedded SQLite store of every analysis (client_data, risk_analysis, final decision).
+    Lookups by client, account, decision, reason category and statement date are
+    indexed and keyset-paginated (newest first), so they never rescan the table.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._migrate()
+
+    def _migrate(self):
+        """Moves transactions still stored inside client_data (pre-v1 rows) to decision_transactions."""
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        moved = 0
+        with self._conn:
+            legacy = self._conn.execute(
+                "SELECT id, client_data FROM decisions WHERE json_type(client_data, '$.transactions') IS NOT NULL"
+            ).fetchall()
+            for row in legacy:
+                client_data = json.loads(row["client_data"])
+                transactions = client_data.pop("transactions") or []
+                self._conn.execute("DELETE FROM decision_transactions WHERE decision_id = ?", (row["id"],))
+                self._conn.executemany(
+                    "INSERT INTO decision_transactions (decision_id, seq, txn) VALUES (?, ?, ?)",
+                    [(row["id"], seq, json.dumps(txn)) for seq, txn in enumerate(transactions)],
+                )
+                self._conn.execute("UPDATE decisions SET client_data = ? WHERE id = ?", (json.dumps(client_data), row["id"]))
+                moved += len(transactions)
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        if legacy:
+            logger.info("🗄️ Decision store: moved %d transactions of %d decisions out of client_data", moved, len(legacy))
+
+    def record(self, job_id, result):
+        """Stores one pipeline result; returns its decision ID."""
+        client_data = dict(result.get("client_data") or {})
+        transactions = client_data.pop("transactions", None) or []
+        risk_analysis = result.get("risk_analysis") or {}
+        compliance = risk_analysis.get("compliance_analysis", {})
+        math = risk_analysis.get("math_analysis", {})
+        client_name = client_data.get("client_name")
+
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                """
+                INSERT INTO decisions (
+                    job_id, created_at, client_name, client_name_norm, account_number, statement_date,
+                    decision, risk_category, risk_score, expense_ratio, income, spending,
+                    client_data, risk_analysis, legal_opinion, wealth_plan
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    job_id,
+                    datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    client_name,
+                    client_name.strip().lower() if client_name else None,
+                    client_data.get("account_number"),
+                    client_data.get("statement_date"),
+                    result.get("final_decision"),
+                    compliance.get("category"),
+                    compliance.get("risk_score"),
+                    math.get("ratio"),
+                    math.get("income"),
+                    math.get("spending"),
+                    json.dumps(client_data),
+                    json.dumps(risk_analysis),
+                    result.get("legal_opinion"),
+                    result.get("wealth_plan"),
+                ),
+            )
+            decision_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO decision_reasons (category, decision_id, reasons) VALUES (?, ?, ?)",
+                [(category, decision_id, json.dumps(reasons)) for category, reasons in _reason_rows(risk_analysis).items()],
+            )
+            self._conn.executemany(
+                "INSERT INTO decision_transactions (decision_id, seq, txn) VALUES (?, ?, ?)",
+                [(decision_id, seq, json.dumps(txn)) for seq, txn in enumerate(transactions)],
+            )
+        return decision_id
+
+    def get(self, decision_id, include_transactions=True):
+        """
+        Full record, including client_data and risk_analysis; None if unknown.
+        Without `include_transactions`, client_data carries only `transaction_count`.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM decisions WHERE id = ?", (decision_id,)).fetchone()
+            if row is None:
+                return None
+            reasons = self._conn.execute(
+                "SELECT category, reasons FROM decision_reasons WHERE decision_id = ?", (decision_id,)
+            ).fetchall()
+            if include_transactions:
+                txns = self._conn.execute(
+                    "SELECT txn FROM decision_transactions WHERE decision_id = ? ORDER BY seq", (decision_id,)
+                ).fetchall()
+            else:
+                txn_count = self._conn.execute(
+                    "SELECT COUNT(*) FROM decision_transactions WHERE decision_id = ?", (decision_id,)
+                ).fetchone()[0]
+
+        record = dict(row)
+        record.pop("client_name_norm")
+        record["client_data"] = json.loads(record["client_data"] or "null")
+        record["risk_analysis"] = json.loads(record["risk_analysis"] or "null")
+        record["reasons"] = {r["category"]: json.loads(r["reasons"]) for r in reasons}
+
+        client_data = record["client_data"]
+        if client_data is not None:
+            if include_transactions:
+                client_data["transactions"] = [json.loads(t["txn"]) for t in txns]
+            else:
+                client_data["transaction_count"] = txn_count
+        return record
+
+    def transactions(self, decision_id, limit=200, cursor=None):
+        """
+        One page of a decision's transactions in statement order; None if the decision is unknown.
+        `cursor` is the `next_cursor` of the previous page (the last row's position).
+        """
+        limit = max(1, min(int(limit), MAX_TRANSACTION_PAGE_SIZE))
+        start = -1 if cursor is None else int(cursor)
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM decisions WHERE id = ?", (decision_id,)).fetchone() is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT seq, txn FROM decision_transactions WHERE decision_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (decision_id, start, limit + 1),
+            ).fetchall()
+            total = self._conn.execute(
+                "SELECT COUNT(*) FROM decision_transactions WHERE decision_id = ?", (decision_id,)
+            ).fetchone()[0]
+
+        rows = [(r["seq"], json.loads(r["txn"])) for r in rows]
+        page = rows[:limit]
+        next_cursor = page[-1][0] if len(rows) > limit else None
+        return {"items": [txn for _, txn in page], "next_cursor": next_cursor, "total": total}
+
+    def query(self, client_name=None, account_number=None, decision=None, reason_category=None,
+              statement_from=None, statement_to=None, limit=50, cursor=None):
+        """
+        Newest-first page of decision summaries.
+        `client_name` is a case-insensitive prefix; `cursor` is the `next_cursor` of the previous page.
+        """
+        clauses, params = [], []
+
+        if reason_category:
+            # Drive the scan from the (category, decision_id) key: already in id order, no sort
+            source = "decision_reasons r JOIN decisions d ON d.id = r.decision_id"
+            id_column = "r.decision_id"
+            clauses.append("r.category = ?")
+            params.append(reason_category.upper())
+        else:
+            source = "decisions d"
+            id_column = "d.id"
+
+        if client_name:
+            # Prefix match as an index range scan (LIKE would not use the index)
+            prefix = client_name.strip().lower()
+            clauses.append("d.client_name_norm >= ? AND d.client_name_norm < ?")
+            params += [prefix, prefix + "\uffff"]
+        if account_number:
+            clauses.append("d.account_number = ?")
+            params.append(account_number)
+        if decision:
+            clauses.append("d.decision = ?")
+            params.append(decision.upper())
+        if statement_from:
+            clauses.append("d.statement_date >= ?")
+            params.append(statement_from)
+        if statement_to:
+            clauses.append("d.statement_date <= ?")
+            params.append(statement_to)
+        if cursor:
+            clauses.append(f"{id_column} < ?")
+            params.append(int(cursor))
+
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        columns = ", ".join(f"d.{col}" for col in SUMMARY_COLUMNS)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT {columns} FROM {source} {where} ORDER BY {id_column} DESC LIMIT ?"
+
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit + 1]).fetchall()
+
+        items = [dict(r) for r in rows[:limit]]
+        next_cursor = items[-1]["id"] if len(rows) > limit else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    def stats(self):
+        """Portfolio analytics: counts per decision and per reason category."""
+        with self._lock:
+            by_decision = self._conn.execute(
+                """
+                SELECT decision, COUNT(*) AS count, AVG(risk_score) AS avg_risk_score, AVG(expense_ratio) AS avg_expense_ratio
+                FROM decisions GROUP BY decision
+                """
+            ).fetchall()
+            by_reason = self._conn.execute(
+                """
+                SELECT r.category, d.decision, COUNT(*) AS count
+                FROM decision_reasons r JOIN decisions d ON d.id = r.decision_id
+                GROUP BY r.category, d.decision
+                """
+            ).fetchall()
+
+        return {
+            "by_decision": [dict(r) for r in by_decision],
+            "by_reason_category": [dict(r) for r in by_reason],
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# --- Test Block ---
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    store = DecisionStore(os.path.join(tempfile.mkdtemp(), "decisions.sqlite"))
+
+    smurf = {
+        "final_decision": "REJECT",
+        "client_data": {"client_name": "Test Subject Smurf", "account_number": "1234567890", "statement_date": "2024-01-31"},
+        "risk_analysis": {
+            "math_analysis": {"ratio": 0.2, "status": "PASS", "income": 9750.0, "spending": 5.5},
+            "compliance_analysis": {"risk_score": 100, "category": "HIGH_RISK",
+                                    "reasons": ["POTENTIAL STRUCTURING: Detected 2 deposits in the 'Smurfing Zone' ($4k-$5k)."]},
+        },
+    }
+    clean = {
+        "final_decision": "APPROVE",
+        "client_data": {"client_name": "Jane Tan", "account_number": "5555555555", "statement_date": "2024-02-29"},
+        "risk_analysis": {
+            "math_analysis": {"ratio": 0.4, "status": "PASS", "income": 8000.0, "spending": 3200.0},
+            "compliance_analysis": {"risk_score": 0, "category": "LOW_RISK", "reasons": []},
+        },
+    }
+
+    for i in range(5000):
+        store.record(f"job-{i}", smurf if i % 5 == 0 else clean)
+
+    start = time.perf_counter()
+    page = store.query(decision="REJECT", reason_category="STRUCTURING", limit=20)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"✅ {len(page['items'])} STRUCTURING rejects in {elapsed_ms:.2f}ms, next_cursor={page['next_cursor']}")
+
+    second = store.query(decision="REJECT", reason_category="STRUCTURING", limit=20, cursor=page["next_cursor"])
+    assert second["items"][0]["id"] < page["items"][-1]["id"]
+    assert store.query(client_name="test sub")["items"][0]["client_name"] == "Test Subject Smurf"
+    assert "STRUCTURING" in store.get(page["items"][0]["id"])["reasons"]
+
+    rows = [{"date": "2024-01-02", "description": f"CASH DEPOSIT {i}", "amount": 4500.0, "type": "CREDIT"} for i in range(450)]
+    long_id = store.record("job-long", dict(smurf, client_data=dict(smurf["client_data"], transactions=rows)))
+    first = store.transactions(long_id, limit=200)
+    rest = store.transactions(long_id, limit=1000, cursor=first["next_cursor"])
+    assert first["items"] + rest["items"] == rows and rest["next_cursor"] is None and first["total"] == 450
+    assert store.get(long_id)["client_data"]["transactions"] == rows
+    assert store.get(long_id, include_transactions=False)["client_data"]["transaction_count"] == 450
+    print("✅ 450 transactions paged back in statement order (200 + 250).")
+
+    # Pre-v1 rows (transactions inline in client_data) are migrated once on open
+    with store._conn:
+        store._conn.execute("UPDATE decisions SET client_data = ? WHERE id = ?",
+                            (json.dumps(dict(smurf["client_data"], transactions=rows[:3])), 1))
+        store._conn.execute("PRAGMA user_version = 0")
+    store.close()
+    store = DecisionStore(store.db_path)
+    assert store.transactions(1)["items"] == rows[:3]
+    assert "transactions" not in json.loads(store._conn.execute("SELECT client_data FROM decisions WHERE id = 1").fetchone()[0])
+    print("✅ Inline transactions migrated to decision_transactions.")
+    print(json.dumps(store.stats(), indent=2))
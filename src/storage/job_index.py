@@ -0,0 +1,46 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+DB_PATH = os.getenv("SENTINEL_CHECKPOINT_DB", "sentinel_checkpoints.sqlite")
+
+SCHEMA = """
+-- Job ID (e.g. the upload's content hash) -> checkpoint thread of its latest run
+CREATE TABLE IF NOT EXISTS job_threads (
+    job_id     TEXT PRIMARY KEY,
+    thread_id  TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class JobIndex:
+    """
+    Durable job ID -> latest checkpoint thread map for JobRunner (dict-style get/set).
+    Lives next to the LangGraph checkpoints so a restarted API can still resume a failed run.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def get(self, job_id, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT thread_id FROM job_threads WHERE job_id = ?", (job_id,)).fetchone()
+        return row[0] if row else default
+
+    def __setitem__(self, job_id, thread_id):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO job_threads (job_id, thread_id, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (job_id) DO UPDATE SET thread_id = excluded.thread_id, updated_at = excluded.updated_at",
+                (job_id, thread_id, datetime.now(timezone.utc).isoformat(timespec="seconds")),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
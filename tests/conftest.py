@@ -0,0 +1,57 @@
+"""Shared fixtures: the FastAPI backend on a scratch decision store and job directory, with a stub pipeline."""
+import importlib
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+# Imported fresh per test so they pick up the scratch SENTINEL_* paths (both read them at import time)
+FRESH_MODULES = ("src.storage.decision_store", "backend.app")
+
+
+class StubJobs:
+    """Stands in for the orchestrator's JobRunner: counts runs and answers after `delay` seconds."""
+
+    def __init__(self):
+        self.delay = 0.0
+        self.runs = 0
+        self.result = {
+            "final_decision": "APPROVE",
+            "client_data": {"client_name": "Jane Tan", "transactions": []},
+            "risk_analysis": {"compliance_analysis": {"category": "LOW_RISK", "reasons": []}, "math_analysis": {}},
+        }
+        self._lock = threading.Lock()
+
+    def run(self, pdf_path, job_id=None):
+        with self._lock:
+            self.runs += 1
+        time.sleep(self.delay)
+        return dict(self.result), job_id
+
+    def pending(self, job_id):
+        return ()
+
+    def resume(self, job_id):
+        raise LookupError(f"Job {job_id} has nothing to resume (finished or unknown).")
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    """A freshly imported backend.app; every module and env var it touched is restored afterwards."""
+    monkeypatch.setenv("SENTINEL_DECISION_DB", str(tmp_path / "decisions.sqlite"))
+    monkeypatch.setenv("SENTINEL_JOB_DIR", str(tmp_path / "jobs"))
+
+    # The real orchestrator loads every specialist at import; the API only needs its `jobs` runner
+    orchestrator = types.ModuleType("src.workflows.orchestrator")
+    orchestrator.jobs = StubJobs()
+    monkeypatch.setitem(sys.modules, "src.workflows.orchestrator", orchestrator)
+
+    for name in FRESH_MODULES:
+        # setitem first so teardown also removes a module that was not imported before this test
+        monkeypatch.setitem(sys.modules, name, None)
+        monkeypatch.delitem(sys.modules, name)
+    module = importlib.import_module("backend.app")
+    yield module
+    module.decision_store.close()
@@ -0,0 +1,66 @@
+"""GET /decisions/{id} views, transaction paging and response compression, against a scratch decision store."""
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def api(backend):
+    return backend, TestClient(backend.app)
+
+
+def _result(rows, mismatches):
+    return {
+        "final_decision": "APPROVE",
+        "client_data": {
+            "client_name": "Jane Tan",
+            "transactions": rows,
+            "reconciliation": {"status": "MISMATCH", "mismatches": mismatches},
+        },
+        "risk_analysis": {"compliance_analysis": {"category": "LOW_RISK", "reasons": []}, "math_analysis": {}},
+    }
+
+
+def test_summary_view_matches_analyze_summary(api):
+    backend, client = api
+    rows = [{"date": "2024-01-02", "description": f"POS {i}", "amount": 10.0, "type": "DEBIT"} for i in range(300)]
+    mismatches = [{"row": i} for i in range(backend.SUMMARY_MISMATCHES + 15)]
+    decision_id = backend.decision_store.record("job-1", _result(rows, mismatches))
+
+    summary = client.get(f"/decisions/{decision_id}", params={"view": "summary"}).json()
+    assert "transactions" not in summary["client_data"]
+    assert summary["client_data"]["transaction_count"] == 300
+    assert len(summary["client_data"]["reconciliation"]["mismatches"]) == backend.SUMMARY_MISMATCHES
+    assert summary["client_data"]["reconciliation"]["mismatch_count"] == len(mismatches)
+    assert summary["transactions_url"] == f"/decisions/{decision_id}/transactions"
+
+    full = client.get(f"/decisions/{decision_id}").json()
+    assert full["client_data"]["transactions"] == rows
+    assert len(full["client_data"]["reconciliation"]["mismatches"]) == len(mismatches)
+
+
+def test_transactions_are_paged_in_statement_order(api):
+    backend, client = api
+    rows = [{"date": "2024-01-02", "description": f"POS {i}", "amount": 10.0, "type": "DEBIT"} for i in range(250)]
+    decision_id = backend.decision_store.record("job-1", _result(rows, []))
+
+    items, cursor = [], None
+    while True:
+        params = {"limit": 100} if cursor is None else {"limit": 100, "cursor": cursor}
+        page = client.get(f"/decisions/{decision_id}/transactions", params=params).json()
+        items += page["items"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert items == rows and page["total"] == 250
+    assert client.get("/decisions/999/transactions").status_code == 404
+
+
+@pytest.mark.parametrize("accept, encoding", [("br", "br"), ("gzip", "gzip"), ("br, gzip", "br"), ("identity", None)])
+def test_large_responses_are_compressed_exactly_once(api, accept, encoding):
+    backend, client = api
+    rows = [{"date": "2024-01-02", "description": f"POS {i}", "amount": 10.0, "type": "DEBIT"} for i in range(300)]
+    decision_id = backend.decision_store.record("job-1", _result(rows, []))
+
+    response = client.get(f"/decisions/{decision_id}", headers={"Accept-Encoding": accept})
+    assert response.headers.get_list("content-encoding") == ([encoding] if encoding else [])
+    assert response.json()["client_data"]["transactions"] == rows
@@ -0,0 +1,97 @@
+"""JobRunner: every run on a fresh checkpoint thread, resume of the latest failed run, durable job index."""
+import pytest
+from langgraph.checkpoint.memory import InMemorySaver
+
+from src.storage.job_index import JobIndex
+from src.workflows.graph import JobRunner, build_workflow
+
+
+class Script:
+    """Specialist stand-ins whose behaviour each test sets per run."""
+
+    def __init__(self):
+        self.extraction = {"client_name": "Jane Tan", "total_income": 6000}
+        self.decision = "REJECT"
+        self.fail_advisor = False
+        self.extract_calls = 0
+
+    def extract(self, pdf_path):
+        self.extract_calls += 1
+        return self.extraction
+
+    def analyze(self, data):
+        category = "HIGH_RISK" if self.decision == "REJECT" else "LOW_RISK"
+        return {
+            "final_decision": self.decision,
+            "math_analysis": {"status": "PASS", "ratio": 0.3},
+            "compliance_analysis": {"category": category, "reasons": ["POTENTIAL STRUCTURING"]},
+        }
+
+    def consult(self, flags):
+        return "Reason: structuring. Regulation: MAS 626."
+
+    def recommend(self, income, risk_profile):
+        if self.fail_advisor:
+            raise TimeoutError("advisor timed out")
+        return "Recommendation: fixed deposit"
+
+
+@pytest.fixture
+def script():
+    return Script()
+
+
+def make_runner(script, threads=None):
+    workflow = build_workflow(script.extract, script, script, script)
+    return JobRunner(workflow.compile(checkpointer=InMemorySaver()), threads)
+
+
+def test_rerun_of_same_job_does_not_inherit_previous_outputs(script):
+    runner = make_runner(script)
+    first, _ = runner.run("statement.pdf", "hash-1")
+    assert first["final_decision"] == "REJECT" and first["legal_opinion"]
+
+    script.decision = "APPROVE"
+    second, _ = runner.run("statement.pdf", "hash-1")
+    assert second["final_decision"] == "APPROVE" and second["wealth_plan"]
+    assert second["legal_opinion"] is None
+
+
+def test_failed_extraction_clears_client_data(script):
+    runner = make_runner(script)
+    runner.run("statement.pdf", "hash-1")
+
+    script.extraction = None
+    result, _ = runner.run("statement.pdf", "hash-1")
+    assert result["final_decision"] == "ERROR_READING_PDF"
+    assert result["client_data"] is None and result["risk_analysis"] is None and result["legal_opinion"] is None
+
+
+def test_resume_continues_the_latest_failed_run(script):
+    runner = make_runner(script)
+    script.decision = "APPROVE"
+    script.fail_advisor = True
+    with pytest.raises(TimeoutError):
+        runner.run("statement.pdf", "hash-1")
+    assert runner.pending("hash-1") == ("wealth_advisor",)
+
+    script.fail_advisor = False
+    result = runner.resume("hash-1")
+    assert result["final_decision"] == "APPROVE" and script.extract_calls == 1
+    assert runner.pending("hash-1") == ()
+    with pytest.raises(LookupError):
+        runner.resume("hash-1")
+
+
+def test_job_index_survives_restart(script, tmp_path):
+    db = str(tmp_path / "checkpoints.sqlite")
+    index = JobIndex(db)
+    runner = make_runner(script, index)
+    runner.run("statement.pdf", "hash-1")
+    thread_id = index.get("hash-1")
+    assert thread_id.startswith("hash-1:")
+    index.close()
+
+    reopened = JobIndex(db)
+    assert reopened.get("hash-1") == thread_id and reopened.get("unknown") is None
+    reopened.close()
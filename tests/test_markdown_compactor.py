@@ -0,0 +1,31 @@
+"""compact_lines keeps every transaction, in table or text layout, and drops only page furniture."""
+from src.io.markdown_compactor import compact_lines, compact_markdown
+
+PAGE_HEADER = ["# DBS (Digital Bank Simulation) - eStatement", "**Customer Name:** Jane Tan", "**Account Number:** 0123456789"]
+
+
+def test_duplicate_text_transactions_are_kept():
+    markdown = "\n".join(PAGE_HEADER + [
+        "| Date | Description | Amount | Type | Balance |",
+        "|------|-------------|--------|------|---------|",
+        "| 2024-03-01 | GIRO SALARY | $6,200.00 | CREDIT | $16,200.00 |",
+        "Page 1 of 2",
+        *PAGE_HEADER,
+        # Second page laid out as plain text, with the same purchase made twice on the same day
+        "2024-03-04 STARBUCKS COFFEE SINGAPORE 6.50 DEBIT",
+        "2024-03-04 STARBUCKS COFFEE SINGAPORE 6.50 DEBIT",
+        "End of Statement. Computer Generated.",
+    ])
+    header, body, rows, dropped = compact_lines(markdown)
+    assert header == ["DBS (Digital Bank Simulation) - eStatement", "Customer Name: Jane Tan", "Account Number: 0123456789"]
+    assert body.count("2024-03-04 STARBUCKS COFFEE SINGAPORE 6.50 DEBIT") == 2
+    assert not any("Jane Tan" in line or "Page 1" in line for line in body)
+    assert rows == 1 and dropped == 6  # separator, page number, repeated header (3), footer
+
+
+def test_duplicate_table_rows_are_kept():
+    row = "| 2024-03-04 | STARBUCKS COFFEE SINGAPORE | $6.50 | DEBIT | $14,943.50 |"
+    markdown = "\n".join(PAGE_HEADER + ["| Date | Description | Amount | Type | Balance |", row, row])
+    result = compact_markdown(markdown)
+    assert result.rows == 2
+    assert result.parts[0].count("2024-03-04;STARBUCKS COFFEE SINGAPORE;6.50;DEBIT;14943.50") == 2
@@ -0,0 +1,130 @@
+"""
+aml_rules.json against the hard-coded RiskEngine it replaced: same verdicts, scores and reasons
+for the structuring (velocity in the $4k-$5k band), source-of-wealth and keyword checks, plus
+regression cases for the sanctioned_counterparty rule the old engine did not have.
+"""
+import random
+
+import pytest
+
+from src.io.prescreen import prescreen_markdown
+from src.risk.risk_engine import RiskEngine
+from src.risk.rule_engine import get_rule_set
+
+HIGH_RISK_KEYWORDS = ["Binance", "Casino", "Betting", "Luno", "Coinhako"]
+
+
+def legacy_compliance(data):
+    """The pre-aml_rules.json RiskEngine.evaluate_risk_flags + detect_smart_structuring, verbatim in effect."""
+    risk_score, reasons, category = 0, [], "LOW_RISK"
+    if "Salary" not in data.get("source_of_wealth", "Unknown"):
+        risk_score += 30
+        reasons.append("Unclear Source of Wealth (No Salary Detected)")
+    for flag in data.get("risk_flags", []):
+        if any(kw.lower() in flag.lower() for kw in HIGH_RISK_KEYWORDS):
+            risk_score += 50
+            reasons.append(f"High Risk Entity: {flag}")
+    if risk_score >= 50:
+        category = "HIGH_RISK"
+    elif risk_score >= 30:
+        category = "MEDIUM_RISK"
+
+    smurfed = sum(
+        1 for txn in data.get("transactions", [])
+        if txn["type"].upper() == "CREDIT" and "cash" in txn["description"].lower() and 4000 <= txn["amount"] < 5000
+    )
+    if smurfed > 1:
+        category = "HIGH_RISK"
+        risk_score += 100
+        reasons.append(
+            f"POTENTIAL STRUCTURING: Detected {smurfed} deposits in the 'Smurfing Zone' ($4k-$5k). "
+            "Logic suggests evasion of the $5000 reporting threshold."
+        )
+    return {"risk_score": risk_score, "category": category, "reasons": reasons}
+
+
+def statement(rng, index):
+    """One month of rows: salary, a few deposits around the $4k-$5k band, everyday debits."""
+    rows = [{"date": "2024-03-01", "description": "GIRO SALARY CREDIT - ACME", "amount": 20000.0, "type": "CREDIT"}]
+    for _ in range(rng.randint(0, 4)):
+        rows.append({
+            "date": f"2024-03-{rng.randint(2, 28):02d}",
+            "description": rng.choice(["CASH DEPOSIT BRANCH A", "ATM Cash Deposit", "FAST TRANSFER FROM J LIM"]),
+            "amount": rng.choice([3999.99, 4000.0, 4500.0, 4999.99, 5000.0]),
+            "type": rng.choice(["CREDIT", "CREDIT", "DEBIT"]),
+        })
+    for _ in range(rng.randint(1, 5)):
+        rows.append({"date": "2024-03-15", "description": "STARBUCKS COFFEE SINGAPORE", "amount": 6.5, "type": "DEBIT"})
+    income = sum(r["amount"] for r in rows if r["type"] == "CREDIT")
+    spending = sum(r["amount"] for r in rows if r["type"] == "DEBIT")
+    return {
+        "client_name": f"Client {index}",
+        "account_number": str(index),
+        "source_of_wealth": rng.choice(["Salary", "Salary", "Business Income", "Unknown"]),
+        "risk_flags": rng.sample(["Binance", "Casino Marina Bay", "STARBUCKS", "LUNO"], rng.randint(0, 2)),
+        "total_income": income,
+        "total_expenditure": spending,
+        "transactions": rows,
+    }
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return RiskEngine()
+
+
+def test_rule_file_matches_legacy_engine(engine):
+    rng = random.Random(35)
+    fired = 0
+    for index in range(500):
+        data = statement(rng, index)
+        expected = legacy_compliance(data)
+        report = engine.analyze(data)
+        compliance = report["compliance_analysis"]
+        assert {key: compliance[key] for key in expected} == expected, data
+        affordable = report["math_analysis"]["status"] == "PASS"
+        assert report["final_decision"] == ("REJECT" if expected["category"] == "HIGH_RISK" or not affordable else "APPROVE")
+        fired += "STRUCTURING" in compliance["reason_categories"]
+    assert 25 < fired < 475  # the corpus exercises both sides of the velocity threshold
+
+
+@pytest.mark.parametrize("amounts, fires", [
+    ([4500.0], False),                 # one deposit in the band is not structuring
+    ([4000.0, 4999.99], True),         # band edges are inclusive / exclusive like the old engine
+    ([3999.99, 5000.0, 4200.0], False),
+    ([4100.0, 4200.0, 4300.0], True),
+])
+def test_structuring_velocity_threshold(engine, amounts, fires):
+    rows = [{"date": f"2024-03-{day + 1:02d}", "description": "CASH DEPOSIT", "amount": amount, "type": "CREDIT"}
+            for day, amount in enumerate(amounts)]
+    data = {"source_of_wealth": "Salary", "risk_flags": [], "transactions": rows}
+    compliance = engine.analyze(data)["compliance_analysis"]
+    assert ("STRUCTURING" in compliance["reason_categories"]) is fires
+    assert compliance == dict(legacy_compliance(data), reason_categories=compliance["reason_categories"])
+
+
+@pytest.mark.parametrize("description, txn_type, fires", [
+    ("ITR TEHRAN TRADING CO REF-99", "DEBIT", True),
+    ("MST PYONGYANG IMPORT REF-1", "DEBIT", True),
+    ("HAN TRADING", "DEBIT", False),      # near miss: display-only trigram match, no category
+    ("TEHRAN TRADING", "CREDIT", False),  # sanctioned names only count on payments out
+])
+def test_sanctioned_counterparty(engine, description, txn_type, fires):
+    rows = [
+        {"date": "2024-03-01", "description": "GIRO SALARY CREDIT - ACME", "amount": 20000.0, "type": "CREDIT"},
+        {"date": "2024-03-05", "description": description, "amount": 900.0, "type": txn_type},
+    ]
+    report = engine.analyze({"source_of_wealth": "Salary", "risk_flags": [], "transactions": rows})
+    assert ("SANCTIONED" in report["compliance_analysis"]["reason_categories"]) is fires
+    assert report["final_decision"] == ("REJECT" if fires else "APPROVE")
+
+
+def test_prescreen_shares_the_engine_rule_set(engine):
+    assert engine.rules is get_rule_set()
+    markdown = "\n".join([
+        "**Customer Name:** Jane Tan",
+        "| Date | Description | Amount | Type | Balance |",
+        "| 2024-03-02 | CASH DEPOSIT | $4,500.00 | CREDIT | $4,500.00 |",
+        "| 2024-03-09 | CASH DEPOSIT | $4,800.00 | CREDIT | $9,300.00 |",
+    ])
+    assert prescreen_markdown(markdown).rules == ["structuring"]
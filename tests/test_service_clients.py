@@ -0,0 +1,187 @@
+"""Retry, rate-limit and client-pooling behaviour of src.io.service_clients against a local mock server."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from src.io.service_clients import (
+    ProviderLimiter,
+    RetryPolicy,
+    TokenBucket,
+    call_with_policy,
+    get_http_client,
+    get_llama_parser,
+    is_retryable,
+)
+
+FAST_RETRY = RetryPolicy(max_attempts=4, base_delay=0.01, max_delay=0.1)
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Answers `failures` x 429 (with Retry-After), then 200. Records client ports."""
+    protocol_version = "HTTP/1.1"  # keep-alive
+    failures = 2
+    hits = 0
+    ports = set()
+
+    def do_GET(self):
+        FlakyHandler.hits += 1
+        FlakyHandler.ports.add(self.client_address[1])
+        status = 429 if FlakyHandler.hits <= FlakyHandler.failures else 200
+        body = b"slow down" if status == 429 else b"ok"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "0.05")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def mock_url():
+    FlakyHandler.failures, FlakyHandler.hits, FlakyHandler.ports = 2, 0, set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def _fetch(url):
+    response = get_http_client().get(url)
+    response.raise_for_status()
+    return response.text
+
+
+def test_retries_429_and_honours_retry_after(mock_url):
+    start = time.monotonic()
+    assert call_with_policy("mock", _fetch, mock_url, retry=FAST_RETRY) == "ok"
+    assert FlakyHandler.hits == 3
+    assert time.monotonic() - start >= 0.1  # two Retry-After: 0.05 waits
+
+
+def test_gives_up_after_max_attempts(mock_url):
+    FlakyHandler.failures = 10
+    with pytest.raises(httpx.HTTPStatusError):
+        call_with_policy("mock", _fetch, mock_url, retry=FAST_RETRY)
+    assert FlakyHandler.hits == FAST_RETRY.max_attempts
+
+
+def test_non_retryable_error_is_raised_immediately():
+    class BadRequest(Exception):
+        status_code = 400
+
+    calls = []
+
+    def bad():
+        calls.append(1)
+        raise BadRequest()
+
+    with pytest.raises(BadRequest):
+        call_with_policy("mock", bad, retry=FAST_RETRY)
+    assert len(calls) == 1
+
+
+def test_sync_client_reuses_keepalive_connection(mock_url):
+    FlakyHandler.failures = 0
+    for _ in range(5):
+        call_with_policy("mock", _fetch, mock_url, retry=FAST_RETRY)
+    assert FlakyHandler.hits == 5 and len(FlakyHandler.ports) == 1
+
+
+def test_token_bucket_limits_request_rate():
+    limiter = ProviderLimiter(requests_per_minute=120)
+    limiter.requests = TokenBucket(120, capacity=1)  # 2 requests/second, no burst
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - start >= 1.9
+
+
+def test_token_bucket_clamps_oversized_requests():
+    bucket = TokenBucket(600, capacity=10)
+    assert bucket.acquire(1000) == 0.0  # clamped to the capacity instead of waiting forever
+
+
+class MockLlamaCloud(BaseHTTPRequestHandler):
+    """Minimal LlamaCloud parsing API: upload -> job status (429 for the first `busy` polls) -> markdown."""
+    protocol_version = "HTTP/1.1"
+    busy = 0
+    uploads = 0
+    ports = set()
+
+    def _reply(self, status, payload, headers=()):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        MockLlamaCloud.ports.add(self.client_address[1])
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        MockLlamaCloud.uploads += 1
+        self._reply(200, {"id": f"job-{MockLlamaCloud.uploads}"})
+
+    def do_GET(self):
+        MockLlamaCloud.ports.add(self.client_address[1])
+        if self.path.endswith("/result/markdown"):
+            self._reply(200, {"markdown": "# DBS eStatement", "job_metadata": {}})
+        elif MockLlamaCloud.busy > 0:
+            MockLlamaCloud.busy -= 1
+            self._reply(429, {"detail": "rate limited"}, [("Retry-After", "0.05")])
+        else:
+            self._reply(200, {"status": "SUCCESS"})
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def llama_cloud(tmp_path):
+    MockLlamaCloud.busy, MockLlamaCloud.uploads, MockLlamaCloud.ports = 0, 0, set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockLlamaCloud)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    pdf = tmp_path / "statement.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n%mock\n")
+    # max_timeout=1: a job still rate-limited after ~1s of polling raises instead of waiting 2000s
+    parser = get_llama_parser(base_url=f"http://127.0.0.1:{server.server_address[1]}", api_key="test",
+                              check_interval=0, max_timeout=1)
+    yield parser, str(pdf)
+    server.shutdown()
+    server.server_close()
+
+
+def test_llama_parser_errors_are_retried_by_policy(llama_cloud):
+    parser, pdf = llama_cloud
+    # The first job is polled 2-3 times within its 1s max_timeout, all 429s, so the SDK gives up on it
+    MockLlamaCloud.busy = 3
+    documents = call_with_policy("mock", parser.load_data, pdf, retry=RetryPolicy(max_attempts=3, base_delay=0.5))
+    assert [doc.text for doc in documents] == ["# DBS eStatement"]
+    assert MockLlamaCloud.uploads == 2  # one retry of the whole parse
+
+
+def test_llama_parser_raises_instead_of_returning_nothing(llama_cloud):
+    parser, pdf = llama_cloud
+    MockLlamaCloud.busy = 1000
+    with pytest.raises(Exception) as info:
+        parser.load_data(pdf)
+    assert is_retryable(info.value)
+
+
+def test_llama_parser_reuses_one_connection_across_threads(llama_cloud):
+    parser, pdf = llama_cloud
+    for _ in range(3):
+        worker = threading.Thread(target=parser.load_data, args=(pdf,))
+        worker.start()
+        worker.join()
+    assert MockLlamaCloud.uploads == 3 and len(MockLlamaCloud.ports) == 1
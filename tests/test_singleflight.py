@@ -0,0 +1,47 @@
+"""SingleFlight: identical concurrent uploads share one pipeline run, and a caller leaving does not cancel it."""
+import asyncio
+
+import httpx
+
+PDF = b"%PDF-1.4\n%statement\n"
+
+
+def test_concurrent_identical_uploads_run_the_pipeline_once(backend):
+    backend.jobs.delay = 0.3  # long enough for every upload to arrive while the first is in flight
+
+    async def upload_five():
+        transport = httpx.ASGITransport(app=backend.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            files = {"file": ("statement.pdf", PDF, "application/pdf")}
+            return await asyncio.gather(*(client.post("/analyze", files=files) for _ in range(5)))
+
+    responses = asyncio.run(upload_five())
+    assert [response.status_code for response in responses] == [200] * 5
+    assert backend.jobs.runs == 1
+    assert len({response.json()["decision_id"] for response in responses}) == 1
+    assert not backend.analysis_flight._inflight
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_run(backend):
+    flight = backend.SingleFlight()
+    started, finished = [], []
+
+    async def compute():
+        started.append(1)
+        await asyncio.sleep(0.1)
+        finished.append(1)
+        return "decision"
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.do("job-1", compute))
+        await asyncio.sleep(0)  # the first caller starts the shared task
+        second = asyncio.ensure_future(flight.do("job-1", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()  # e.g. the client disconnected
+        result = await second
+        return first, result
+
+    first, result = asyncio.run(scenario())
+    assert first.cancelled()
+    assert result == "decision" and started == [1] and finished == [1]
+    assert not flight._inflight